@@ -12,7 +12,13 @@ from .models import (
     Station,
     StationWorkloadDaily,
     StationWorkloadMonthly,
-    DailyPatientData
+    StationWorkloadRollup,
+    DailyPatientData,
+    ImportJob,
+    JobRun,
+    QuarterEntry,
+    ScheduledJob,
+    WorkloadRecompute
 )
 admin.site.register(CareServiceCategory)
 admin.site.register(CareServiceField)
@@ -23,4 +29,10 @@ admin.site.register(Patient)
 admin.site.register(Station)
 admin.site.register(StationWorkloadDaily)
 admin.site.register(StationWorkloadMonthly)
+admin.site.register(StationWorkloadRollup)
 admin.site.register(DailyPatientData)
+admin.site.register(ImportJob)
+admin.site.register(WorkloadRecompute)
+admin.site.register(QuarterEntry)
+admin.site.register(ScheduledJob)
+admin.site.register(JobRun)
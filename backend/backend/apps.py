@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BackendConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'backend'
+
+    def ready(self):
+        # Connect the signal receivers
+        from .src import analysis_cache, classification_snapshot, quarter_entries, question_catalog  # noqa: F401
@@ -0,0 +1,46 @@
+"""Generate synthetic hospital data at a chosen scale."""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.src.synthetic_data import generate_data
+
+
+class Command(BaseCommand):
+    help = ("Generate stations, patients with fully stationary stays, transfers and semi-stationary visits, their "
+            "classifications with selected care service options and the shift plans of a date range. Load the "
+            "questions before, e.g. with 'loaddata questions.json'.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stations', type=int, default=10,
+                            help="Number of new stations, 0 uses the existing stations.")
+        parser.add_argument('--patients', type=int, default=1000, help="Number of new patients.")
+        parser.add_argument('--days', type=int, default=90, help="Number of generated days.")
+        parser.add_argument('--end', type=date.fromisoformat,
+                            help="Last generated date (YYYY-MM-DD), defaults to yesterday.")
+        parser.add_argument('--seed', type=int, help="Seed to generate the same data again.")
+        parser.add_argument('--classified-share', type=float, default=0.9,
+                            help="Share of the patient-days with a classification.")
+        parser.add_argument('--selection-density', type=float, default=1.0,
+                            help="Factor applied to the probability to select a care service option.")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Number of patient-days written at once.")
+        parser.add_argument('--skip-rollup', action='store_true',
+                            help="Do not compute the station workload and analysis rollups afterwards.")
+
+    def handle(self, *args, **options):
+        if options['stations'] < 0 or options['patients'] < 1 or options['days'] < 1:
+            raise CommandError("The number of patients and days must be positive.")
+        try:
+            statistics = generate_data(
+                options['stations'], options['patients'], options['days'], options['end'], options['seed'],
+                options['classified_share'], options['selection_density'], options['chunk_size'],
+                not options['skip_rollup'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            f"Generated {statistics['stations']} stations, {statistics['patients']} patients, "
+            f"{statistics['patient_days']} patient-days, {statistics['classifications']} classifications with "
+            f"{statistics['selections']} selected options and {statistics['shifts']} shifts in "
+            f"{statistics['seconds']} s."
+        )
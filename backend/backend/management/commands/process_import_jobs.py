@@ -0,0 +1,36 @@
+"""Run background workers processing the queued excel imports."""
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from backend.src.handle_import_jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = "Process queued excel imports, using the database as the queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Number of worker processes.")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to wait before checking an empty queue again.")
+        parser.add_argument('--progress-interval', type=float, default=1.0,
+                            help="Seconds between two progress updates of a running job.")
+        parser.add_argument('--once', action='store_true', help="Stop as soon as the queue is empty.")
+
+    def handle(self, *args, **options):
+        worker_arguments = (options['poll_interval'], options['progress_interval'], options['once'])
+        if options['workers'] == 1:
+            run_worker(*worker_arguments)
+            return
+
+        # Each process has to open its own database connection
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=run_worker, args=worker_arguments)
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
@@ -0,0 +1,16 @@
+"""Run a background worker recomputing the station workload marked in the database."""
+from django.core.management.base import BaseCommand
+
+from backend.src.workload_recompute import run_recompute_worker
+
+
+class Command(BaseCommand):
+    help = "Recompute the station workload rollups marked dirty, if WORKLOAD_RECOMPUTE_MODE is 'database'."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to wait between two checks for due recomputations.")
+        parser.add_argument('--once', action='store_true', help="Stop as soon as no recomputation is due.")
+
+    def handle(self, *args, **options):
+        run_recompute_worker(options['poll_interval'], options['once'])
@@ -0,0 +1,25 @@
+"""Print the aggregated profiles of the views."""
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.src.view_profiling import create_report
+
+
+class Command(BaseCommand):
+    help = "Print the functions with the highest time over all kept profiles, per URL name."
+
+    def add_arguments(self, parser):
+        parser.add_argument('url_names', nargs='*', help="URL names to report, defaults to all profiled ones.")
+        parser.add_argument('--top', type=int, default=settings.PROFILING_TOP, help="Number of listed functions.")
+        parser.add_argument('--sort', default='cumulative',
+                            help="Sort key of pstats, e.g. 'cumulative', 'tottime' or 'calls'.")
+
+    def handle(self, *args, **options):
+        url_names = options['url_names'] or sorted(
+            path.name for path in Path(settings.PROFILING_DIR).glob('*') if path.is_dir()
+        )
+        for url_name in url_names:
+            report = create_report(url_name, options['top'], options['sort'])
+            self.stdout.write(report or f"{url_name}: no profiles\n")
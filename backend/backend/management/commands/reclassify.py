@@ -0,0 +1,47 @@
+"""Recompute the stored classifications of stations for a date range."""
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from backend.models import Station
+from backend.src.bulk_reclassification import reclassify
+
+
+class Command(BaseCommand):
+    help = ("Recompute the minutes and care groups of all classifications of the given stations and dates, "
+            "e.g. after a rule fix or a data correction, and rebuild the affected workload.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stations', type=int, nargs='+', help="IDs of the stations, defaults to all.")
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, required=True,
+                            help="First date to recompute (YYYY-MM-DD).")
+        parser.add_argument('--to', dest='end', type=date.fromisoformat,
+                            help="Last date to recompute (YYYY-MM-DD), defaults to the first date.")
+        parser.add_argument('--workers', type=int, default=1, help="Number of worker processes.")
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help="Number of classifications recomputed at once.")
+        parser.add_argument('--dry-run', action='store_true', help="Only print the changes without storing them.")
+
+    def handle(self, *args, **options):
+        station_ids = options['stations'] or list(Station.objects.order_by('id').values_list('id', flat=True))
+        dry_run = options['dry_run']
+
+        def report(result):
+            self.stdout.write(f"Station {result['station']}: {result['checked']} classifications checked, "
+                              f"{len(result['changes'])} changed.")
+            if dry_run:
+                for change in result['changes']:
+                    self.stdout.write(
+                        f"  Classification {change['id']} of patient {change['patient']} on {change['date']}: "
+                        "minutes {} -> {}, A{} -> A{}, S{} -> S{}".format(
+                            *(value for pair in zip(change['stored'], change['recomputed']) for value in pair)
+                        )
+                    )
+
+        results = reclassify(station_ids, options['start'], options['end'] or options['start'], options['workers'],
+                             options['chunk_size'], dry_run, progress=report)
+        changed = sum(len(result['changes']) for result in results)
+        if dry_run:
+            self.stdout.write(f"Dry run: {changed} classifications would change, nothing was stored.")
+        else:
+            self.stdout.write(f"Recomputed {changed} classifications and their station workload.")
@@ -0,0 +1,29 @@
+"""Recompute the daily and monthly workload and the analysis rollups of all stations from scratch."""
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from backend.src.nightly_rollup import compute_daily_minutes, compute_monthly_averages
+from backend.src.workload_rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = ("Recompute the daily and monthly workload and the analysis rollups of all stations from the "
+            "classifications. The workload is otherwise maintained incrementally, this repairs any drift.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, default=date.today(),
+                            help="First date to recompute (YYYY-MM-DD), defaults to today.")
+        parser.add_argument('--to', dest='end', type=date.fromisoformat,
+                            help="Last date to recompute (YYYY-MM-DD), defaults to the first date.")
+
+    def handle(self, *args, **options):
+        start = options['start']
+        end = options['end'] or start
+        with transaction.atomic():
+            days = compute_daily_minutes(start, end)
+            months = compute_monthly_averages(start, end, shifts=('DAY',))
+            refresh_rollups(start, end)
+
+        self.stdout.write(f"Recomputed {days} station days and {months} station months.")
@@ -0,0 +1,31 @@
+"""Compute the night shifts, daily minutes, monthly averages and analysis rollups of all stations."""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.src.nightly_rollup import run_nightly_rollup
+
+
+class Command(BaseCommand):
+    help = ("Compute the caregivers of the night shifts, the daily minutes, the monthly averages and the analysis "
+            "rollups of all stations with set-based queries. Run nightly for the previous day or with --from and "
+            "--to to rebuild the history.")
+
+    def add_arguments(self, parser):
+        yesterday = date.today() - timedelta(days=1)
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, default=yesterday,
+                            help="First date to compute (YYYY-MM-DD), defaults to yesterday.")
+        parser.add_argument('--to', dest='end', type=date.fromisoformat,
+                            help="Last date to compute (YYYY-MM-DD), defaults to the first date.")
+
+    def handle(self, *args, **options):
+        start = options['start']
+        end = options['end'] or start
+        if start > end:
+            raise CommandError("The first date must not be after the last date.")
+
+        statistics = run_nightly_rollup(start, end)
+        self.stdout.write(
+            f"Computed {statistics['night_shifts']} night shifts, {statistics['days']} days, "
+            f"{statistics['months']} months and {statistics['rollups']} rollups in {statistics['seconds']} s."
+        )
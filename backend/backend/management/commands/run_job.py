@@ -0,0 +1,34 @@
+"""Run a single registered job, for the dates it is due for or for a given date."""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.src.scheduler import JOBS, acquire_lock, get_worker, release_lock, run_due_dates, run_job
+
+
+class Command(BaseCommand):
+    help = ("Run a registered job for all dates it is due for, like the scheduler does. With --for the job runs "
+            "for the given date only, which is recorded but does not change the dates the scheduler runs it for.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=list(JOBS), help="Name of the job.")
+        parser.add_argument('--for', dest='day', type=date.fromisoformat,
+                            help="Date to run the job for (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        name = options['name']
+        if options['day'] is None:
+            runs = run_due_dates(name)
+        else:
+            worker = get_worker()
+            if not acquire_lock(name, worker):
+                raise CommandError(f"The job {name} is locked by another process.")
+            try:
+                runs = [run_job(name, options['day'], worker)]
+            finally:
+                release_lock(name, worker)
+
+        for run in runs:
+            self.stdout.write(f"{name} for {run.run_for}: {run.status}, {run.rows} rows in {run.duration} s")
+        if any(run.status == 'FAILED' for run in runs):
+            raise CommandError(f"The job {name} failed: {runs[-1].error}")
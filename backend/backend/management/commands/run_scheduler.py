@@ -0,0 +1,16 @@
+"""Run the registered periodic jobs in one long-lived process."""
+from django.core.management.base import BaseCommand
+
+from backend.src.scheduler import run_scheduler
+
+
+class Command(BaseCommand):
+    help = "Run the registered jobs whenever they are due, catching up days missed during a downtime."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=60.0,
+                            help="Seconds to wait between two checks for due jobs.")
+        parser.add_argument('--once', action='store_true', help="Stop after running the jobs due now.")
+
+    def handle(self, *args, **options):
+        run_scheduler(options['poll_interval'], options['once'])
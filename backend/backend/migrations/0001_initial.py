@@ -0,0 +1,146 @@
+# Generated by Django 5.1.2 on 2026-10-17 02:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CareServiceCategory',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('short', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CareServiceField',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=128)),
+                ('short', models.CharField(max_length=8)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Patient',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('first_name', models.CharField(max_length=100)),
+                ('last_name', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Station',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('is_intensive_care', models.BooleanField()),
+                ('is_child_care_unit', models.BooleanField()),
+                ('max_patients_per_caregiver', models.FloatField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CareServiceOption',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=64)),
+                ('short', models.CharField(max_length=128)),
+                ('severity', models.IntegerField()),
+                ('list_index', models.IntegerField()),
+                ('description', models.TextField()),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.careservicecategory')),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.careservicefield')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyPatientData',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('is_semi_stationary', models.BooleanField()),
+                ('is_fully_stationary', models.BooleanField()),
+                ('day_of_admission', models.DateTimeField()),
+                ('day_of_discharge', models.DateTimeField()),
+                ('is_repeating_visit', models.BooleanField()),
+                ('uses_quarter_entry', models.BooleanField(default=False)),
+                ('night_stay', models.BooleanField(default=False)),
+                ('day_stay', models.BooleanField(default=False)),
+                ('room_name', models.CharField(max_length=100)),
+                ('bed_number', models.CharField(max_length=100)),
+                ('barthel_index', models.IntegerField()),
+                ('expanded_barthel_index', models.IntegerField()),
+                ('mini_mental_status', models.IntegerField()),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.patient')),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.station')),
+            ],
+            options={
+                'unique_together': {('station', 'patient', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyClassification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('is_in_isolation', models.BooleanField()),
+                ('result_minutes', models.IntegerField()),
+                ('a_index', models.IntegerField(default=1)),
+                ('s_index', models.IntegerField(default=1)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.patient')),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.station')),
+            ],
+            options={
+                'unique_together': {('patient', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='IsCareServiceUsed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('care_service_option', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.careserviceoption')),
+                ('classification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.dailyclassification')),
+            ],
+            options={
+                'unique_together': {('classification', 'care_service_option')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StationWorkloadDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('shift', models.CharField(choices=[('DAY', 'Day Shift'), ('NIGHT', 'Night Shift')], max_length=100)),
+                ('patients_total', models.IntegerField(blank=True, null=True)),
+                ('caregivers_total', models.FloatField(blank=True, null=True)),
+                ('minutes_total', models.IntegerField(blank=True, null=True)),
+                ('PPBV_suggested_caregivers', models.FloatField(blank=True, null=True)),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.station')),
+            ],
+            options={
+                'unique_together': {('station', 'date', 'shift')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StationWorkloadMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('shift', models.CharField(choices=[('DAY', 'Day Shift'), ('NIGHT', 'Night Shift')], max_length=100)),
+                ('patients_avg', models.FloatField(blank=True, null=True)),
+                ('actual_caregivers_avg', models.FloatField(blank=True, null=True)),
+                ('suggested_caregivers_avg', models.FloatField(blank=True, null=True)),
+                ('minutes_total', models.IntegerField()),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.station')),
+            ],
+            options={
+                'unique_together': {('station', 'month', 'shift')},
+            },
+        ),
+    ]
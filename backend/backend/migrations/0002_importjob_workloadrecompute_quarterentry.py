@@ -0,0 +1,77 @@
+# Generated by Django 5.1.2 on 2026-10-17 02:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_quarter_entries(apps, schema_editor):
+    """Record the quarter entries already flagged on the patient data."""
+    DailyPatientData = apps.get_model('backend', 'DailyPatientData')
+    QuarterEntry = apps.get_model('backend', 'QuarterEntry')
+    QuarterEntry.objects.bulk_create(
+        [
+            QuarterEntry(
+                patient_data_id=patient_data_id,
+                patient_id=patient_id,
+                quarter=day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1),
+            )
+            for patient_data_id, patient_id, day in DailyPatientData.objects.filter(uses_quarter_entry=True)
+            .values_list('id', 'patient_id', 'date')
+        ],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('patient', 'Patient data'), ('caregiver', 'Caregiver shifts')], max_length=32)),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('SUCCEEDED', 'Succeeded'), ('FAILED', 'Failed')], default='QUEUED', max_length=16)),
+                ('file', models.FileField(upload_to='imports/')),
+                ('rows_processed', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('worker', models.CharField(blank=True, default='', max_length=128)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='importjob_status_id_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuarterEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quarter', models.DateField()),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.patient')),
+                ('patient_data', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='backend.dailypatientdata')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['patient', 'quarter'], name='quarterentry_patient_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkloadRecompute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('DAY', 'Daily workload'), ('MONTH', 'Monthly workload')], max_length=8)),
+                ('date', models.DateField()),
+                ('due_at', models.DateTimeField()),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.station')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['due_at'], name='workloadrecompute_due_idx')],
+                'unique_together': {('station', 'period', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_quarter_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-17 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0002_importjob_workloadrecompute_quarterentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailyclassification',
+            index=models.Index(fields=['station', 'date'], name='classif_station_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyclassification',
+            index=models.Index(fields=['patient', 'station', '-date'], name='classif_patient_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailypatientdata',
+            index=models.Index(fields=['station', 'date'], name='patientdata_station_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailypatientdata',
+            index=models.Index(fields=['patient', 'date'], name='patientdata_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailypatientdata',
+            index=models.Index(condition=models.Q(('uses_quarter_entry', True)), fields=['patient', 'date'], name='patientdata_quarter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailypatientdata',
+            index=models.Index(condition=models.Q(('night_stay', True)), fields=['station', 'date'], name='patientdata_night_stay_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stationworkloaddaily',
+            index=models.Index(fields=['date', 'station'], name='workload_date_station_idx'),
+        ),
+    ]
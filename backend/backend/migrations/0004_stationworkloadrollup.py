@@ -0,0 +1,60 @@
+# Generated by Django 5.1.2 on 2026-10-17 02:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth, TruncQuarter, TruncWeek, TruncYear
+
+
+def backfill_rollups(apps, schema_editor):
+    """Sum up the existing daily workload per station and period."""
+    StationWorkloadDaily = apps.get_model('backend', 'StationWorkloadDaily')
+    StationWorkloadRollup = apps.get_model('backend', 'StationWorkloadRollup')
+    truncations = {
+        'DAY': F('date'),
+        'WEEK': TruncWeek('date'),
+        'MONTH': TruncMonth('date'),
+        'QUARTER': TruncQuarter('date'),
+        'YEAR': TruncYear('date'),
+    }
+    for granularity, truncation in truncations.items():
+        StationWorkloadRollup.objects.bulk_create(
+            [
+                StationWorkloadRollup(
+                    station_id=row['station_id'],
+                    granularity=granularity,
+                    period_start=row['period'],
+                    minutes_total=row['minutes'],
+                )
+                for row in StationWorkloadDaily.objects.annotate(period=truncation)
+                .values('station_id', 'period')
+                .annotate(minutes=Coalesce(Sum('minutes_total'), Value(0)))
+                .order_by()
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0003_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationWorkloadRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('DAY', 'Day'), ('WEEK', 'ISO week'), ('MONTH', 'Month'), ('QUARTER', 'Quarter'), ('YEAR', 'Year')], max_length=8)),
+                ('period_start', models.DateField()),
+                ('minutes_total', models.IntegerField()),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.station')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'period_start', 'station'], name='rollup_period_idx')],
+                'unique_together': {('station', 'granularity', 'period_start')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
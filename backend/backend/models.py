@@ -53,6 +53,10 @@ class DailyClassification(models.Model):
 
     class Meta:
         unique_together = ('patient', 'date')
+        indexes = [
+            models.Index(fields=['station', 'date'], name='classif_station_date_idx'),
+            models.Index(fields=['patient', 'station', '-date'], name='classif_patient_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.patient} ({self.date})"
@@ -82,6 +86,21 @@ class DailyPatientData(models.Model):
         """Unique constraint for station, patient and date."""
 
         unique_together = ("station", "patient", "date")
+        indexes = [
+            models.Index(fields=["station", "date"], name="patientdata_station_date_idx"),
+            models.Index(fields=["patient", "date"], name="patientdata_patient_date_idx"),
+            # Only few rows use the quarter entry or stay over night, so partial indexes stay small
+            models.Index(
+                fields=["patient", "date"],
+                condition=models.Q(uses_quarter_entry=True),
+                name="patientdata_quarter_idx",
+            ),
+            models.Index(
+                fields=["station", "date"],
+                condition=models.Q(night_stay=True),
+                name="patientdata_night_stay_idx",
+            ),
+        ]
 
 
 class IsCareServiceUsed(models.Model):
@@ -141,6 +160,7 @@ class StationWorkloadDaily(models.Model):
 
     class Meta:
         unique_together = ('station', 'date', 'shift')
+        indexes = [models.Index(fields=['date', 'station'], name='workload_date_station_idx')]
 
     def __str__(self):
         return f"{self.station} {self.date} {self.shift}"
@@ -166,3 +186,129 @@ class StationWorkloadMonthly(models.Model):
 
     def __str__(self):
         return f"{self.station} {self.month} {self.shift}"
+
+
+class StationWorkloadRollup(models.Model):
+    """Workload of a station summed up per day, ISO week, month, quarter or year for the analysis."""
+
+    station = models.ForeignKey('Station', on_delete=models.CASCADE)
+    GRANULARITY_CHOICES = [
+        ('DAY', 'Day'),
+        ('WEEK', 'ISO week'),
+        ('MONTH', 'Month'),
+        ('QUARTER', 'Quarter'),
+        ('YEAR', 'Year'),
+    ]
+    granularity = models.CharField(max_length=8, choices=GRANULARITY_CHOICES)
+    period_start = models.DateField()  # First day of the period, Monday for ISO weeks
+    minutes_total = models.IntegerField()  # Sum of daily minutes_total of both shifts over the period
+
+    class Meta:
+        unique_together = ('station', 'granularity', 'period_start')
+        indexes = [models.Index(fields=['granularity', 'period_start', 'station'], name='rollup_period_idx')]
+
+    def __str__(self):
+        return f"{self.station} {self.granularity} {self.period_start}"
+
+
+class ImportJob(models.Model):
+    """Excel import queued in the database and processed by a background worker."""
+
+    KIND_CHOICES = [
+        ('patient', 'Patient data'),
+        ('caregiver', 'Caregiver shifts'),
+    ]
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)  # Type of the imported excel file
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+    ]
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='QUEUED')
+    file = models.FileField(upload_to='imports/')  # Stored upload, removed after a successful import
+    rows_processed = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=128, blank=True, default='')  # Host and process ID of the worker
+    attempts = models.IntegerField(default=0)  # Number of times a worker claimed the job
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # Last sign of life of the worker running the job
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'id'], name='importjob_status_id_idx')]
+
+    def __str__(self):
+        return f"{self.kind} import {self.id} ({self.status})"
+
+
+class WorkloadRecompute(models.Model):
+    """Station workload marked for recomputation, coalesced per station, period and date."""
+
+    station = models.ForeignKey('Station', on_delete=models.CASCADE)
+    PERIOD_CHOICES = [
+        ('DAY', 'Daily workload'),
+        ('MONTH', 'Monthly workload'),
+    ]
+    period = models.CharField(max_length=8, choices=PERIOD_CHOICES)
+    date = models.DateField()  # First day of the month for monthly workload
+    due_at = models.DateTimeField()  # End of the debounce window
+
+    class Meta:
+        unique_together = ('station', 'period', 'date')
+        indexes = [models.Index(fields=['due_at'], name='workloadrecompute_due_idx')]
+
+    def __str__(self):
+        return f"{self.station} {self.period} {self.date}"
+
+
+class QuarterEntry(models.Model):
+    """Ledger of the quarters in which a patient used the quarter entry of a repeating visit."""
+
+    patient = models.ForeignKey('Patient', on_delete=models.CASCADE)
+    quarter = models.DateField()  # Use first day to represent quarter
+    patient_data = models.OneToOneField('DailyPatientData', on_delete=models.CASCADE)  # Day the entry was used
+
+    class Meta:
+        indexes = [models.Index(fields=['patient', 'quarter'], name='quarterentry_patient_idx')]
+
+    def __str__(self):
+        return f"{self.patient} {self.quarter}"
+
+
+class ScheduledJob(models.Model):
+    """State of a job run by the scheduler, one row per job registered in code."""
+
+    name = models.CharField(max_length=64, unique=True)
+    last_run_for = models.DateField(null=True, blank=True)  # Last date the job completed for
+    locked_by = models.CharField(max_length=128, blank=True, default='')  # Host and process ID holding the lock
+    locked_until = models.DateTimeField(null=True, blank=True)  # Lock expires if its holder stopped
+
+    def __str__(self):
+        return self.name
+
+
+class JobRun(models.Model):
+    """Single run of a scheduled job for one date."""
+
+    job = models.ForeignKey('ScheduledJob', on_delete=models.CASCADE)
+    run_for = models.DateField()  # Date the job was run for
+    STATUS_CHOICES = [
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+    ]
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='RUNNING')
+    rows = models.IntegerField(default=0)  # Rows written by the job
+    error = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=128, blank=True, default='')  # Host and process ID of the scheduler
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True)  # Seconds
+
+    class Meta:
+        indexes = [models.Index(fields=['job', 'started_at'], name='jobrun_job_started_idx')]
+
+    def __str__(self):
+        return f"{self.job} {self.run_for} ({self.status})"
@@ -0,0 +1,135 @@
+"""Cache the responses of the analysis endpoints until the station workload changes.
+
+The analysis endpoints only aggregate the station workload, which changes with classifications, imports and the
+scheduled jobs. Like the question catalog, the workload is kept under a version key, which is replaced whenever a
+workload row is written. Responses are cached per version and URL and carry the version as ETag and the time of
+the last change as Last-Modified, so clients revalidate with a conditional GET and get 304 Not Modified as long
+as nothing changed. Streamed responses are cached once they are complete, as long as they stay small enough.
+"""
+from datetime import datetime, time
+from functools import wraps
+from hashlib import md5
+from typing import Iterable, Iterator
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from ..models import Station, StationWorkloadDaily, StationWorkloadMonthly, StationWorkloadRollup
+
+WORKLOAD_VERSION_KEY = 'workload_version'
+
+
+def create_workload_version() -> dict:
+    """Create a new version of the workload, changed right now."""
+    return {'version': uuid4().hex, 'modified': timezone.now().replace(microsecond=0)}
+
+
+def get_workload_version() -> dict:
+    """Get the current version of the workload, creating one if none exists yet.
+
+    Returns:
+        dict: The version key and the time of the last change.
+    """
+    return cache.get_or_set(WORKLOAD_VERSION_KEY, create_workload_version, timeout=None)
+
+
+def invalidate_workload() -> None:
+    """Replace the version key once the current transaction is committed.
+
+    Replacing it only after the commit ensures that no response of the new version is built from the old data.
+    """
+    transaction.on_commit(lambda: cache.set(WORKLOAD_VERSION_KEY, create_workload_version(), timeout=None))
+
+
+def get_etag(request, *args, **kwargs) -> str:
+    """Get the ETag of an analysis response from the workload version, the URL and the current day.
+
+    The current day is included, since the presets of the analysis refer to it.
+    """
+    version = get_workload_version()['version']
+    return md5(f'{version}:{timezone.localdate()}:{request.get_full_path()}'.encode()).hexdigest()
+
+
+def get_last_modified(request, *args, **kwargs) -> datetime:
+    """Get the time of the last change of an analysis response, at the earliest the start of the current day."""
+    start_of_day = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    return max(get_workload_version()['modified'], start_of_day)
+
+
+def cache_stream(key: str, content: Iterable[bytes]) -> Iterator[bytes]:
+    """Pass the parts of a streamed response through and cache the response once it is complete.
+
+    The parts are only collected up to ANALYSIS_CACHE_MAX_SIZE bytes, larger or aborted responses are not cached.
+
+    Args:
+        key (str): The cache key of the response.
+        content (Iterable[bytes]): The streamed content of the response.
+
+    Yields:
+        bytes: The next part of the response.
+    """
+    parts = []
+    size = 0
+    for part in content:
+        if parts is not None:
+            size += len(part)
+            if size <= settings.ANALYSIS_CACHE_MAX_SIZE:
+                parts.append(part)
+            else:
+                parts = None
+        yield part
+
+    if parts is not None:
+        caches['analysis'].set(key, b''.join(parts), timeout=settings.ANALYSIS_CACHE_TIMEOUT)
+
+
+def cache_analysis(view):
+    """Cache the successful GET responses of an analysis endpoint and answer conditional requests.
+
+    Args:
+        view (callable): The view returning the analysis as JSON.
+
+    Returns:
+        callable: The view with ETag, Last-Modified and a response cache.
+    """
+    @condition(etag_func=get_etag, last_modified_func=get_last_modified)
+    @wraps(view)
+    def cached_view(request, *args, **kwargs):
+        if request.method != 'GET':
+            return view(request, *args, **kwargs)
+
+        key = get_etag(request)
+        content = caches['analysis'].get(key)
+        if content is not None:
+            return HttpResponse(content, content_type='application/json')
+
+        response = view(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        if response.streaming:
+            response.streaming_content = cache_stream(key, response.streaming_content)
+        else:
+            caches['analysis'].set(key, response.content, timeout=settings.ANALYSIS_CACHE_TIMEOUT)
+        return response
+
+    return cached_view
+
+
+@receiver(post_save, sender=StationWorkloadDaily)
+@receiver(post_save, sender=StationWorkloadMonthly)
+@receiver(post_save, sender=StationWorkloadRollup)
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=StationWorkloadDaily)
+@receiver(post_delete, sender=StationWorkloadMonthly)
+@receiver(post_delete, sender=StationWorkloadRollup)
+@receiver(post_delete, sender=Station)
+def handle_workload_change(sender, **kwargs) -> None:
+    """Invalidate the cached analysis whenever a workload row or station is saved or deleted."""
+    invalidate_workload()
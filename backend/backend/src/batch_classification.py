@@ -0,0 +1,200 @@
+"""Classify many patient-days at once according to the PPBV.
+
+This is the array version of the scalar functions in handle_calculations and gives exactly the same results.
+The selected care service options of all patient-days are given as a boolean matrix with one row per
+patient-day and one column per option, all other inputs as one array entry per patient-day.
+"""
+import numpy as np
+
+from .handle_calculations import (
+    ADMISSION_MINUTES,
+    BASE_MINUTES,
+    ISOLATION_BASE_MINUTES,
+    MINUTES_PER_CLASSIFICATION,
+)
+
+FIELDS = ('A', 'S')
+SEVERITIES = 5  # Severities range from 1 to 4, index 0 stays empty
+
+# Minutes of the A and S indices, indexed by [a_index, s_index]
+MINUTES_TABLE = np.zeros((SEVERITIES, SEVERITIES))
+for a_key, row in MINUTES_PER_CLASSIFICATION.items():
+    for s_key, value in row.items():
+        MINUTES_TABLE[int(a_key[1:]), int(s_key[1:])] = value
+
+# The minute values of the PPBV, alternative values can be passed for simulations
+DEFAULT_RULES = {
+    'base_minutes': BASE_MINUTES,
+    'isolation_base_minutes': ISOLATION_BASE_MINUTES,
+    'admission_minutes': ADMISSION_MINUTES,
+    'minutes_table': MINUTES_TABLE,
+}
+
+STAY_FLAGS = (
+    'is_in_isolation',
+    'is_semi_stationary',
+    'is_fully_stationary',
+    'is_day_of_admission',
+    'is_repeating_visit',
+    'has_entry_for_current_quarter',
+)
+
+
+def build_option_layout(options: list) -> dict:
+    """Map the care service options to the columns of a selection matrix.
+
+    Args:
+        options (list): The options of the question catalog, sorted by ID.
+
+    Returns:
+        dict: The option IDs per column, the category membership of each column and the field and severity
+            of each category.
+    """
+    ids = np.array([option['id'] for option in options])
+    categories = sorted({
+        (option['field__short'], option['severity'], option['category__name'])
+        for option in options
+        if option['field__short'] in FIELDS
+    })
+    category_index = {category: index for index, category in enumerate(categories)}
+
+    # Which category each option belongs to and which field and severity each category belongs to
+    option_categories = np.zeros((len(options), len(categories)), dtype=np.float32)
+    for column, option in enumerate(options):
+        key = (option['field__short'], option['severity'], option['category__name'])
+        if key in category_index:
+            option_categories[column, category_index[key]] = 1
+    category_levels = np.zeros((len(categories), len(FIELDS) * SEVERITIES), dtype=np.float32)
+    for index, (field, severity, _) in enumerate(categories):
+        category_levels[index, FIELDS.index(field) * SEVERITIES + severity] = 1
+
+    return {'ids': ids, 'option_categories': option_categories, 'category_levels': category_levels}
+
+
+def build_selection_matrix(rows: np.ndarray, option_ids: np.ndarray, row_count: int, layout: dict) -> np.ndarray:
+    """Build the selection matrix from pairs of patient-day rows and selected option IDs.
+
+    Args:
+        rows (ndarray): The row of the patient-day of each selection.
+        option_ids (ndarray): The ID of the selected option of each selection.
+        row_count (int): The number of patient-days.
+        layout (dict): The option layout of the matrix.
+
+    Returns:
+        ndarray: The boolean selection matrix.
+    """
+    columns = np.searchsorted(layout['ids'], option_ids)
+    if len(columns) and (columns.max() >= len(layout['ids']) or (layout['ids'][columns] != option_ids).any()):
+        raise ValueError("Unknown care service option in the selections.")
+    selections = np.zeros((row_count, len(layout['ids'])), dtype=bool)
+    selections[rows, columns] = True
+    return selections
+
+
+def count_categories(selections: np.ndarray, layout: dict) -> np.ndarray:
+    """Count the categories with at least one selected option per field and severity.
+
+    Args:
+        selections (ndarray): The boolean selection matrix.
+        layout (dict): The option layout of the matrix.
+
+    Returns:
+        ndarray: The number of categories, indexed by [patient-day, field, severity].
+    """
+    # Counts are small integers, so float32 is exact and lets the products use BLAS
+    used = (selections.astype(np.float32) @ layout['option_categories']) > 0
+    counts = used.astype(np.float32) @ layout['category_levels']
+    return counts.astype(np.int32).reshape(len(selections), len(FIELDS), SEVERITIES)
+
+
+def choose_general_care_groups(counts: np.ndarray, barthel_index: np.ndarray, expanded_barthel_index: np.ndarray,
+                               mini_mental_status: np.ndarray) -> np.ndarray:
+    """Assign the general care group of each patient-day, see choose_general_care_group.
+
+    Args:
+        counts (ndarray): The categories per severity of the A field, indexed by [patient-day, severity].
+        barthel_index (ndarray): The barthel index of each patient-day.
+        expanded_barthel_index (ndarray): The expanded barthel index of each patient-day.
+        mini_mental_status (ndarray): The mini mental status of each patient-day.
+
+    Returns:
+        ndarray: The general care group of each patient-day.
+    """
+    impaired = (barthel_index <= 35) | (expanded_barthel_index <= 15) | (mini_mental_status <= 16)
+    return np.select(
+        [
+            (counts[:, 4] > 1) & impaired,
+            counts[:, 3] > 1,
+            (counts[:, 2] > 0) & ((counts[:, 2] > 1) | (counts[:, 3] > 0)),
+        ],
+        [4, 3, 2],
+        default=1,
+    )
+
+
+def choose_specific_care_groups(counts: np.ndarray) -> np.ndarray:
+    """Assign the specific care group of each patient-day, see choose_specific_care_group.
+
+    Args:
+        counts (ndarray): The categories per severity of the S field, indexed by [patient-day, severity].
+
+    Returns:
+        ndarray: The specific care group of each patient-day.
+    """
+    return np.select([counts[:, 3] > 1, counts[:, 3] > 0, counts[:, 2] > 0], [4, 3, 2], default=1)
+
+
+def sum_minutes_batch(a_index: np.ndarray, s_index: np.ndarray, flags: dict, rules: dict = DEFAULT_RULES) \
+        -> np.ndarray:
+    """Sum up the minutes of each patient-day, see sum_minutes.
+
+    Args:
+        a_index (ndarray): The general care group of each patient-day.
+        s_index (ndarray): The specific care group of each patient-day.
+        flags (dict): Boolean arrays of the stay flags, missing flags count as False.
+        rules (dict, optional): The minute values to use, defaults to the ones of the PPBV.
+
+    Returns:
+        ndarray: The minutes of each patient-day.
+    """
+    false = np.zeros(len(a_index), dtype=bool)
+    flag = {name: np.asarray(flags.get(name, false), dtype=bool) for name in STAY_FLAGS}
+    semi = flag['is_semi_stationary']
+
+    minutes = (
+        np.where(flag['is_in_isolation'], rules['isolation_base_minutes'], rules['base_minutes'])
+        + rules['minutes_table'][a_index, s_index]
+    )
+    minutes = np.where(semi, minutes / 2, minutes)
+    admissions = (
+        (flag['is_fully_stationary'] & flag['is_day_of_admission']).astype(int)
+        + (semi & ~flag['is_repeating_visit'])
+        + (semi & flag['is_repeating_visit'] & ~flag['has_entry_for_current_quarter'])
+    )
+    return minutes + admissions * rules['admission_minutes']
+
+
+def classify_batch(selections: np.ndarray, layout: dict, barthel_index: np.ndarray,
+                   expanded_barthel_index: np.ndarray, mini_mental_status: np.ndarray, flags: dict) -> dict:
+    """Calculate the care groups and minutes of many patient-days, see calculate_care_minutes.
+
+    Args:
+        selections (ndarray): The boolean selection matrix.
+        layout (dict): The option layout of the matrix.
+        barthel_index (ndarray): The barthel index of each patient-day.
+        expanded_barthel_index (ndarray): The expanded barthel index of each patient-day.
+        mini_mental_status (ndarray): The mini mental status of each patient-day.
+        flags (dict): Boolean arrays of the stay flags, missing flags count as False.
+
+    Returns:
+        dict: The minutes, the general and the specific care group of each patient-day.
+    """
+    counts = count_categories(selections, layout)
+    a_index = choose_general_care_groups(
+        counts[:, FIELDS.index('A')],
+        np.asarray(barthel_index),
+        np.asarray(expanded_barthel_index),
+        np.asarray(mini_mental_status),
+    )
+    s_index = choose_specific_care_groups(counts[:, FIELDS.index('S')])
+    return {'minutes': sum_minutes_batch(a_index, s_index, flags), 'a_index': a_index, 's_index': s_index}
@@ -0,0 +1,284 @@
+"""Recompute the stored classifications of whole stations and date ranges.
+
+The classifications are recomputed with the same rules as the calculation endpoint, but in chunks with the
+batch classification engine instead of one request per patient-day. Classifications without any selected
+care service option were classified directly, their stored care groups are kept and only their minutes are
+recomputed. Like the calculation endpoint, the first repeating semi-stationary visit of a quarter without a
+used quarter entry uses it, in the order of the dates.
+"""
+import logging
+import multiprocessing
+from datetime import date
+from itertools import islice
+
+import numpy as np
+from django.db import connections, transaction
+from django.utils import timezone
+
+from ..models import DailyClassification, DailyPatientData, IsCareServiceUsed
+from .batch_classification import build_option_layout, build_selection_matrix, classify_batch, sum_minutes_batch
+from .classification_snapshot import invalidate_snapshot
+from .quarter_entries import get_quarter_entries, get_quarter_start, sync_quarter_entries
+from .question_catalog import get_catalog
+from .workload_recompute import run_recomputes
+
+logger = logging.getLogger(__name__)
+
+CLASSIFICATION_FIELDS = ('id', 'patient_id', 'date', 'is_in_isolation', 'result_minutes', 'a_index', 's_index')
+MISSING_PATIENT_DATA = {
+    'is_semi_stationary': False,
+    'is_fully_stationary': False,
+    'is_repeating_visit': False,
+    'uses_quarter_entry': False,
+    'day_of_admission': None,
+    'barthel_index': 100,
+    'expanded_barthel_index': 90,
+    'mini_mental_status': 30,
+}
+PATIENT_DATA_FIELDS = (
+    'id',
+    'patient_id',
+    'date',
+    'is_semi_stationary',
+    'is_fully_stationary',
+    'is_repeating_visit',
+    'uses_quarter_entry',
+    'day_of_admission',
+    'barthel_index',
+    'expanded_barthel_index',
+    'mini_mental_status',
+)
+
+
+def use_quarter_entries(patient_ids: list, dates: list, data: list, has_data: np.ndarray, used: set) -> tuple:
+    """Find the rows for which a quarter entry was used before and the rows which use one now.
+
+    Args:
+        patient_ids (list): The ID of the patient of each row.
+        dates (list): The date of each row.
+        data (list): The patient data of each row.
+        has_data (ndarray): Whether the row has patient data.
+        used (set): The (patient ID, first day of the quarter) of the used quarter entries, new ones are added.
+
+    Returns:
+        tuple: Whether each row has a used quarter entry, and the patient data IDs using one now.
+    """
+    has_entry = np.zeros(len(dates), dtype=bool)
+    using = []
+    for row in sorted(range(len(dates)), key=lambda row: dates[row]):
+        entry = data[row]
+        # A quarter entry used on this day is used again for the calculation
+        if entry['uses_quarter_entry']:
+            continue
+        quarter = (patient_ids[row], get_quarter_start(dates[row]))
+        if quarter in used:
+            has_entry[row] = True
+        elif has_data[row] and entry['is_semi_stationary'] and entry['is_repeating_visit']:
+            used.add(quarter)
+            using.append(entry['id'])
+    return has_entry, using
+
+
+def reclassify_chunk(station_id: int, classifications: list, layout: dict, used_quarter_entries: set) -> tuple:
+    """Recompute a chunk of classifications of one station.
+
+    Args:
+        station_id (int): The ID of the station.
+        classifications (list): The classifications as tuples of CLASSIFICATION_FIELDS.
+        layout (dict): The option layout of the selection matrix.
+        used_quarter_entries (set): The quarter entries used by earlier chunks, the ones used now are added.
+
+    Returns:
+        tuple: The changed classifications as dicts with the stored and the recomputed values, and the IDs of
+            the patient data using their quarter entry now.
+    """
+    # The selections are looked up in the sorted IDs
+    classifications = sorted(classifications)
+    ids = np.array([classification[0] for classification in classifications])
+    patient_ids = [classification[1] for classification in classifications]
+    dates = [classification[2] for classification in classifications]
+
+    selections = np.array(
+        IsCareServiceUsed.objects.filter(classification__in=ids.tolist())
+        .values_list('classification_id', 'care_service_option_id'),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    rows = np.searchsorted(ids, selections[:, 0])
+    selection_matrix = build_selection_matrix(rows, selections[:, 1], len(ids), layout)
+    has_selections = selection_matrix.any(axis=1)
+
+    patient_data = {
+        (data['patient_id'], data['date']): data
+        for data in DailyPatientData.objects.filter(
+            station=station_id, patient__in=set(patient_ids), date__gte=min(dates), date__lte=max(dates)
+        ).values(*PATIENT_DATA_FIELDS)
+    }
+    used_quarter_entries.update(get_quarter_entries(set(patient_ids), min(dates), max(dates)))
+
+    data = [patient_data.get(key) for key in zip(patient_ids, dates)]
+    has_data = np.array([entry is not None for entry in data])
+    data = [entry or MISSING_PATIENT_DATA for entry in data]
+    has_entry, using_quarter_entries = use_quarter_entries(patient_ids, dates, data, has_data, used_quarter_entries)
+    flags = {
+        'is_in_isolation': np.array([classification[3] for classification in classifications]),
+        'is_semi_stationary': np.array([entry['is_semi_stationary'] for entry in data]),
+        'is_fully_stationary': np.array([entry['is_fully_stationary'] for entry in data]),
+        'is_repeating_visit': np.array([entry['is_repeating_visit'] for entry in data]),
+        'is_day_of_admission': np.array([
+            entry['day_of_admission'] is not None and timezone.localtime(entry['day_of_admission']).date() == day
+            for entry, day in zip(data, dates)
+        ]),
+        'has_entry_for_current_quarter': has_entry,
+    }
+    result = classify_batch(
+        selection_matrix,
+        layout,
+        np.array([entry['barthel_index'] for entry in data]),
+        np.array([entry['expanded_barthel_index'] for entry in data]),
+        np.array([entry['mini_mental_status'] for entry in data]),
+        flags,
+    )
+
+    # Directly classified patient-days keep their care groups
+    stored_a = np.array([classification[5] for classification in classifications])
+    stored_s = np.array([classification[6] for classification in classifications])
+    direct = ~has_selections & (stored_a >= 1) & (stored_a <= 4) & (stored_s >= 1) & (stored_s <= 4)
+    a_index = np.where(direct, stored_a, result['a_index'])
+    s_index = np.where(direct, stored_s, result['s_index'])
+    minutes = np.where(direct, sum_minutes_batch(np.clip(stored_a, 1, 4), np.clip(stored_s, 1, 4), flags),
+                       result['minutes'])
+    # The minutes are stored as integer
+    minutes = minutes.astype(int)
+
+    # Calculated classifications need patient data, directly classified ones do not
+    valid = direct | has_data
+    changes = []
+    for row, classification in enumerate(classifications):
+        recomputed = (int(minutes[row]), int(a_index[row]), int(s_index[row]))
+        if valid[row] and recomputed != tuple(classification[4:7]):
+            changes.append({
+                'id': classification[0],
+                'patient': classification[1],
+                'date': classification[2],
+                'stored': tuple(classification[4:7]),
+                'recomputed': recomputed,
+            })
+    return changes, using_quarter_entries
+
+
+def record_quarter_entries(patient_data_ids: list) -> None:
+    """Flag the patient data as using the quarter entry and record it in the ledger, like use_quarter_entry.
+
+    Args:
+        patient_data_ids (list): The IDs of the patient data.
+    """
+    with transaction.atomic():
+        patient_data = DailyPatientData.objects.filter(id__in=patient_data_ids)
+        patient_data.update(uses_quarter_entry=True)
+        # Bulk updates do not send the save signals
+        sync_quarter_entries(patient_data)
+
+
+def reclassify_station(station_id: int, start: date, end: date, chunk_size: int, dry_run: bool) -> dict:
+    """Recompute all classifications of a station within a date range.
+
+    Args:
+        station_id (int): The ID of the station.
+        start (date): The first date to recompute.
+        end (date): The last date to recompute.
+        chunk_size (int): The number of classifications recomputed at once.
+        dry_run (bool): Only report the changes without storing them.
+
+    Returns:
+        dict: The station, the number of checked classifications and the changes.
+    """
+    layout = build_option_layout(get_catalog()['options'])
+    classifications = (
+        DailyClassification.objects.filter(station=station_id, date__gte=start, date__lte=end)
+        # In the order of the dates, so the quarter entries are used by the first visits of a quarter
+        .order_by('date', 'id')
+        .values_list(*CLASSIFICATION_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    total = DailyClassification.objects.filter(station=station_id, date__gte=start, date__lte=end).count()
+    checked = 0
+    changes = []
+    used_quarter_entries = set()
+    while chunk := list(islice(classifications, chunk_size)):
+        chunk_changes, using_quarter_entries = reclassify_chunk(station_id, chunk, layout, used_quarter_entries)
+        if not dry_run and using_quarter_entries:
+            record_quarter_entries(using_quarter_entries)
+        if not dry_run and chunk_changes:
+            with transaction.atomic():
+                DailyClassification.objects.bulk_update(
+                    [
+                        DailyClassification(
+                            id=change['id'],
+                            result_minutes=change['recomputed'][0],
+                            a_index=change['recomputed'][1],
+                            s_index=change['recomputed'][2],
+                        )
+                        for change in chunk_changes
+                    ],
+                    ['result_minutes', 'a_index', 's_index'],
+                    batch_size=chunk_size,
+                )
+        checked += len(chunk)
+        changes.extend(chunk_changes)
+        logger.info("Station %d: %d of %d classifications checked, %d changed",
+                    station_id, checked, total, len(changes))
+    return {'station': station_id, 'checked': checked, 'changes': changes}
+
+
+def reclassify_station_in_worker(arguments: tuple) -> dict:
+    """Recompute the classifications of a station in a worker process and close its connections."""
+    try:
+        return reclassify_station(*arguments)
+    finally:
+        connections.close_all()
+
+
+def reclassify(station_ids: list, start: date, end: date, workers: int = 1, chunk_size: int = 5000,
+               dry_run: bool = False, progress=None) -> list:
+    """Recompute the classifications of several stations within a date range.
+
+    The stations are distributed over a pool of worker processes. The workload of every day with a changed
+    classification is recomputed once at the end.
+
+    Args:
+        station_ids (list): The IDs of the stations.
+        start (date): The first date to recompute.
+        end (date): The last date to recompute.
+        workers (int, optional): The number of worker processes, 1 recomputes in the current process.
+        chunk_size (int, optional): The number of classifications recomputed at once.
+        dry_run (bool, optional): Only report the changes without storing them.
+        progress (callable, optional): Called with the result of every finished station.
+
+    Returns:
+        list: The result of each station with the number of checked classifications and the changes.
+    """
+    arguments = [(station_id, start, end, chunk_size, dry_run) for station_id in station_ids]
+    results = []
+    if workers == 1:
+        for argument in arguments:
+            results.append(reclassify_station(*argument))
+            if progress:
+                progress(results[-1])
+    else:
+        # Each process has to open its own database connection
+        connections.close_all()
+        with multiprocessing.Pool(workers) as pool:
+            for result in pool.imap_unordered(reclassify_station_in_worker, arguments):
+                results.append(result)
+                if progress:
+                    progress(result)
+
+    if not dry_run:
+        # Bulk updates do not send the save signals
+        invalidate_snapshot()
+        run_recomputes({
+            ('DAY', result['station'], change['date'])
+            for result in results
+            for change in result['changes']
+        })
+    return results
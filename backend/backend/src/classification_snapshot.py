@@ -0,0 +1,132 @@
+"""Keep a columnar snapshot of the classification history in memory.
+
+The snapshot holds one NumPy array per column, with one entry per classification sorted by date, so that
+whole years can be recomputed with array operations instead of per-row ORM work. Like the question catalog
+it is kept under a version key, which is replaced once a change of a classification, patient data or quarter
+entry is committed. Every process then rebuilds its snapshot on the next access. Patching the snapshot in
+place would need an atomic compare of the version across processes, which the file cache does not offer.
+"""
+import threading
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ..models import DailyClassification, DailyPatientData, QuarterEntry
+
+SNAPSHOT_VERSION_KEY = 'classification_snapshot_version'
+
+_snapshot = {'version': None, 'columns': None}
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot_version() -> str:
+    """Get the current version of the snapshot, creating one if none exists yet.
+
+    Returns:
+        str: The version key of the snapshot.
+    """
+    return cache.get_or_set(SNAPSHOT_VERSION_KEY, lambda: uuid4().hex, timeout=None)
+
+
+def invalidate_snapshot() -> None:
+    """Replace the version key once the current transaction is committed.
+
+    Replacing it only after the commit ensures that no snapshot of the new version is built from the old data.
+    """
+    transaction.on_commit(replace_snapshot_version)
+
+
+def replace_snapshot_version() -> None:
+    """Replace the version key and drop the snapshot of this process."""
+    cache.set(SNAPSHOT_VERSION_KEY, uuid4().hex, timeout=None)
+    with _snapshot_lock:
+        _snapshot['version'] = None
+
+
+def build_snapshot() -> dict:
+    """Load all completed classifications together with the stay flags of their patient data.
+
+    Returns:
+        dict: One array per column, sorted by date.
+    """
+    classifications = pd.DataFrame.from_records(
+        DailyClassification.objects.filter(a_index__range=(1, 4), s_index__range=(1, 4)).values_list(
+            'patient_id', 'station_id', 'date', 'is_in_isolation', 'result_minutes', 'a_index', 's_index'
+        ),
+        columns=['patient', 'station', 'date', 'is_in_isolation', 'result_minutes', 'a_index', 's_index'],
+    )
+    patient_data = pd.DataFrame.from_records(
+        DailyPatientData.objects.values_list(
+            'patient_id', 'station_id', 'date', 'is_semi_stationary', 'is_fully_stationary', 'is_repeating_visit',
+            'uses_quarter_entry', 'day_of_admission'
+        ),
+        columns=['patient', 'station', 'date', 'is_semi_stationary', 'is_fully_stationary', 'is_repeating_visit',
+                 'uses_quarter_entry', 'day_of_admission'],
+    )
+    for frame in (classifications, patient_data):
+        frame['date'] = pd.to_datetime(frame['date'])
+
+    # Patient-days without patient data were classified directly and have no stay flags
+    data = classifications.merge(patient_data, how='left', on=['patient', 'station', 'date'])
+    flags = ['is_semi_stationary', 'is_fully_stationary', 'is_repeating_visit', 'uses_quarter_entry']
+    data[flags] = data[flags].eq(True)
+
+    admission = pd.to_datetime(data['day_of_admission'], utc=True).dt.tz_convert(settings.TIME_ZONE)
+    data['is_day_of_admission'] = (admission.dt.tz_localize(None).dt.normalize() == data['date']).to_numpy()
+
+    # A quarter entry used on the same day is used again, otherwise any used entry of the quarter counts
+    quarter_entries = pd.DataFrame.from_records(
+        QuarterEntry.objects.values_list('patient_id', 'quarter').distinct(), columns=['patient', 'quarter']
+    )
+    quarter_entries['quarter'] = pd.to_datetime(quarter_entries['quarter'])
+    quarter_entries['has_quarter_entry'] = True
+    data['quarter'] = data['date'].dt.to_period('Q').dt.start_time
+    data = data.merge(quarter_entries, how='left', on=['patient', 'quarter'])
+    data['has_entry_for_current_quarter'] = data['has_quarter_entry'].eq(True) & ~data['uses_quarter_entry']
+
+    data = data.sort_values('date', kind='stable')
+    return {
+        'station': data['station'].to_numpy(dtype=np.int64),
+        'date': data['date'].to_numpy(dtype='datetime64[D]'),
+        'result_minutes': data['result_minutes'].to_numpy(dtype=np.int64),
+        'a_index': data['a_index'].to_numpy(dtype=np.int64),
+        's_index': data['s_index'].to_numpy(dtype=np.int64),
+        'is_in_isolation': data['is_in_isolation'].to_numpy(dtype=bool),
+        'is_semi_stationary': data['is_semi_stationary'].to_numpy(dtype=bool),
+        'is_fully_stationary': data['is_fully_stationary'].to_numpy(dtype=bool),
+        'is_day_of_admission': data['is_day_of_admission'].to_numpy(dtype=bool),
+        'is_repeating_visit': data['is_repeating_visit'].to_numpy(dtype=bool),
+        'has_entry_for_current_quarter': data['has_entry_for_current_quarter'].to_numpy(dtype=bool),
+    }
+
+
+def get_snapshot() -> dict:
+    """Get the snapshot of the current version, building it only if it is outdated.
+
+    The returned arrays are shared between requests and must not be modified.
+
+    Returns:
+        dict: One array per column, sorted by date.
+    """
+    version = get_snapshot_version()
+    with _snapshot_lock:
+        if _snapshot['version'] != version:
+            _snapshot.update(columns=build_snapshot(), version=version)
+        return _snapshot['columns']
+
+
+@receiver(post_save, sender=DailyClassification)
+@receiver(post_save, sender=DailyPatientData)
+@receiver(post_delete, sender=DailyClassification)
+@receiver(post_delete, sender=DailyPatientData)
+@receiver(post_save, sender=QuarterEntry)
+@receiver(post_delete, sender=QuarterEntry)
+def handle_classification_change(sender, **kwargs) -> None:
+    """Invalidate the snapshot whenever a classification, patient data or quarter entry is saved or deleted."""
+    invalidate_snapshot()
@@ -1,70 +1,110 @@
 """This contains endpoints to return analysis data for the frontend."""
-from django.http import JsonResponse
-from ..models import StationWorkloadDaily, Station
-from datetime import datetime, date
+from datetime import date, datetime
+from itertools import groupby
+from typing import Iterator
 
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, FilteredRelation, FloatField, Q, QuerySet, Value
+from django.db.models.functions import Cast, Coalesce, Round
+from django.http import JsonResponse, StreamingHttpResponse
 
-def get_should_vs_is_analysis(start: date, end: date) -> list:
-    """Return the should vs is analysis data for all stations.
+from ..models import Station
+from .analysis_cache import cache_analysis
+
+WEEKLY_HOURS = 38.5  # Weekly working time of a full-time caregiver
+SHIFT_HOURS = 8
+STREAM_CHUNK_SIZE = 2000  # Rows fetched from the database at once
+
+
+def get_should_vs_is_rows(start: date, end: date) -> QuerySet:
+    """Get the should and is caregivers of all stations per shift and date.
+
+    All stations are returned, stations without workload in the range with a single row without shift. The
+    conversion into caregivers per shift and the rounding are done by the database.
+
+    Args:
+        start (date): The start date for the analysis.
+        end (date): The end date for the analysis.
 
     Returns:
-        list: The should vs is analysis data for each station.
+        QuerySet: One row per station, shift and date, ordered by station, night shifts first and latest date first.
+    """
+    def rounded(expression):
+        # 0 if the value is missing
+        return Coalesce(Cast(Round(expression, 2), FloatField()), Value(0.0))
+
+    return (
+        Station.objects.annotate(
+            workload=FilteredRelation(
+                'stationworkloaddaily',
+                condition=Q(stationworkloaddaily__date__gte=start, stationworkloaddaily__date__lte=end),
+            )
+        )
+        .values('id', 'name', 'workload__shift', 'workload__date')
+        .annotate(
+            should=rounded(F('workload__PPBV_suggested_caregivers') * WEEKLY_HOURS / SHIFT_HOURS),
+            is_=rounded(F('workload__caregivers_total')),
+        )
+        .order_by('id', F('workload__shift').desc(nulls_last=True), F('workload__date').desc(nulls_last=True))
+    )
+
+
+def stream_should_vs_is_analysis(start: date, end: date) -> Iterator[str]:
+    """Encode the should vs is analysis data for all stations as JSON, one row at a time.
+
+    The rows of a station arrive with the night shifts first, so both datasets are written while the rows are
+    read and nothing is kept in memory besides the rows fetched at once.
+
+    Args:
+        start (date): The start date for the analysis.
+        end (date): The end date for the analysis.
+
+    Yields:
+        str: The next part of the JSON list.
     """
-    stations = Station.objects.all()
-    analysis_data = []
-    for station in stations:
-        workload = StationWorkloadDaily.objects.filter(
-            station=station.id,
-            date__gte=start,
-            date__lte=end,
-        ).order_by('-date').values('date', 'caregivers_total', 'PPBV_suggested_caregivers', 'shift')
-
-        # The number of caregivers needed for that shift will be returned
-        data = {
-            'station_id': station.id,
-            'station_name': station.name,
-            'dataset_night': [
-                {
-                    'date': entry['date'],
-                    'should': round(
-                        entry['PPBV_suggested_caregivers'] * 38.5 / 8, 2
-                    ) if entry['PPBV_suggested_caregivers'] else 0,
-                    'is': round(entry['caregivers_total'], 2) if entry['caregivers_total'] else 0
-                }
-                for entry in workload if entry['shift'] == 'NIGHT'
-            ],
-            'dataset_day': [
-                {
-                    'date': entry['date'],
-                    'should': round(
-                        entry['PPBV_suggested_caregivers'] * 38.5 / 8, 2
-                    ) if entry['PPBV_suggested_caregivers'] else 0,
-                    'is': round(entry['caregivers_total'], 2) if entry['caregivers_total'] else 0
-                }
-                for entry in workload if entry['shift'] == 'DAY'
-            ]
-        }
-        analysis_data.append(data)
-
-    return analysis_data
-
-
-def handle_should_vs_is_analysis(request, start: str, end: str) -> JsonResponse:
+    encoder = DjangoJSONEncoder()
+    rows = get_should_vs_is_rows(start, end).iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+    yield '['
+    for index, (station_id, station_rows) in enumerate(groupby(rows, key=lambda row: row['id'])):
+        dataset = 'dataset_night'
+        separator = ''
+        for position, row in enumerate(station_rows):
+            if position == 0:
+                header = encoder.encode({'station_id': station_id, 'station_name': row['name']})
+                yield f'{", " if index else ""}{header[:-1]}, "dataset_night": ['
+            if row['workload__shift'] is None:
+                continue
+            if row['workload__shift'] == 'DAY' and dataset == 'dataset_night':
+                dataset = 'dataset_day'
+                separator = ''
+                yield '], "dataset_day": ['
+            yield separator + encoder.encode({'date': row['workload__date'], 'should': row['should'], 'is': row['is_']})
+            separator = ', '
+        yield ']}' if dataset == 'dataset_day' else '], "dataset_day": []}'
+    yield ']'
+
+
+@cache_analysis
+def handle_should_vs_is_analysis(request, start: str, end: str) -> StreamingHttpResponse:
     """Endpoint to retrieve coordinates for the is and should occupancy on stations.
 
+    The response is streamed, so long ranges do not have to be kept in memory. Responses up to
+    ANALYSIS_CACHE_MAX_SIZE bytes are cached once they are complete.
+
     Args:
         request (HttpRequest): The request object.
         start (str): The start date for the analysis.
         end (str): The end date for the analysis.
 
     Returns:
-        JsonResponse: The response containing the should vs is analysis data.
+        StreamingHttpResponse: The response containing the should vs is analysis data.
     """
     if request.method == 'GET':
         try:
             start = datetime.strptime(start, '%Y-%m-%d').date()
             end = datetime.strptime(end, '%Y-%m-%d').date()
-            return JsonResponse(get_should_vs_is_analysis(start, end), safe=False)
+            return StreamingHttpResponse(stream_should_vs_is_analysis(start, end), content_type='application/json')
         except ValueError:
             return JsonResponse({'error': 'Invalid date format. Please use YYYY-MM-DD.'}, status=400)
     else:
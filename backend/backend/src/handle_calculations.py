@@ -1,59 +1,112 @@
 """Calculate the minutes each patient should receive care services."""
 from datetime import date, datetime
 
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
 from django.http import JsonResponse
 from django.utils import timezone
 
-from ..models import DailyClassification, DailyPatientData, Patient, Station
+from ..models import (
+    DailyClassification,
+    DailyPatientData,
+    Patient,
+    Station,
+    StationWorkloadDaily,
+)
+from .analysis_cache import invalidate_workload
 from .handle_questions import get_questions
-from cronjobs.src.daily_calculation_cronjob import calculate_minutes_per_station
-from cronjobs.src.monthly_calc_cronjob import calculate_total_minutes_per_station
+from .quarter_entries import has_quarter_entry, use_quarter_entry
+from .workload_recompute import schedule_recompute
+
+MINUTES_PER_FULLTIME_EQUIVALENT = 38.5 * 60  # Weekly working time of a full-time caregiver
+
+BASE_MINUTES = 33  # Base value (§ 4 (2) 1. and  § 12 Absatz 1 Satz 1)
+ISOLATION_BASE_MINUTES = 123  # Base value for isolation (§ 4 (2) 2. and § 12 Absatz 1 Satz 2)
+ADMISSION_MINUTES = 75  # Surcharge for the admission (§ 4 (2) 3. and § 12 Absatz 3)
+
+# Data taken from the PPBV (§ 12 Absatz 4 Satz 1)
+MINUTES_PER_CLASSIFICATION = {
+    "A1": {
+        "S1": 59,
+        "S2": 76,
+        "S3": 112,
+        "S4": 151
+    },
+    "A2": {
+        "S1": 114,
+        "S2": 131,
+        "S3": 167,
+        "S4": 206
+    },
+    "A3": {
+        "S1": 203,
+        "S2": 220,
+        "S3": 256,
+        "S4": 295
+    },
+    "A4": {
+        "S1": 335,
+        "S2": 352,
+        "S3": 388,
+        "S4": 427
+    }
+}
 
 
-def recompute_station_data(station_id: int, date: date) -> None:
-    """In case of a change in the patient's data, the daily/monthly data has to be recomputed.
+def apply_minutes_delta(station_id: int, date: date, delta: int) -> None:
+    """Apply the change of a classification's minutes to the daily workload of its station.
 
-    Additionally once all patients are classified for the day, the daily data has to be recomputed.
-    Same goes for the monthly data.
+    The daily workload row is updated in place, so the cost does not depend on the number of patients. The
+    monthly workload and daily rows which do not exist yet are recomputed by the recompute scheduler, which
+    merges the recomputations of all classifications saved within its debounce window.
 
     Args:
         station_id (int): The ID of the station.
         date (date): The date of the classification.
+        delta (int): The difference between the new and the previous minutes of the classification.
     """
-    date = datetime.strptime(date, "%Y-%m-%d").date()
-    station = Station.objects.get(id=station_id)
+    if delta == 0:
+        return
+
+    with transaction.atomic():
+        # Imported shift data might have created the daily row without minutes
+        daily_minutes = Coalesce(F('minutes_total'), 0) + delta
+        updated = StationWorkloadDaily.objects.filter(station=station_id, date=date, shift='DAY').update(
+            minutes_total=daily_minutes,
+            PPBV_suggested_caregivers=daily_minutes / MINUTES_PER_FULLTIME_EQUIVALENT,
+        )
+        if updated:
+            invalidate_workload()
+        schedule_recompute(station_id, date, daily=not updated)
 
-    # Check if all patients are classified for the day (compare daily patient data and daily classification)
-    classifications_daily = DailyClassification.objects.filter(
-        station=station,
-        date=date,
-    )
-    patients_daily = DailyPatientData.objects.filter(
-        station=station,
-        date=date,
-    )
-    recompute_daily = classifications_daily.count() >= patients_daily.count()
 
-    # Recompute the daily data if the date is in the past or all patients are classified
-    if date < datetime.now().date() or recompute_daily:
-        calculate_minutes_per_station(station, date)
+def save_classification_result(classification: DailyClassification, date: date, minutes: int, a_index: int,
+                               s_index: int) -> None:
+    """Store the result of a classification and apply the change of its minutes to the daily workload.
 
-    # Check if all patients are classified for the month (compare monthly patient data and monthly classification)
-    classifications_monthly = DailyClassification.objects.filter(
-        station=station,
-        date__month=date.month,
-        date__year=date.year,
-    )
-    patients_monthly = DailyPatientData.objects.filter(
-        station=station,
-        date__month=date.month,
-        date__year=date.year,
-    )
-    recompute_monthly = classifications_monthly.count() >= patients_monthly.count()
+    The classification is locked while its stored minutes are read, so concurrent submissions for the same
+    classification apply their changes one after the other instead of both starting from the same minutes.
+
+    Args:
+        classification (DailyClassification): The classification to update.
+        date (date): The date of the classification.
+        minutes (int): The calculated minutes.
+        a_index (int): The index of the general care group.
+        s_index (int): The index of the specific care group.
+    """
+    with transaction.atomic():
+        previous_minutes = DailyClassification.objects.select_for_update().values_list(
+            'result_minutes', flat=True
+        ).get(id=classification.id)
+        classification.result_minutes = minutes
+        classification.a_index = a_index
+        classification.s_index = s_index
+        classification.save()
 
-    # Recompute the monthly data if the month is over
-    if (date.month < datetime.now().month and date.year <= datetime.now().year) or recompute_monthly:
-        calculate_total_minutes_per_station(station, date, 'DAY')
+        # Keep the daily and monthly data of the station up to date
+        # The minutes are stored as integer, so the delta has to be computed from the stored value
+        apply_minutes_delta(classification.station_id, date, int(minutes) - previous_minutes)
 
 
 def group_and_count_data(data: list) -> dict:
@@ -155,32 +208,14 @@ def choose_specific_care_group(data: dict) -> int:
 def has_entry_for_current_quarter(patient_id: int, date: str) -> bool:
     """Check if there is already an entry for the current quarter.
 
+    Args:
+        patient_id (int): The ID of the patient.
+        date (str): The date of the classification ('YYYY-MM-DD').
+
     Returns:
         bool: True if there is already an entry for the current quarter, False otherwise.
     """
-    # Find the current quarter
-    q_1 = (1, 2, 3)
-    q_2 = (4, 5, 6)
-    q_3 = (7, 8, 9)
-    q_4 = (10, 11, 12)
-    date = datetime.strptime(date, "%Y-%m-%d").date()
-    if date.month in q_1:
-        quarter = q_1
-    elif date.month in q_2:
-        quarter = q_2
-    elif date.month in q_3:
-        quarter = q_3
-    else:
-        quarter = q_4
-
-    # Check if there is already an entry for the current quarter of this year
-    entry = DailyPatientData.objects.filter(
-        patient=patient_id,
-        date__year=date.year,
-        date__month__in=quarter,
-        uses_quarter_entry=True
-    ).first()
-    return entry is not None
+    return has_quarter_entry(patient_id, datetime.strptime(date, "%Y-%m-%d").date())
 
 
 def sum_minutes(a_value: str, s_value: str, body: dict) -> int:
@@ -196,38 +231,11 @@ def sum_minutes(a_value: str, s_value: str, body: dict) -> int:
     """
     # In case of a day of discharge, half the minutes_per_classification of the previous day are used (§ 12 (2)).
     # TODO: Issue
-    minutes = 33  # Base value (§ 4 (2) 1. and  § 12 Absatz 1 Satz 1)
+    minutes = BASE_MINUTES
     if body.get("is_in_isolation", False):
-        minutes = 123  # Base value for isolation (§ 4 (2) 2. and § 12 Absatz 1 Satz 2)
-
-    # Data taken from the PPBV (§ 12 Absatz 4 Satz 1)
-    minutes_per_classification = {
-        "A1": {
-            "S1": 59,
-            "S2": 76,
-            "S3": 112,
-            "S4": 151
-        },
-        "A2": {
-            "S1": 114,
-            "S2": 131,
-            "S3": 167,
-            "S4": 206
-        },
-        "A3": {
-            "S1": 203,
-            "S2": 220,
-            "S3": 256,
-            "S4": 295
-        },
-        "A4": {
-            "S1": 335,
-            "S2": 352,
-            "S3": 388,
-            "S4": 427
-        }
-    }
-    minutes += minutes_per_classification[f'A{a_value}'][f'S{s_value}']
+        minutes = ISOLATION_BASE_MINUTES
+
+    minutes += MINUTES_PER_CLASSIFICATION[f'A{a_value}'][f'S{s_value}']
 
     if body.get("is_semi_stationary", False):
         minutes /= 2  # Only use half of the minutes (§ 4 (2) 3.)
@@ -236,11 +244,11 @@ def sum_minutes(a_value: str, s_value: str, body: dict) -> int:
     if body.get("is_fully_stationary", False) and body.get(
         "is_day_of_admission", False
     ):
-        minutes += 75
+        minutes += ADMISSION_MINUTES
     if body.get("is_semi_stationary", False) and not body.get(
         "is_repeating_visit", False
     ):
-        minutes += 75
+        minutes += ADMISSION_MINUTES
 
     # Repeating visits due to same illness lead to less minutes for admission (§ 4 (2) 4. Satz 2)
     if (
@@ -248,7 +256,7 @@ def sum_minutes(a_value: str, s_value: str, body: dict) -> int:
         and body.get("is_repeating_visit", False)
         and not body.get("has_entry_for_current_quarter", False)
     ):
-        minutes += 75
+        minutes += ADMISSION_MINUTES
 
     return minutes
 
@@ -336,7 +344,7 @@ def calculate_result(station_id: int, patient_id: int, date: date) -> dict:
                 and entries['is_repeating_visit']
                 and not entries['has_entry_for_current_quarter']):
             # The extra minutes will be used for the repeating visit
-            patient_data['is_repeating_visit'] = True
+            use_quarter_entry(patient_data['id'], patient_id, datetime_date)
     else:
         # Use the quarter entry again for the calculation since it is already used for the patient on this day
         entries['has_entry_for_current_quarter'] = False
@@ -345,13 +353,7 @@ def calculate_result(station_id: int, patient_id: int, date: date) -> dict:
     minutes_to_take_care, a_index, s_index = calculate_care_minutes(entries)
 
     # Update the classification with the new minutes
-    classification.result_minutes = minutes_to_take_care
-    classification.a_index = a_index
-    classification.s_index = s_index
-    classification.save()
-
-    # Check for possible recomputation of daily and monthly data
-    recompute_station_data(station_id, date)
+    save_classification_result(classification, datetime_date, minutes_to_take_care, a_index, s_index)
 
     return {'minutes': minutes_to_take_care, 'category1': a_index, 'category2': s_index}
 
@@ -426,7 +428,7 @@ def calculate_direct_classification(
                 and not direct_classification_data["has_entry_for_current_quarter"]
             ):
                 # The extra minutes will be used for the repeating visit
-                patient_data["is_repeating_visit"] = True
+                use_quarter_entry(patient_data["id"], patient_id, datetime_date)
         else:
             # Use the quarter entry again for the calculation since it is already used for the patient on this day
             direct_classification_data["has_entry_for_current_quarter"] = False
@@ -435,13 +437,9 @@ def calculate_direct_classification(
     minutes_to_take_care = sum_minutes(a_value, s_value, direct_classification_data)
 
     # Update dailyClassification
-    classification.result_minutes = minutes_to_take_care
-    classification.a_index = a_value
-    classification.s_index = s_value
-    classification.save()
-
-    # Check for possible recomputation of daily and monthly data
-    recompute_station_data(station_id, date)
+    save_classification_result(
+        classification, datetime.strptime(date, "%Y-%m-%d").date(), minutes_to_take_care, a_value, s_value
+    )
 
     return {"minutes": minutes_to_take_care, "category1": a_value, "category2": s_value}
 
@@ -1,188 +1,394 @@
 """Provide the endpoints for handling data imports."""
 
-from io import BytesIO
+import logging
+import os
+import resource
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Callable, Iterator
+from django.conf import settings
+from django.db import transaction
 from django.http import JsonResponse
+import numpy as np
 import pandas as pd
+from openpyxl import load_workbook
 from ..models import Patient, DailyPatientData, Station, StationWorkloadMonthly, StationWorkloadDaily
-from datetime import datetime, date, timedelta
+from .analysis_cache import invalidate_workload
+from .classification_snapshot import invalidate_snapshot
+from datetime import date
 from django.utils import timezone
 
+logger = logging.getLogger(__name__)
 
-def is_night_stay(date: date, admission_date: datetime, discharge_date: datetime) -> bool:
-    """Check if the patient's stay includes time in night shift.
+IMPORT_BATCH_SIZE = 1000  # Rows per bulk insert
+UPLOAD_COPY_BUFFER_SIZE = 64 * 1024  # Bytes copied at once from the request into the spooled upload
+MEMORY_SAMPLE_INTERVAL = 0.05  # Seconds between two samples of the memory usage during an import
+
+MONTH_NUMBERS = {
+    'Januar': 1,
+    'Februar': 2,
+    'März': 3,
+    'April': 4,
+    'Mai': 5,
+    'Juni': 6,
+    'Juli': 7,
+    'August': 8,
+    'September': 9,
+    'Oktober': 10,
+    'November': 11,
+    'Dezember': 12
+}
+
+
+def is_night_stay(dates: pd.Series, admission_dates: pd.Series, discharge_dates: pd.Series) -> pd.Series:
+    """Check for each row if the patient's stay includes time in night shift.
+
+    Args:
+        dates (Series): The dates to calculate this for.
+        admission_dates (Series): The datetimes of the patients' admission.
+        discharge_dates (Series): The datetimes of the patients' discharge.
+
+    Returns:
+        Series: True if the patient stayed overnight, False otherwise.
+    """
+    night_start = dates + pd.Timedelta(hours=22)
+    night_end = dates + pd.Timedelta(hours=6)
+    return (((admission_dates <= night_start) & (night_start <= discharge_dates))
+            | ((admission_dates >= night_start) & (discharge_dates <= night_end)))
+
+
+def is_day_stay(dates: pd.Series, admission_dates: pd.Series, discharge_dates: pd.Series) -> pd.Series:
+    """Check for each row if the patient's stay includes time in day shift.
 
     Args:
-        date (date): The date to calculate this for.
-        admission_date (datetime): The datetime of the patient's admission.
-        discharge_date (datetime): The datetime of the patient's discharge.
+        dates (Series): The dates to calculate this for.
+        admission_dates (Series): The datetimes of the patients' admission.
+        discharge_dates (Series): The datetimes of the patients' discharge.
 
     Returns:
-        bool: True if the patient stayed overnight, False otherwise.
+        Series: True if the patient stayed during the day, False otherwise.
     """
-    night_start = timezone.make_aware(datetime.combine(date, datetime.min.time()) + timedelta(hours=22))
-    night_end = timezone.make_aware(datetime.combine(date, datetime.min.time()) + timedelta(hours=6))
-    admission_date = timezone.make_aware(admission_date)
-    discharge_date = timezone.make_aware(discharge_date)
-    if ((admission_date <= night_start <= discharge_date)
-            or (admission_date >= night_start and discharge_date <= night_end)):
-        return True
-    return False
+    day_start = dates + pd.Timedelta(hours=6)
+    day_end = dates + pd.Timedelta(hours=22)
+    return (((admission_dates <= day_start) & (day_start <= discharge_dates))
+            | ((admission_dates >= day_start) & (discharge_dates <= day_end)))
 
 
-def is_day_stay(date: date, admission_date: datetime, discharge_date: datetime) -> bool:
-    """Check if the patient's stay includes time in day shift.
+def make_aware(datetimes: pd.Series) -> pd.Series:
+    """Attach the current timezone to naive datetimes, resolving ambiguous times like Django's make_aware.
 
     Args:
-        date (date): The date to calculate this for.
-        admission_date (datetime): The datetime of the patient's admission.
-        discharge_date (datetime): The datetime of the patient's discharge.
+        datetimes (Series): The naive datetimes.
 
     Returns:
-        bool: True if the patient stayed during the day, False otherwise.
+        Series: The timezone aware datetimes.
+    """
+    return datetimes.dt.tz_localize(timezone.get_current_timezone(), ambiguous=True, nonexistent='shift_forward')
+
+
+def get_station_ids(station_names: pd.Series) -> pd.Series:
+    """Resolve station names to their IDs with a single query.
+
+    Args:
+        station_names (Series): The names of the stations.
+
+    Returns:
+        Series: The IDs of the stations.
+    """
+    names = station_names.unique().tolist()
+    station_ids = dict(Station.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = [name for name in names if name not in station_ids]
+    if missing:
+        raise ValueError(f"Stations not found: {', '.join(map(str, missing))}")
+    return station_names.map(station_ids)
+
+
+def create_missing_patients(df: pd.DataFrame) -> None:
+    """Create all patients of the DataFrame which do not exist yet with a single bulk insert.
+
+    Args:
+        df (DataFrame): The DataFrame containing the patient data.
     """
-    day_start = timezone.make_aware(datetime.combine(date, datetime.min.time()) + timedelta(hours=6))
-    day_end = timezone.make_aware(datetime.combine(date, datetime.min.time()) + timedelta(hours=22))
-    admission_date = timezone.make_aware(admission_date)
-    discharge_date = timezone.make_aware(discharge_date)
-    if ((admission_date <= day_start <= discharge_date)
-            or (admission_date >= day_start and discharge_date <= day_end)):
-        return True
-    return False
+    patients = df.drop_duplicates('Patienten-ID')
+    existing_ids = set(
+        Patient.objects.filter(id__in=patients['Patienten-ID'].tolist()).values_list('id', flat=True)
+    )
+    patients = patients[~patients['Patienten-ID'].isin(existing_ids)]
+    Patient.objects.bulk_create([
+        Patient(id=patient_id, first_name=first_name, last_name=last_name)
+        for patient_id, first_name, last_name in zip(
+            patients['Patienten-ID'].tolist(), patients['Vorname'].tolist(), patients['Nachname'].tolist()
+        )
+    ], batch_size=IMPORT_BATCH_SIZE)
 
 
-def insert_patient_excel_into_db(df: pd.DataFrame) -> None:
+def insert_patient_excel_into_db(df: pd.DataFrame) -> int:
     """Insert patient data from an excel file into the database.
 
+    All flags are derived column-wise and the rows are written with batched bulk inserts in one transaction.
+
     Args:
         df (DataFrame): The DataFrame containing the patient data.
+
+    Returns:
+        int: The number of imported rows.
     """
-    for _, row in df.iterrows():
-        # Create missing patients
-        first_name = row['Vorname']
-        last_name = row['Nachname']
-        patient_id = row['Patienten-ID']
-        date = row['Datum'].date()
-        # Check if patient already exists
-        if not Patient.objects.filter(id=patient_id).exists():
-            Patient.objects.create(
-                id=patient_id,
-                first_name=first_name,
-                last_name=last_name
-            )
-
-        # Add daily data
-        DailyPatientData.objects.create(
-            patient=Patient.objects.get(id=patient_id),
-            station=Station.objects.get(name=row['Stationsname']),
-            date=date,
-            is_semi_stationary=row['Teilstationär'] == 'Ja',
-            is_fully_stationary=row['Vollstationär'] == 'Ja',
-            day_of_admission=timezone.make_aware(row['Aufnahmetag']),
-            day_of_discharge=timezone.make_aware(row['Entlassungstag']),
-            is_repeating_visit=row['Wiederkehrend'] == 'Ja',
-            night_stay=is_night_stay(date, row['Aufnahmetag'], row['Entlassungstag']),
-            day_stay=is_day_stay(date, row['Aufnahmetag'], row['Entlassungstag']),
-            room_name=row['Zimmer'],
-            bed_number=row['Bett'],
-            barthel_index=row['Barthel-Index'],
-            expanded_barthel_index=row['Erweiterter Barthel-Index'],
-            mini_mental_status=row['Mini-Mental-Status-Test']
+    dates = df['Datum'].dt.normalize()
+    data = pd.DataFrame({
+        'patient_id': df['Patienten-ID'],
+        'station_id': get_station_ids(df['Stationsname']),
+        'date': dates.dt.date,
+        'is_semi_stationary': df['Teilstationär'] == 'Ja',
+        'is_fully_stationary': df['Vollstationär'] == 'Ja',
+        'day_of_admission': make_aware(df['Aufnahmetag']),
+        'day_of_discharge': make_aware(df['Entlassungstag']),
+        'is_repeating_visit': df['Wiederkehrend'] == 'Ja',
+        'night_stay': is_night_stay(dates, df['Aufnahmetag'], df['Entlassungstag']),
+        'day_stay': is_day_stay(dates, df['Aufnahmetag'], df['Entlassungstag']),
+        'room_name': df['Zimmer'].astype(str),
+        'bed_number': df['Bett'].astype(str),
+        'barthel_index': df['Barthel-Index'],
+        'expanded_barthel_index': df['Erweiterter Barthel-Index'],
+        'mini_mental_status': df['Mini-Mental-Status-Test'],
+    })
+
+    with transaction.atomic():
+        create_missing_patients(df)
+        DailyPatientData.objects.bulk_create(
+            [DailyPatientData(**row) for row in data.to_dict('records')],
+            batch_size=IMPORT_BATCH_SIZE,
         )
+    # The imported rows never use a quarter entry, so the ledger stays as it is despite the bulk insert
+    invalidate_snapshot()
+    return len(data)
 
 
-def get_month_number(month: str) -> int:
-    """Get the number of the month from its name.
+def read_excel_chunks(file: BinaryIO, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Read the first sheet of an excel file row by row and yield it in chunks.
+
+    The workbook is opened in read-only mode, so only the current chunk is held in memory.
 
     Args:
-        month (str): The name of the month.
+        file (BinaryIO): The excel file.
+        chunk_size (int): The maximum number of rows per chunk.
+
+    Yields:
+        DataFrame: The next rows of the sheet with the first row as column names.
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        columns = next(rows, None)
+        chunk = []
+        for row in rows:
+            # Skip blank lines like pandas does
+            if all(value is None for value in row):
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield pd.DataFrame(chunk, columns=columns)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+
+def get_resident_memory() -> int:
+    """Get the memory currently used by the process.
 
     Returns:
-        int: The number of the month.
-    """
-    matchings = {
-        'Januar': 1,
-        'Februar': 2,
-        'März': 3,
-        'April': 4,
-        'Mai': 5,
-        'Juni': 6,
-        'Juli': 7,
-        'August': 8,
-        'September': 9,
-        'Oktober': 10,
-        'November': 11,
-        'Dezember': 12
-    }
-    return matchings[month]
-
-
-def add_monthly_data(row: pd.Series) -> None:
-    """Add the monthly data to the database.
+        int: The resident set size in bytes, the peak resident set size where it is not available.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def track_peak_memory() -> Iterator[dict]:
+    """Measure the peak memory of the process while the context is active.
+
+    The memory is sampled in a background thread, which unlike tracing every allocation does not slow
+    down the import itself.
+
+    Yields:
+        dict: Contains the peak memory in bytes once the context is left.
+    """
+    usage = {'peak_memory_bytes': get_resident_memory()}
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(MEMORY_SAMPLE_INTERVAL):
+            usage['peak_memory_bytes'] = max(usage['peak_memory_bytes'], get_resident_memory())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield usage
+    finally:
+        done.set()
+        sampler.join()
+        usage['peak_memory_bytes'] = max(usage['peak_memory_bytes'], get_resident_memory())
+
+
+def run_chunked_import(file: BinaryIO, insert_chunk: Callable[[pd.DataFrame], int], chunk_size: int) -> dict:
+    """Stream an excel file in chunks into the database within one transaction.
 
     Args:
-        row (Series): The row containing the data.
-    """
-    station = Station.objects.get(name=f'Station {str(row["Station"]).strip()}')
-    date = datetime.strptime(f"{get_month_number(row['Monat'])} {timezone.now().year}", "%m %Y").date()
-    shift = 'DAY' if ('Tag' == row['Schicht']) else 'NIGHT'
-    average_caregiver = float(
-        row['Durchschnittliche\nPflegepersonalausstattung\nPflegefachkräfte'].replace(',', '.'))
-    average_caregiver_helper = float(
-        row['Durchschnittliche\nPflegepersonalausstattung\nPflegehilfskräfte'].replace(',', '.'))
-    average_midwife = float(row['Durchschnittliche\nPflegepersonalausstattung\nHebammen'].replace(',', '.'))
-    average_total = average_caregiver + average_caregiver_helper + average_midwife
-    average_patient = float(row['Durchschnittliche\nPatientenbelegung'].replace(',', '.'))
-
-    # Insert data into monthly table
-    StationWorkloadMonthly.objects.update_or_create(
-        station=station,
-        month=date,
-        shift=shift,
-        defaults={
-            'actual_caregivers_avg': average_total,
-            'patients_avg': average_patient
-        }
+        file (BinaryIO): The excel file.
+        insert_chunk (Callable): Writes one chunk into the database and returns the number of rows.
+        chunk_size (int): The maximum number of rows per chunk.
+
+    Returns:
+        dict: The number of imported rows, the throughput in rows per second and the peak memory in bytes.
+    """
+    started = time.perf_counter()
+    rows = 0
+    with track_peak_memory() as memory, transaction.atomic():
+        for chunk in read_excel_chunks(file, chunk_size):
+            rows += insert_chunk(chunk)
+
+    duration = time.perf_counter() - started
+    rows_per_second = round(rows / duration, 1) if duration else 0
+    logger.info(
+        "Imported %d rows in %.2f s (%.1f rows/s), peak memory %.1f MiB",
+        rows, duration, rows_per_second, memory['peak_memory_bytes'] / 2 ** 20
     )
+    return {'rows': rows, 'rows_per_second': rows_per_second, **memory}
 
 
-def add_daily_data(row: pd.Series) -> None:
-    """Add the daily data to the database.
+@contextmanager
+def spool_request_body(request) -> Iterator[BinaryIO]:
+    """Copy the uploaded file from the request stream into a temporary file.
+
+    Small uploads stay in memory, larger ones are moved to disk, so the upload is never loaded at once.
+
+    Args:
+        request (HttpRequest): The request object.
+
+    Yields:
+        BinaryIO: The uploaded file.
+    """
+    with SpooledTemporaryFile(max_size=settings.IMPORT_SPOOL_MAX_SIZE) as file:
+        shutil.copyfileobj(request, file, UPLOAD_COPY_BUFFER_SIZE)
+        file.seek(0)
+        yield file
+
+
+def parse_decimal(column: pd.Series) -> pd.Series:
+    """Parse a column of German decimal strings like '12,5'.
+
+    Args:
+        column (Series): The column to parse.
+
+    Returns:
+        Series: The parsed numbers.
+    """
+    return column.astype(str).str.strip().str.replace(',', '.', regex=False).astype(float)
+
+
+def upsert_workload(model, rows: pd.DataFrame, period_field: str, update_fields: list) -> int:
+    """Insert or update all rows of a workload table with batched bulk upserts.
+
+    If a station, period and shift occur multiple times, the last row wins.
 
     Args:
-        row (Series): The row containing the data.
-    """
-    station = Station.objects.get(name=f'Station {str(row["Station"]).strip()}')
-    date = row['Datum'].date()
-    shift = 'DAY' if ('Tag' == row['Schicht']) else 'NIGHT'
-    total_caregiver = float(row['Summe\nPflegefachkräfte'].replace(',', '.'))
-    total_caregiver_helper = float(row['Summe\nPflegehilfskräfte'].replace(',', '.'))
-    total_midwife = float(row['Summe\nHebammen'].replace(',', '.'))
-    total_caregivers = total_caregiver + total_caregiver_helper + total_midwife
-    total_patient = float(row['Summe\nPatientenbelegung'].replace(',', '.'))
-
-    # Insert data into daily table
-    StationWorkloadDaily.objects.update_or_create(
-        station=station,
-        date=date,
-        shift=shift,
-        defaults={
-            'caregivers_total': total_caregivers,
-            'patients_total': total_patient
-        }
+        model (Model): StationWorkloadDaily or StationWorkloadMonthly.
+        rows (DataFrame): The rows with the columns of the model.
+        period_field (str): The field of the model identifying the day or month.
+        update_fields (list): The fields overwritten if the row already exists.
+
+    Returns:
+        int: The number of upserted rows.
+    """
+    unique_fields = ['station_id', period_field, 'shift']
+    rows = rows.drop_duplicates(unique_fields, keep='last')
+    model.objects.bulk_create(
+        [model(**row) for row in rows.to_dict('records')],
+        batch_size=IMPORT_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['station', period_field, 'shift'],
+        update_fields=update_fields,
     )
+    # Bulk upserts do not send the save signals
+    invalidate_workload()
+    return len(rows)
+
+
+def insert_monthly_data(df: pd.DataFrame) -> int:
+    """Add the monthly data to the database.
+
+    Args:
+        df (DataFrame): The DataFrame containing the monthly data.
 
+    Returns:
+        int: The number of upserted rows.
+    """
+    months = df['Monat'].map(MONTH_NUMBERS)
+    if months.isna().any():
+        raise ValueError(f"Invalid months: {', '.join(df['Monat'][months.isna()].astype(str).unique())}")
+    year = timezone.now().year
+    rows = pd.DataFrame({
+        'station_id': get_station_ids('Station ' + df['Station'].astype(str).str.strip()),
+        'month': [date(year, month, 1) for month in months],
+        'shift': np.where(df['Schicht'] == 'Tag', 'DAY', 'NIGHT'),
+        'actual_caregivers_avg': (
+            parse_decimal(df['Durchschnittliche\nPflegepersonalausstattung\nPflegefachkräfte'])
+            + parse_decimal(df['Durchschnittliche\nPflegepersonalausstattung\nPflegehilfskräfte'])
+            + parse_decimal(df['Durchschnittliche\nPflegepersonalausstattung\nHebammen'])
+        ),
+        'patients_avg': parse_decimal(df['Durchschnittliche\nPatientenbelegung']),
+        'minutes_total': 0,  # Only used for new rows, the minutes are computed from the classifications
+    })
+    return upsert_workload(StationWorkloadMonthly, rows, 'month', ['actual_caregivers_avg', 'patients_avg'])
+
+
+def insert_daily_data(df: pd.DataFrame) -> int:
+    """Add the daily data to the database.
+
+    Args:
+        df (DataFrame): The DataFrame containing the daily data.
 
-def insert_caregiver_shift_excel_into_db(df: pd.DataFrame) -> None:
+    Returns:
+        int: The number of upserted rows.
+    """
+    rows = pd.DataFrame({
+        'station_id': get_station_ids('Station ' + df['Station'].astype(str).str.strip()),
+        'date': df['Datum'].dt.date,
+        'shift': np.where(df['Schicht'] == 'Tag', 'DAY', 'NIGHT'),
+        'caregivers_total': (
+            parse_decimal(df['Summe\nPflegefachkräfte'])
+            + parse_decimal(df['Summe\nPflegehilfskräfte'])
+            + parse_decimal(df['Summe\nHebammen'])
+        ),
+        'patients_total': parse_decimal(df['Summe\nPatientenbelegung']).astype(int),
+    })
+    return upsert_workload(StationWorkloadDaily, rows, 'date', ['caregivers_total', 'patients_total'])
+
+
+def insert_caregiver_shift_excel_into_db(df: pd.DataFrame) -> int:
     """Insert caregiver shift data from an excel file into the database.
 
+    The file either contains daily (using a date) or monthly (using a month) data.
+
     Args:
         df (DataFrame): The DataFrame containing the caregiver shift data.
+
+    Returns:
+        int: The number of imported rows.
     """
-    for _, row in df.iterrows():
-        if 'Monat' in row.keys():
-            add_monthly_data(row)
+    with transaction.atomic():
+        if 'Monat' in df.columns:
+            insert_monthly_data(df)
         else:
-            add_daily_data(row)
+            insert_daily_data(df)
+    return len(df)
 
 
 def handle_patient_data_import(request) -> JsonResponse:
@@ -198,12 +404,11 @@ def handle_patient_data_import(request) -> JsonResponse:
     """
     if request.method == 'POST':
         try:
-            file = BytesIO(request.body)
-            df = pd.read_excel(file, engine='openpyxl')
-            insert_patient_excel_into_db(df)
-            return JsonResponse({'message': 'File processed successfully'})
+            with spool_request_body(request) as file:
+                statistics = run_chunked_import(file, insert_patient_excel_into_db, settings.IMPORT_CHUNK_SIZE)
+            return JsonResponse({'message': 'File processed successfully', **statistics})
         except Exception as e:
-            print('Error', e)
+            logger.exception("Importing the excel file failed")
             return JsonResponse({'error': str(e)}, status=400)
     else:
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -223,10 +428,11 @@ def handle_caregiver_shift_import(request) -> JsonResponse:
     """
     if request.method == 'POST':
         try:
-            file = BytesIO(request.body)
-            df = pd.read_excel(file, engine='openpyxl')
-            insert_caregiver_shift_excel_into_db(df)
-            return JsonResponse({'message': 'File processed successfully'})
+            with spool_request_body(request) as file:
+                statistics = run_chunked_import(
+                    file, insert_caregiver_shift_excel_into_db, settings.IMPORT_CHUNK_SIZE
+                )
+            return JsonResponse({'message': 'File processed successfully', **statistics})
         except Exception as e:
-            print('Error', e)
+            logger.exception("Importing the excel file failed")
             return JsonResponse({'error': str(e)}, status=400)
@@ -0,0 +1,199 @@
+"""Export the station workload and the classification history as CSV or excel files.
+
+The rows are read from the database in chunks and written out one by one, so the memory does not depend on the
+length of the exported range. CSV files are streamed directly and compressed with gzip if the client accepts it.
+Excel files are built with a write-only workbook in a temporary file, which is then streamed as well.
+"""
+import csv
+from datetime import date
+from tempfile import TemporaryFile
+from typing import Iterator
+
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.gzip import gzip_page
+from openpyxl import Workbook
+
+from ..models import DailyClassification, StationWorkloadDaily, StationWorkloadMonthly
+
+EXPORT_CHUNK_SIZE = 2000  # Rows fetched from the database at once
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+# The exported model, the field filtered by the date range and the header and field of each column
+EXPORTS = {
+    'daily': {
+        'model': StationWorkloadDaily,
+        'date_field': 'date',
+        'columns': [
+            ('Station-ID', 'station_id'),
+            ('Station', 'station__name'),
+            ('Datum', 'date'),
+            ('Schicht', 'shift'),
+            ('Patienten', 'patients_total'),
+            ('Pflegekräfte', 'caregivers_total'),
+            ('Minuten', 'minutes_total'),
+            ('Pflegekräfte nach PPBV', 'PPBV_suggested_caregivers'),
+        ],
+    },
+    'monthly': {
+        'model': StationWorkloadMonthly,
+        'date_field': 'month',
+        'columns': [
+            ('Station-ID', 'station_id'),
+            ('Station', 'station__name'),
+            ('Monat', 'month'),
+            ('Schicht', 'shift'),
+            ('Patienten (Durchschnitt)', 'patients_avg'),
+            ('Pflegekräfte (Durchschnitt)', 'actual_caregivers_avg'),
+            ('Pflegekräfte nach PPBV (Durchschnitt)', 'suggested_caregivers_avg'),
+            ('Minuten', 'minutes_total'),
+        ],
+    },
+    'classifications': {
+        'model': DailyClassification,
+        'date_field': 'date',
+        'columns': [
+            ('Station-ID', 'station_id'),
+            ('Station', 'station__name'),
+            ('Patient', 'patient_id'),
+            ('Datum', 'date'),
+            ('Isolation', 'is_in_isolation'),
+            ('A', 'a_index'),
+            ('S', 's_index'),
+            ('Minuten', 'result_minutes'),
+        ],
+    },
+}
+
+
+class Echo:
+    """File-like object returning what is written, so that the CSV writer produces the lines for a stream."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def get_export_rows(dataset: str, start: date = None, end: date = None, station_ids: list = None) -> Iterator:
+    """Read the rows of an export from the database in chunks.
+
+    Args:
+        dataset (str): The exported data, 'daily', 'monthly' or 'classifications'.
+        start (date, optional): The first exported date, defaults to the earliest.
+        end (date, optional): The last exported date, defaults to the latest.
+        station_ids (list, optional): The IDs of the exported stations, defaults to all stations.
+
+    Returns:
+        Iterator: The rows as tuples of the column values, ordered by date and station.
+    """
+    export = EXPORTS[dataset]
+    date_field = export['date_field']
+    rows = export['model'].objects.all()
+    if start:
+        rows = rows.filter(**{f'{date_field}__gte': start})
+    if end:
+        rows = rows.filter(**{f'{date_field}__lte': end})
+    if station_ids is not None:
+        rows = rows.filter(station__in=station_ids)
+    return (
+        rows.order_by(date_field, 'station_id', 'id')
+        .values_list(*[field for _, field in export['columns']])
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def stream_csv(header: list, rows: Iterator) -> Iterator[str]:
+    """Encode the header and the rows as CSV lines.
+
+    Args:
+        header (list): The column headers.
+        rows (Iterator): The rows as tuples of the column values.
+
+    Yields:
+        str: The next line.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+@gzip_page
+def create_csv_response(request, header: list, rows: Iterator, filename: str) -> StreamingHttpResponse:
+    """Stream the rows as CSV file, compressed with gzip if the client accepts it."""
+    return StreamingHttpResponse(
+        stream_csv(header, rows),
+        content_type='text/csv; charset=utf-8',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
+def create_xlsx_response(header: list, rows: Iterator, filename: str) -> FileResponse:
+    """Write the rows into a write-only excel workbook in a temporary file and stream it.
+
+    Excel files are zip-compressed already, so they are not compressed again.
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Export')
+    worksheet.append(header)
+    for row in rows:
+        worksheet.append(row)
+
+    file = TemporaryFile()
+    workbook.save(file)
+    file.seek(0)
+    return FileResponse(
+        file,
+        as_attachment=True,
+        filename=filename,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+
+def parse_station_ids(value: str) -> list:
+    """Parse a comma-separated list of station IDs.
+
+    Args:
+        value (str): The station IDs, e.g. '1,2,3'.
+
+    Returns:
+        list: The station IDs.
+    """
+    try:
+        return [int(station_id) for station_id in value.split(',')]
+    except ValueError:
+        raise ValueError("Invalid stations. Use comma-separated station IDs.")
+
+
+def handle_export(request, dataset: str):
+    """Endpoint to export the station workload or the classification history.
+
+    The query parameters 'format' ('csv' or 'xlsx', defaults to 'csv'), 'from' and 'to' (YYYY-MM-DD) and
+    'stations' (comma-separated IDs) are optional.
+
+    Args:
+        request (HttpRequest): The request object.
+        dataset (str): The exported data, 'daily', 'monthly' or 'classifications'.
+
+    Returns:
+        StreamingHttpResponse: The response containing the exported file.
+    """
+    if request.method == 'GET':
+        try:
+            if dataset not in EXPORTS:
+                raise ValueError(f"Invalid export. Use {' or '.join(map(repr, EXPORTS))}.")
+            export_format = request.GET.get('format', 'csv')
+            if export_format not in EXPORT_FORMATS:
+                raise ValueError(f"Invalid format. Use {' or '.join(map(repr, EXPORT_FORMATS))}.")
+            start = date.fromisoformat(request.GET['from']) if request.GET.get('from') else None
+            end = date.fromisoformat(request.GET['to']) if request.GET.get('to') else None
+            station_ids = parse_station_ids(request.GET['stations']) if request.GET.get('stations') else None
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        header = [column for column, _ in EXPORTS[dataset]['columns']]
+        rows = get_export_rows(dataset, start, end, station_ids)
+        filename = '_'.join([dataset, *[str(day) for day in (start, end) if day]]) + f'.{export_format}'
+        if export_format == 'csv':
+            return create_csv_response(request, header, rows, filename)
+        return create_xlsx_response(header, rows, filename)
+    else:
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
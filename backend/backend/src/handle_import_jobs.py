@@ -0,0 +1,286 @@
+"""Queue excel imports in the database and process them with local background workers.
+
+The database itself is used as the queue, so no external broker is needed. A worker claims the oldest
+queued job with a conditional update, which only succeeds for one worker even if several poll at once.
+
+A running job carries the heartbeat of its worker. If the worker stops, e.g. because it was killed or the container
+restarted, the heartbeat gets older than IMPORT_LEASE_TIMEOUT and the next worker polling the queue queues the
+job again. Imports run in a single transaction, so nothing of the abandoned run was stored. After
+IMPORT_MAX_ATTEMPTS claims the job is marked as failed instead.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import OperationalError, close_old_connections, connection
+from django.db.models import F
+from django.http import JsonResponse
+from django.utils import timezone
+
+from ..models import ImportJob
+from .handle_data_imports import (
+    insert_caregiver_shift_excel_into_db,
+    insert_patient_excel_into_db,
+    run_chunked_import,
+    spool_request_body,
+)
+
+logger = logging.getLogger(__name__)
+
+IMPORT_WRITERS = {
+    'patient': insert_patient_excel_into_db,
+    'caregiver': insert_caregiver_shift_excel_into_db,
+}
+
+
+def enqueue_import(kind: str, file) -> ImportJob:
+    """Store the uploaded file and queue an import job for it.
+
+    Args:
+        kind (str): The type of the import, 'patient' or 'caregiver'.
+        file (BinaryIO): The uploaded excel file.
+
+    Returns:
+        ImportJob: The queued job.
+    """
+    if kind not in IMPORT_WRITERS:
+        raise ValueError(f"Invalid import type. Use {' or '.join(map(repr, IMPORT_WRITERS))}.")
+    job = ImportJob(kind=kind)
+    job.file.save(f'{kind}.xlsx', File(file), save=False)
+    job.save()
+    return job
+
+
+def release_abandoned_jobs() -> int:
+    """Queue running jobs again whose worker stopped, or mark them as failed after IMPORT_MAX_ATTEMPTS claims.
+
+    Returns:
+        int: The number of released jobs.
+    """
+    now = timezone.now()
+    abandoned = ImportJob.objects.filter(
+        status='RUNNING', heartbeat_at__lt=now - timedelta(seconds=settings.IMPORT_LEASE_TIMEOUT)
+    )
+    try:
+        failed = abandoned.filter(attempts__gte=settings.IMPORT_MAX_ATTEMPTS).update(
+            status='FAILED', error='The worker stopped during the import.', finished_at=now
+        )
+        queued = abandoned.update(status='QUEUED', worker='', heartbeat_at=None)
+    except OperationalError:
+        # SQLite locks the database while another worker imports, its job is alive then
+        return 0
+    if failed or queued:
+        logger.warning("Released %d abandoned import jobs, %d of them failed", failed + queued, failed)
+    return failed + queued
+
+
+def claim_next_job() -> ImportJob:
+    """Claim the oldest queued job for the current worker, after releasing abandoned ones.
+
+    Returns:
+        ImportJob: The claimed job, None if the queue is empty.
+    """
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    release_abandoned_jobs()
+    while True:
+        job_id = ImportJob.objects.filter(status='QUEUED').order_by('id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        # Only one worker can move the job from queued to running
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(id=job_id, status='QUEUED').update(
+            status='RUNNING', worker=worker, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return ImportJob.objects.get(id=job_id)
+
+
+def report_progress(job_id: int, progress: dict, done: threading.Event, interval: float) -> None:
+    """Periodically write the number of processed rows and the heartbeat of a running job.
+
+    This runs in its own thread and therefore with its own database connection, so the progress is visible
+    while the import itself is still running in a transaction.
+
+    Args:
+        job_id (int): The ID of the running job.
+        progress (dict): The shared progress of the import.
+        done (Event): Set once the import has finished.
+        interval (float): The seconds between two updates.
+    """
+    try:
+        while not done.wait(interval):
+            try:
+                ImportJob.objects.filter(id=job_id).update(rows_processed=progress['rows'],
+                                                           heartbeat_at=timezone.now())
+            except OperationalError:
+                # Skip the update if the job row is locked, the next update will catch up
+                pass
+    finally:
+        connection.close()
+
+
+def process_job(job: ImportJob, progress_interval: float = None) -> ImportJob:
+    """Run the import of a claimed job and store its result.
+
+    Args:
+        job (ImportJob): The claimed job.
+        progress_interval (float, optional): The seconds between two progress updates, None disables them.
+
+    Returns:
+        ImportJob: The finished job.
+    """
+    insert_chunk = IMPORT_WRITERS[job.kind]
+    progress = {'rows': 0}
+    done = threading.Event()
+
+    def insert_and_count(chunk):
+        rows = insert_chunk(chunk)
+        progress['rows'] += rows
+        if connection.vendor == 'sqlite':
+            # The heartbeat becomes visible with the import, other workers cannot write to release it before
+            ImportJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now())
+        return rows
+
+    # SQLite only allows one writer at a time, so updates from another connection during the import would block
+    reporter = None
+    if connection.vendor != 'sqlite':
+        # The heartbeat keeps the job alive, also if no progress is reported
+        interval = progress_interval or settings.IMPORT_LEASE_TIMEOUT / 3
+        reporter = threading.Thread(target=report_progress, args=(job.id, progress, done, interval))
+        reporter.start()
+
+    try:
+        with job.file.open('rb') as file:
+            statistics = run_chunked_import(file, insert_and_count, settings.IMPORT_CHUNK_SIZE)
+        job.status = 'SUCCEEDED'
+        job.rows_processed = statistics['rows']
+    except Exception as e:
+        logger.exception("Import job %d failed", job.id)
+        job.status = 'FAILED'
+        job.rows_processed = progress['rows']
+        job.error = str(e)
+    finally:
+        done.set()
+        if reporter:
+            reporter.join()
+
+    job.finished_at = timezone.now()
+    # Only store the result if the job was not released in the meantime
+    if not ImportJob.objects.filter(id=job.id, status='RUNNING', worker=job.worker).update(
+        status=job.status, rows_processed=job.rows_processed, error=job.error, finished_at=job.finished_at
+    ):
+        logger.warning("Import job %d was released while it was running, its result is discarded", job.id)
+        return job
+    if job.status == 'SUCCEEDED':
+        job.file.delete(save=False)
+    return job
+
+
+def process_next_job(progress_interval: float = None) -> ImportJob:
+    """Claim and process the oldest queued job.
+
+    Args:
+        progress_interval (float, optional): The seconds between two progress updates, None disables them.
+
+    Returns:
+        ImportJob: The finished job, None if the queue is empty.
+    """
+    job = claim_next_job()
+    if job is None:
+        return None
+    return process_job(job, progress_interval)
+
+
+def run_worker(poll_interval: float, progress_interval: float, once: bool = False) -> None:
+    """Process queued jobs until stopped.
+
+    Args:
+        poll_interval (float): The seconds to wait if the queue is empty.
+        progress_interval (float): The seconds between two progress updates.
+        once (bool, optional): Stop as soon as the queue is empty.
+    """
+    while True:
+        # The process lives for days, so connections dropped by the database have to be replaced
+        close_old_connections()
+        try:
+            job = process_next_job(progress_interval)
+        except Exception:
+            # Failed imports are handled per job, this is e.g. a lost connection while claiming one
+            logger.exception("Processing the next import job failed")
+            job = None
+        if job is not None:
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
+
+
+def get_job_status(job: ImportJob) -> dict:
+    """Get the progress of an import job.
+
+    Args:
+        job (ImportJob): The job.
+
+    Returns:
+        dict: The status, processed rows, error and duration of the job.
+    """
+    end = job.finished_at or timezone.now()
+    return {
+        'id': job.id,
+        'type': job.kind,
+        'status': job.status,
+        'rows_processed': job.rows_processed,
+        'error': job.error,
+        'attempts': job.attempts,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'duration_seconds': round((end - job.started_at).total_seconds(), 2) if job.started_at else None,
+    }
+
+
+def handle_import_jobs(request) -> JsonResponse:
+    """Endpoint to queue an excel import.
+
+    The body of the request should contain the excel file to be imported, the 'type' query parameter
+    selects between a 'patient' and a 'caregiver' import.
+
+    Args:
+        request (HttpRequest): The request object.
+
+    Returns:
+        JsonResponse: The response containing the status of the queued job.
+    """
+    if request.method == 'POST':
+        try:
+            with spool_request_body(request) as file:
+                job = enqueue_import(request.GET.get('type'), file)
+            return JsonResponse(get_job_status(job), status=202)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    else:
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+def handle_import_job_status(request, job_id: int) -> JsonResponse:
+    """Endpoint to retrieve the progress of an import job.
+
+    Args:
+        request (HttpRequest): The request object.
+        job_id (int): The ID of the import job.
+
+    Returns:
+        JsonResponse: The response containing the status of the job.
+    """
+    if request.method == 'GET':
+        job = ImportJob.objects.filter(id=job_id).first()
+        if job is None:
+            return JsonResponse({'error': 'Import job not found.'}, status=404)
+        return JsonResponse(get_job_status(job))
+    else:
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -1,8 +1,9 @@
 """Provide an endpoint to retrieve all current patients for a station."""
+from collections import defaultdict
 from datetime import date, timedelta
 
-from django.db.models import F, OuterRef, QuerySet, Subquery, Value
-from django.db.models.functions import Concat
+from django.db.models import Exists, F, OuterRef, QuerySet, Value, Window
+from django.db.models.functions import Concat, RowNumber
 from django.http import JsonResponse
 from django.utils import timezone
 
@@ -29,6 +30,63 @@ def get_active_patients_on_station(station_id: int, date: date = date.today()) -
     return patients
 
 
+def get_last_classifications(station_id: int, patient_ids: list, day: date) -> dict:
+    """Get the latest classification up to a given date for many patients of a station at once.
+
+    Args:
+        station_id (int): The ID of the station.
+        patient_ids (list): The IDs of the patients.
+        day (date): The latest date to consider.
+
+    Returns:
+        dict: The latest classification per patient ID.
+    """
+    classifications = (
+        DailyClassification.objects.filter(
+            station=station_id, patient__in=patient_ids, date__lte=day
+        )
+        .annotate(
+            recency=Window(RowNumber(), partition_by=F("patient"), order_by=F("date").desc())
+        )
+        .filter(recency=1)
+        .values("patient", "date", "result_minutes", "a_index", "s_index")
+    )
+    return {entry["patient"]: entry for entry in classifications}
+
+
+def get_missing_classification_dates(station_id: int, patient_ids: list, start: date, end: date) -> dict:
+    """Get the dates without a classification for many patients of a station at once.
+
+    Args:
+        station_id (int): The ID of the station.
+        patient_ids (list): The IDs of the patients.
+        start (date): The first date to consider.
+        end (date): The last date to consider.
+
+    Returns:
+        dict: The dates missing a classification per patient ID, sorted ascending.
+    """
+    missing = defaultdict(list)
+    dates = (
+        DailyPatientData.objects.filter(
+            station=station_id, patient__in=patient_ids, date__gte=start, date__lte=end
+        )
+        .annotate(
+            has_classification=Exists(
+                DailyClassification.objects.filter(
+                    patient=OuterRef("patient"), station=station_id, date=OuterRef("date")
+                )
+            )
+        )
+        .filter(has_classification=False)
+        .order_by("date")
+        .values_list("patient", "date")
+    )
+    for patient_id, missing_date in dates:
+        missing[patient_id].append(missing_date)
+    return missing
+
+
 def get_patients_with_additional_information(station_id: int) -> list:
     """Get all patients assigned to a station.
 
@@ -40,6 +98,9 @@ def get_patients_with_additional_information(station_id: int) -> list:
     - The relevant classification information of the patient for the previous day
     - The missing classifications for the patient in the last week
 
+    The roster is loaded with a fixed number of set-based queries for the whole station,
+    independent of the number of patients and their length of stay.
+
     Args:
         station_id (int): The ID of the station.
 
@@ -47,76 +108,33 @@ def get_patients_with_additional_information(station_id: int) -> list:
         list: The patients assigned to the station.
     """
     today = timezone.now().date()
+    seven_days_ago = today - timedelta(days=7)
 
-    # Get all patients assigned to the given station
-    patients = get_active_patients_on_station(station_id)
-
-    # Add the date the patient was last classified on that station
-    patients = patients.annotate(
-        lastClassificationDate=Subquery(
-            DailyClassification.objects.filter(
-                patient=OuterRef("id"), date__lte=today, station=station_id
-            )
-            .order_by("-date")
-            .values("date")[:1]
-        ),
-        lastClassificationMinutes=Subquery(
-            DailyClassification.objects.filter(
-                patient=OuterRef("id"), date__lte=today, station=station_id
-            )
-            .order_by("-date")
-            .values("result_minutes")[:1]
-        ),
-        lastClassificationAIndex=Subquery(
-            DailyClassification.objects.filter(
-                patient=OuterRef("id"), date__lte=today, station=station_id
-            )
-            .order_by("-date")
-            .values("a_index")[:1]
-        ),
-        lastClassificationSIndex=Subquery(
-            DailyClassification.objects.filter(
-                patient=OuterRef("id"), date__lte=today, station=station_id
-            )
-            .order_by("-date")
-            .values("s_index")[:1]
-        ),
-        currentRoom=Subquery(
-            DailyPatientData.objects.filter(
-                patient=OuterRef("id"), date=today, station=station_id
-            )
-            .values("room_name")[:1]
-        ),
-        currentBed=Subquery(
-            DailyPatientData.objects.filter(
-                patient=OuterRef("id"), date=today, station=station_id
-            )
-            .values("bed_number")[:1]
-        ),
-    ).values(
-        "id",
-        "name",
-        "lastClassificationDate",
-        "lastClassificationMinutes",
-        "lastClassificationAIndex",
-        "lastClassificationSIndex",
-        "currentRoom",
-        "currentBed",
-        name=Concat(F("first_name"), Value(" "), F("last_name"))
+    # Get all patients assigned to the given station together with their current room and bed
+    patients = list(
+        Patient.objects.filter(dailypatientdata__station=station_id, dailypatientdata__date=today)
+        .order_by("id")
+        .values(
+            "id",
+            name=Concat(F("first_name"), Value(" "), F("last_name")),
+            currentRoom=F("dailypatientdata__room_name"),
+            currentBed=F("dailypatientdata__bed_number"),
+        )
     )
+    patient_ids = [patient["id"] for patient in patients]
 
-    # Convert the QuerySet to a list of dictionaries
-    patients_list = list(patients)
+    last_classifications = get_last_classifications(station_id, patient_ids, today)
+    missing_dates = get_missing_classification_dates(station_id, patient_ids, seven_days_ago, today)
 
-    # Add missing classifications for the last week to each patient
-    for patient in patients_list:
-        patient_id = patient["id"]
-        missing_classifications = get_missing_classifications_for_patient(
-            patient_id, station_id
-        )
-        patient["missing_classifications_last_week"] = missing_classifications
+    for patient in patients:
+        classification = last_classifications.get(patient["id"], {})
+        patient["lastClassificationDate"] = classification.get("date")
+        patient["lastClassificationMinutes"] = classification.get("result_minutes")
+        patient["lastClassificationAIndex"] = classification.get("a_index")
+        patient["lastClassificationSIndex"] = classification.get("s_index")
+        patient["missing_classifications_last_week"] = missing_dates.get(patient["id"], [])
 
-    return list(patients)
+    return patients
 
 
 def get_current_station_for_patient(patient_id: int) -> str:
@@ -207,56 +225,34 @@ def get_dates_for_patient_classification(patient_id: int, station_id: int) -> li
     dates = DailyPatientData.objects.filter(
         patient=patient_id,
         station=station_id,
-    ).values_list('date', flat=True)
-
-    result = []
-
-    for date_value in dates:
-        has_classification = DailyClassification.objects.filter(
-            patient=patient_id,
-            station=station_id,
-            date=date_value
-        ).exists()
-
-        result.append({
-            "date": date_value,
-            "hasClassification": has_classification
-        })
+    ).annotate(
+        hasClassification=Exists(
+            DailyClassification.objects.filter(
+                patient=patient_id,
+                station=station_id,
+                date=OuterRef('date'),
+            )
+        )
+    ).values('date', 'hasClassification')
 
-    return result
+    return list(dates)
 
 
-def get_missing_classifications_for_patient(patient_id: int, station_id: int) -> int:
-    """Get the number of missing classifications for a patient in the last week.
+def get_missing_classifications_for_patient(patient_id: int, station_id: int) -> list:
+    """Get the missing classifications for a patient in the last week.
 
     Args:
         patient_id (int): The ID of the patient.
         station_id (int): The ID of the station.
 
     Returns:
-        int: The number of missing classifications for the patient in the last week.
+        list: The dates of the missing classifications for the patient in the last week.
     """
     today = timezone.now().date()
     seven_days_ago = today - timedelta(days=7)
 
-    all_required_days = get_dates_for_patient_classification(patient_id, station_id)
-    required_in_last_week = []
-
-    for classification_date in all_required_days:
-        if seven_days_ago <= classification_date["date"] <= today:
-            required_in_last_week.append(classification_date["date"])
-
-    missing_classifications = []
-
-    for classification_date in required_in_last_week:
-        classification = DailyClassification.objects.filter(
-            patient=patient_id, date=classification_date, station=station_id
-        ).first()
-
-        if classification is None:
-            missing_classifications.append(classification_date)
-
-    return missing_classifications
+    missing_dates = get_missing_classification_dates(station_id, [patient_id], seven_days_ago, today)
+    return missing_dates.get(patient_id, [])
 
 
 def get_classification_for_patient(
@@ -2,8 +2,8 @@
 
 import datetime as datetime
 import json
-from collections import defaultdict
 
+from django.db import IntegrityError, transaction
 from django.http import JsonResponse
 
 from ..models import (
@@ -14,39 +14,26 @@ from ..models import (
     Patient,
     Station,
 )
+from .classification_snapshot import invalidate_snapshot
+from .question_catalog import get_catalog, get_selected_option_ids, overlay_grouped, overlay_options
 
 
-def add_selected_attribute(care_service_options: list, classification: dict) -> list:
+def add_selected_attribute(catalog: dict, classification: dict) -> list:
     """Add the attribute if the care service was previously selected or not.
 
     Args:
-        care_service_options (list): The care service options to which to add the 'selected' attribute.
+        catalog (dict): The cached catalog containing the care service options.
         classification (dict): The classification of the patient.
 
     Returns:
         list: The care service options with the attribute if they were previously selected or not.
     """
-    # If no classification exist, return the questions with everything unselected
-    if classification is None:
-        return [{**option, 'selected': False} for option in care_service_options]
-
-    # Get all previous selected care services
-    previous_selected_services = list(IsCareServiceUsed.objects.filter(
-        classification=classification['id'],
-    ).values('care_service_option'))
-
-    # Add the attribute if the care service was previously selected or not
-    for option in care_service_options:
-        option['selected'] = any(
-            previous_service['care_service_option'] == option['id']
-            for previous_service in previous_selected_services
-        )
-
-    return care_service_options
+    selected_ids = get_selected_option_ids(classification['id'] if classification else None)
+    return overlay_options(catalog, selected_ids)
 
 
-def get_questions(station_id: int, patient_id: int, date: datetime.date) -> dict:
-    """Get the questions and general information about the classification from the database.
+def get_classification_information(station_id: int, patient_id: int, date: datetime.date) -> tuple:
+    """Get the classification and general information about it from the database.
 
     Args:
         station_id (int): The ID of the station.
@@ -54,22 +41,9 @@ def get_questions(station_id: int, patient_id: int, date: datetime.date) -> dict
         date (date): The date of the classification.
 
     Returns:
-        dict: The questions with the corresponding information for that date.
+        dict: The classification of the patient, None if it does not exist.
+        dict: The general information about the classification for that date.
     """
-    # Get the questions with the corresponding information
-    care_service_options = list(
-        CareServiceOption.objects.select_related('field', 'category').values(
-            'id',
-            'field__name',
-            'field__short',
-            'category__name',
-            'category__short',
-            'name',
-            'severity',
-            'description',
-            'short'
-        )
-    )
     # Get the patient's admission and discharge dates
     daily_patient_data = DailyPatientData.objects.filter(
         patient=patient_id,
@@ -86,11 +60,7 @@ def get_questions(station_id: int, patient_id: int, date: datetime.date) -> dict
         station=station_id,
     ).values().first()
 
-    # Add the attribute if the care service was selected or not on that date
-    care_service_options = add_selected_attribute(care_service_options, classification)
-
-    return {
-        'care_service_options': care_service_options,
+    return classification, {
         'care_time': classification['result_minutes'] if classification else 0,
         'is_in_isolation': classification['is_in_isolation'] if classification else False,
         'a_index': classification['a_index'] if classification else 0,
@@ -100,75 +70,30 @@ def get_questions(station_id: int, patient_id: int, date: datetime.date) -> dict
     }
 
 
-def group_questions(questions: list) -> list:
-    """Group the questions by field, category and severity.
+def get_questions(station_id: int, patient_id: int, date: datetime.date) -> dict:
+    """Get the questions and general information about the classification from the database.
 
     Args:
-        questions (list): The questions to group.
+        station_id (int): The ID of the station.
+        patient_id (int): The ID of the patient.
+        date (date): The date of the classification.
 
     Returns:
-        list: The questions grouped by field, category and severity.
+        dict: The questions with the corresponding information for that date.
     """
-    # Sort questions by id to always get the same order
-    questions = sorted(questions, key=lambda x: (x['id']))
-    grouped_questions = []
-
-    def split_by_attribute(objects, attribute):
-        grouped = defaultdict(list)
-
-        for obj in objects:
-            key = obj.get(attribute)
-            grouped[key].append(obj)
-
-        return grouped.values()
-
-    fields = split_by_attribute(questions, "field__name")
-
-    for field in fields:
-        field_name = field[0]["field__name"]
-        field_value = {
-            "id": 1,
-            "name": field_name,
-            "short": field[0]["field__short"],
-            "categories": []
-        }
-
-        categories = split_by_attribute(field, "category__name")
-
-        for category in categories:
-            category_name = category[0]['category__name']
-            category_value = {
-                "id": 1,
-                "name": category_name,
-                "short": category[0]['category__short'],
-                "severities": []
-            }
-            severities = split_by_attribute(category, "severity")
-
-            for severity in severities:
-                # Skip the questions that are not needed
-                if field[0]["field__short"] == 'A' and severity[0]['severity'] == 1:
-                    continue
-                if field[0]["field__short"] == 'S' and severity[0]['severity'] == 1:
-                    continue
-                if field[0]["field__short"] == 'S' and severity[0]['severity'] == 4:
-                    continue
-                severity_index = severity[0]['severity']
-                severity_value = {
-                    "severity": severity_index,
-                    "questions": severity
-                }
-
-                category_value["severities"].append(severity_value)
-            field_value["categories"].append(category_value)
-        grouped_questions.append(field_value)
-
-    return grouped_questions
+    classification, classification_information = get_classification_information(station_id, patient_id, date)
+
+    # Add the attribute if the care service was selected or not on that date
+    care_service_options = add_selected_attribute(get_catalog(), classification)
+
+    return {'care_service_options': care_service_options, **classification_information}
 
 
 def get_grouped_data(station_id: int, patient_id: int, date: datetime.date) -> dict:
     """Get the questions grouped by field, category, severity and general information about the classification.
 
+    The grouping is taken from the cached catalog, only the selections of the patient are added per request.
+
     Args:
         station_id (int): The ID of the station.
         patient_id (int): The ID of the patient.
@@ -177,11 +102,10 @@ def get_grouped_data(station_id: int, patient_id: int, date: datetime.date) -> d
     Returns:
         dict: The questions grouped by field, category, severity.
     """
-    classification_information = get_questions(station_id, patient_id, date)
-    questions = classification_information['care_service_options']
-    del classification_information['care_service_options']
-    grouped_questions = group_questions(questions)
-    classification_information['careServices'] = grouped_questions
+    catalog = get_catalog()
+    classification, classification_information = get_classification_information(station_id, patient_id, date)
+    selected_ids = get_selected_option_ids(classification['id'] if classification else None)
+    classification_information['careServices'] = overlay_grouped(catalog, selected_ids)
     return classification_information
 
 
@@ -238,9 +162,86 @@ def submit_selected_options(station_id: int, patient_id: int, date: datetime.dat
         ).delete()
 
 
+def submit_selected_options_batch(station_id: int, patient_id: int, date: datetime.date, body: dict) -> dict:
+    """Apply many selection changes and the isolation status in one transaction.
+
+    The body contains a list of changes in the same format as a single update, e.g.
+    {"changes": [{"id": 2, "selected": true}, {"id": 5, "selected": false}], "is_in_isolation": false}.
+    If an option occurs multiple times, the last change wins.
+
+    Args:
+        station_id (int): The ID of the station.
+        patient_id (int): The ID of the patient.
+        date (date): The date of the classification.
+        body (dict): The body of the request containing the changes.
+
+    Returns:
+        dict: The delta that was actually applied to the classification.
+    """
+    if not isinstance(body, dict) or not isinstance(body.get('changes', []), list):
+        raise ValueError("The body must be an object with a list of 'changes'.")
+    if not all(isinstance(change, dict) and 'selected' in change and type(change.get('id')) is int
+               for change in body.get('changes', [])):
+        raise ValueError("Each change needs an integer 'id' and a 'selected' attribute.")
+    if not isinstance(body.get('is_in_isolation', False), bool):
+        raise ValueError("'is_in_isolation' must be a boolean.")
+    changes = {change['id']: bool(change['selected']) for change in body.get('changes', [])}
+    unknown_ids = changes.keys() - get_catalog()['variants'].keys()
+    if unknown_ids:
+        raise ValueError(f"Care service options not found: {sorted(unknown_ids)}")
+
+    with transaction.atomic():
+        # Create "default" dailyClassification if it does not exist
+        classification, _ = DailyClassification.objects.get_or_create(
+            patient_id=patient_id,
+            date=date,
+            defaults=dict(
+                is_in_isolation=False,
+                result_minutes=0,
+                a_index=0,
+                s_index=0,
+                station_id=station_id,
+            )
+        )
+
+        # Only write the options whose state actually changes
+        previously_selected = get_selected_option_ids(classification.id)
+        added = sorted(option_id for option_id, selected in changes.items()
+                       if selected and option_id not in previously_selected)
+        removed = sorted(option_id for option_id, selected in changes.items()
+                         if not selected and option_id in previously_selected)
+
+        if added:
+            IsCareServiceUsed.objects.bulk_create([
+                IsCareServiceUsed(classification=classification, care_service_option_id=option_id)
+                for option_id in added
+            ], ignore_conflicts=True)
+        if removed:
+            IsCareServiceUsed.objects.filter(
+                classification=classification,
+                care_service_option__in=removed,
+            ).delete()
+
+        if 'is_in_isolation' in body and classification.is_in_isolation != body['is_in_isolation']:
+            classification.is_in_isolation = body['is_in_isolation']
+            DailyClassification.objects.filter(id=classification.id).update(
+                is_in_isolation=classification.is_in_isolation
+            )
+            invalidate_snapshot()
+
+    return {
+        'selected': added,
+        'deselected': removed,
+        'is_in_isolation': classification.is_in_isolation,
+    }
+
+
 def handle_questions(request, station_id: int, patient_id: int, date: str) -> JsonResponse:
     """Endpoint to handle the submission and pulling of questions.
 
+    A PUT applies a single change and returns all questions, a PATCH applies many changes at once
+    and only returns the applied delta.
+
     Args:
         request (Request): The request object.
         station_id (int): The ID of the station.
@@ -259,6 +260,15 @@ def handle_questions(request, station_id: int, patient_id: int, date: str) -> Js
         body_data = json.loads(request.body)
         submit_selected_options(station_id, patient_id, date, body_data)
         return JsonResponse(get_grouped_data(station_id, patient_id, date), safe=False)
+    elif request.method == 'PATCH':
+        # Handle many updates of questions at once, only the applied changes are sent back
+        try:
+            body_data = json.loads(request.body)
+            return JsonResponse(submit_selected_options_batch(station_id, patient_id, date, body_data))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except IntegrityError:
+            return JsonResponse({'error': 'Patient or station not found.'}, status=404)
     elif request.method == 'GET':
         # Handle the pulling of questions for a patient
         return JsonResponse(get_grouped_data(station_id, patient_id, date), safe=False)
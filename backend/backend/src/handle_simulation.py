@@ -0,0 +1,135 @@
+"""Simulate the station workload with alternative minute values of the PPBV."""
+import json
+from datetime import date, datetime
+
+import numpy as np
+from django.http import JsonResponse
+
+from ..models import Station
+from .batch_classification import DEFAULT_RULES, STAY_FLAGS, sum_minutes_batch
+from .classification_snapshot import get_snapshot
+from .handle_calculations import MINUTES_PER_FULLTIME_EQUIVALENT
+
+SCALAR_RULES = ('base_minutes', 'isolation_base_minutes', 'admission_minutes')
+
+
+def parse_rules(body: dict) -> dict:
+    """Merge alternative minute values into the minute values of the PPBV.
+
+    The body may contain 'base_minutes', 'isolation_base_minutes', 'admission_minutes' and
+    'minutes_per_classification', e.g. {"A2": {"S3": 170}}. Values which are not given keep their PPBV value.
+
+    Args:
+        body (dict): The alternative minute values.
+
+    Returns:
+        dict: The complete minute values.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("The rules have to be an object.")
+    unknown = set(body) - set(SCALAR_RULES) - {'minutes_per_classification'}
+    if unknown:
+        raise ValueError(f"Unknown rules: {', '.join(sorted(unknown))}.")
+
+    rules = {**DEFAULT_RULES, 'minutes_table': DEFAULT_RULES['minutes_table'].copy()}
+    for name in SCALAR_RULES:
+        if name in body:
+            rules[name] = parse_minutes(body[name], name)
+    table = body.get('minutes_per_classification', {})
+    if not isinstance(table, dict) or not all(isinstance(row, dict) for row in table.values()):
+        raise ValueError("The minutes per classification have to be an object like {\"A2\": {\"S3\": 170}}.")
+    for a_key, row in table.items():
+        for s_key, value in row.items():
+            if a_key not in ('A1', 'A2', 'A3', 'A4') or s_key not in ('S1', 'S2', 'S3', 'S4'):
+                raise ValueError(f"Unknown classification {a_key}/{s_key}, use A1 to A4 and S1 to S4.")
+            rules['minutes_table'][int(a_key[1]), int(s_key[1])] = parse_minutes(value, f'{a_key}/{s_key}')
+    return rules
+
+
+def parse_minutes(value, name: str) -> float:
+    """Check that a minute value is a non-negative number.
+
+    Args:
+        value: The value to check.
+        name (str): The name of the value for the error message.
+
+    Returns:
+        float: The minutes.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError(f"The minutes of {name} have to be a non-negative number.")
+    return value
+
+
+def simulate_workload(start: date, end: date, rules: dict) -> list:
+    """Recompute the minutes and full-time equivalents of all stations with alternative minute values.
+
+    The stored care groups and stay flags are reused, nothing is written to the database.
+
+    Args:
+        start (date): The first date of the simulation.
+        end (date): The last date of the simulation.
+        rules (dict): The minute values to use.
+
+    Returns:
+        list: The stored and the simulated minutes and average daily caregivers of each station.
+    """
+    if end < start:
+        raise ValueError("The end date must not be before the start date.")
+    snapshot = get_snapshot()
+
+    # The snapshot is sorted by date, so the range is a contiguous slice
+    first = np.searchsorted(snapshot['date'], np.datetime64(start), side='left')
+    last = np.searchsorted(snapshot['date'], np.datetime64(end), side='right')
+    columns = {name: values[first:last] for name, values in snapshot.items()}
+
+    # The minutes are stored as integer, so the simulated minutes are cut off the same way
+    simulated = np.trunc(sum_minutes_batch(
+        columns['a_index'], columns['s_index'], {name: columns[name] for name in STAY_FLAGS}, rules
+    ))
+
+    stations = list(Station.objects.order_by('id').values('id', 'name'))
+    station_ids = np.array([station['id'] for station in stations])
+    rows = np.searchsorted(station_ids, columns['station'])
+    minutes = np.bincount(rows, weights=columns['result_minutes'], minlength=len(stations))
+    simulated_minutes = np.bincount(rows, weights=simulated, minlength=len(stations))
+
+    days = (end - start).days + 1
+    return [
+        {
+            'station_id': station['id'],
+            'station_name': station['name'],
+            'minutes': int(minutes[index]),
+            'simulated_minutes': int(simulated_minutes[index]),
+            'caregivers': round(minutes[index] / MINUTES_PER_FULLTIME_EQUIVALENT / days, 2),
+            'simulated_caregivers': round(simulated_minutes[index] / MINUTES_PER_FULLTIME_EQUIVALENT / days, 2),
+        }
+        for index, station in enumerate(stations)
+    ]
+
+
+def handle_workload_simulation(request) -> JsonResponse:
+    """Endpoint to simulate the station workload with alternative minute values.
+
+    The body of the request should contain the 'start' and 'end' date ('YYYY-MM-DD') and the alternative
+    minute values as 'rules', see parse_rules.
+
+    Args:
+        request (HttpRequest): The request object.
+
+    Returns:
+        JsonResponse: The response containing the stored and simulated workload of each station.
+    """
+    if request.method == 'POST':
+        try:
+            body = json.loads(request.body)
+            if not isinstance(body, dict):
+                raise ValueError("The body has to be an object.")
+            start = datetime.strptime(str(body.get('start')), '%Y-%m-%d').date()
+            end = datetime.strptime(str(body.get('end')), '%Y-%m-%d').date()
+            rules = parse_rules(body.get('rules', {}))
+            return JsonResponse(simulate_workload(start, end, rules), safe=False)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    else:
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -1,17 +1,62 @@
 """Endpoint to retrieve information per station."""
-from datetime import timedelta
+from datetime import date, timedelta
 
-from django.db.models import Count, Q, Sum, Value
-from django.db.models.functions import Coalesce, ExtractDay
+from django.db.models import Count, Exists, F, OuterRef, Q, QuerySet
 from django.http import JsonResponse
 from django.utils import timezone
 
 from ..models import (
     DailyClassification,
-    DailyPatientData,
     Station,
-    StationWorkloadDaily,
 )
+from .analysis_cache import cache_analysis
+from .workload_rollups import GRANULARITIES, get_period_end, get_period_start, get_rollups
+
+
+def get_workload_analysis(start: date, end: date, granularity: str) -> list:
+    """Get the workload of all stations per period within a date range.
+
+    Args:
+        start (date): The first date of the range.
+        end (date): The last date of the range.
+        granularity (str): The granularity of the periods, 'day', 'week', 'month', 'quarter' or 'year'.
+
+    Returns:
+        list: The periods and the sum of minutes per station, followed by the sum over all stations.
+    """
+    granularity = granularity.upper()
+    if granularity not in GRANULARITIES:
+        raise ValueError("Invalid granularity. Use 'day', 'week', 'month', 'quarter' or 'year'.")
+    if start > end:
+        raise ValueError("The start date must not be after the end date.")
+
+    # Structure the data for the desired output
+    stations = {}
+    total_sum = 0
+    for item in get_rollups(start, end, granularity):
+        station_id = item['station_id']
+        if station_id not in stations:
+            stations[station_id] = {
+                "id": station_id,
+                "name": item['station__name'],
+                "sum": 0,
+                "data": []
+            }
+        entry = {"date": item['period_start'], "minutes": item['minutes_total']}
+        if granularity == 'DAY':
+            entry["day"] = item['period_start'].day
+        stations[station_id]["data"].append(entry)
+        stations[station_id]["sum"] += item['minutes_total']
+        total_sum += item['minutes_total']
+
+    # Add one entry for the sum over all stations
+    stations["total"] = {
+        "id": "",
+        "name": "",
+        "sum": total_sum,
+        "data": []
+    }
+    return list(stations.values())
 
 
 def get_stations_analysis(frequency: str):
@@ -23,150 +68,79 @@ def get_stations_analysis(frequency: str):
     Returns:
         list: A list of station workload data.
     """
+    today = timezone.localdate()
     if frequency == "daily":
         # If 'daily', fetch the current day's data
-        today = timezone.now().date()
-        daily_workload = (
-            StationWorkloadDaily.objects
-            .filter(date=today)
-            .order_by('station__id', 'date')
-            .values('station__id', 'station__name', 'date')
-            .annotate(minutes=Sum('minutes_total'))
-        )
-        if len(daily_workload) == 0:
-            return []
         return [
             {
-                "id": item['station__id'],
+                "id": item['station_id'],
                 "name": item['station__name'],
-                "date": item['date'],
-                "minutes": item['minutes']
+                "date": item['period_start'],
+                "minutes": item['minutes_total']
             }
-            for item in daily_workload
+            for item in get_rollups(today, today, 'DAY')
         ]
 
     elif frequency == "monthly":
-        # Calculate the current month's date range
-        today = timezone.now()
-        start_date = today.replace(day=1)
-        next_month = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
-        end_date = next_month - timedelta(days=1)
-
-        # Query daily data for the current month
-        daily_data = (
-            StationWorkloadDaily.objects
-            .filter(date__gte=start_date, date__lte=end_date)
-            .annotate(day=ExtractDay('date'))
-            .values('station__id', 'station__name', 'day')
-            .annotate(minutes=Coalesce(Sum('minutes_total'), Value(0)))
-            .order_by('station__id', 'day')
-        )
-
-        # Structure the data for the desired output
-        stations = {}
-        total_sum = 0
-        for item in daily_data:
-            station_id = item['station__id']
-            if station_id not in stations:
-                stations[station_id] = {
-                    "id": station_id,
-                    "name": item['station__name'],
-                    "sum": 0,
-                    "data": []
-                }
-            stations[station_id]["data"].append({
-                "day": item['day'],
-                "minutes": item['minutes']
-            })
-            stations[station_id]["sum"] += item['minutes']
-            total_sum += item['minutes']
-
-        # Add one entry for the sum over all stations
-        stations["total"] = {
-            "id": "",
-            "name": "",
-            "sum": total_sum,
-            "data": []
-        }
-        return list(stations.values())
+        # The days of the current month
+        return get_workload_analysis(get_period_start(today, 'MONTH'), get_period_end(today, 'MONTH'), 'day')
 
     elif frequency == "quarterly":
-        # Calculate the current quarter's date range
-        today = timezone.now()
-        start_month = today.replace(day=1) - timedelta(days=32)
-        start_date = start_month.replace(day=1)
-        next_month = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
-        end_date = next_month - timedelta(days=1)
-
-        # Query daily data for the current quater
-        daily_data = (
-            StationWorkloadDaily.objects
-            .filter(date__gte=start_date, date__lte=end_date)
-            .annotate(day=ExtractDay('date'))
-            .values('station__id', 'station__name', 'day')
-            .annotate(minutes=Coalesce(Sum('minutes_total'), Value(0)))
-            .order_by('station__id', 'day')
-        )
-
-        # Structure the data for the desired output
-        stations = {}
-        total_sum = 0
-        for item in daily_data:
-            station_id = item['station__id']
-            if station_id not in stations:
-                stations[station_id] = {
-                    "id": station_id,
-                    "name": item['station__name'],
-                    "sum": 0,
-                    "data": []
-                }
-            stations[station_id]["data"].append({
-                "day": item['day'],
-                "minutes": item['minutes']
-            })
-            stations[station_id]["sum"] += item['minutes']
-            total_sum += item['minutes']
-
-        # Add one entry for the sum over all stations
-        stations["total"] = {
-            "id": "",
-            "name": "",
-            "sum": total_sum,
-            "data": []
-        }
-        return list(stations.values())
+        # The days of the current and the two previous months
+        start_date = get_period_start(get_period_start(today, 'MONTH') - timedelta(days=32), 'MONTH')
+        return get_workload_analysis(start_date, get_period_end(today, 'MONTH'), 'day')
 
     else:
         raise ValueError("Invalid frequency. Use 'daily', 'monthly' or 'quarterly'.")
 
 
-def get_missing_classifications_for_station(station_id: int) -> int:
-    """Get number of todays missing classifications for station.
+def get_station_overview(day: date) -> QuerySet:
+    """Get the patient, classified and missing classification counts of all stations in a single query.
+
+    The counts are computed set-based, so the number of queries stays constant no matter how many
+    stations or patients exist.
 
     Args:
-        station_id (int): The ID of the station in the database.
+        day (date): The date for which to count the patients and classifications.
 
     Returns:
-        int: The number of missing classifications.
+        QuerySet: Stations with the annotated counts, ordered by name.
     """
-    today = timezone.now().date()
-    missing_classifications = 0
+    classification_exists = DailyClassification.objects.filter(
+        patient=OuterRef('dailypatientdata__patient'),
+        station=OuterRef('id'),
+        date=day,
+    )
+    on_day = Q(dailypatientdata__date=day)
 
-    patients = (
-        DailyPatientData.objects.filter(station=station_id, date=today)
-        .values_list("patient", flat=True)
-        .distinct()
+    return (
+        Station.objects.annotate(
+            patientCount=Count('dailypatientdata__patient', filter=on_day),
+            scheduledCount=Count('dailypatientdata__patient', filter=on_day, distinct=True),
+            classifiedCount=Count(
+                'dailypatientdata__patient',
+                filter=on_day & Q(Exists(classification_exists)),
+                distinct=True,
+            ),
+        )
+        .annotate(missing_classifications=F('scheduledCount') - F('classifiedCount'))
+        .values('id', 'name', 'patientCount', 'classifiedCount', 'missing_classifications')
+        .order_by('name')
     )
 
-    for patient_id in patients:
-        classification = DailyClassification.objects.filter(
-            patient=patient_id, date=today, station=station_id
-        ).first()
 
-        if classification is None:
-            missing_classifications += 1
+def get_missing_classifications_for_station(station_id: int) -> int:
+    """Get number of todays missing classifications for station.
 
-    return missing_classifications
+    Args:
+        station_id (int): The ID of the station in the database.
+
+    Returns:
+        int: The number of missing classifications.
+    """
+    today = timezone.now().date()
+    station = get_station_overview(today).filter(id=station_id).first()
+    return station['missing_classifications'] if station else 0
 
 
 def get_all_stations() -> list:
@@ -176,29 +150,12 @@ def get_all_stations() -> list:
         list: Stations.
     """
     today = timezone.now().date()
-    stations = (
-        Station.objects.annotate(
-            patientCount=Count(
-                'dailypatientdata__patient',
-                filter=Q(dailypatientdata__date=today),
-            )
-        )
-        .values("id", "name", "patientCount")
-        .order_by("name")
-    )
-
-    stations_list = list(stations)
-
-    for station in stations_list:
-        station_id = station["id"]
-        missing_classifications = get_missing_classifications_for_station(station_id)
-        station["missing_classifications"] = missing_classifications
-
-    return list(stations)
+    return list(get_station_overview(today))
 
 
+@cache_analysis
 def handle_stations_analysis(request) -> JsonResponse:
-    """Endpoint to retrieve station workload analysis.
+    """Endpoint to retrieve station workload analysis, either for a frequency or a granularity and date range.
 
     Args:
         request (HttpRequest): The request object.
@@ -208,11 +165,22 @@ def handle_stations_analysis(request) -> JsonResponse:
     """
     if request.method == 'GET':
         frequency = request.GET.get('frequency')
-        if not frequency:
-            return JsonResponse({"error": "The 'frequency' query parameter is required."}, status=400)
+        granularity = request.GET.get('granularity')
+        if not frequency and not granularity:
+            return JsonResponse(
+                {"error": "The 'frequency' or the 'granularity' query parameter is required."}, status=400
+            )
 
         try:
-            stations = get_stations_analysis(frequency)
+            if granularity:
+                # An arbitrary date range, e.g. ?granularity=week&from=2025-01-01&to=2025-03-31
+                if not request.GET.get('from') or not request.GET.get('to'):
+                    raise ValueError("The 'from' and 'to' query parameters are required with a granularity.")
+                start = date.fromisoformat(request.GET['from'])
+                end = date.fromisoformat(request.GET['to'])
+                stations = get_workload_analysis(start, end, granularity)
+            else:
+                stations = get_stations_analysis(frequency)
             return JsonResponse(stations, safe=False)
         except ValueError as e:
             return JsonResponse({"error": str(e)}, status=400)
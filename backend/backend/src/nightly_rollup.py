@@ -0,0 +1,202 @@
+"""Compute the nightly station workload for all stations and whole date ranges at once.
+
+The night shift caregivers, the daily minutes and the monthly averages are each computed with one grouped query
+over all stations and the whole range and written with bulk upserts, so the number of queries does not depend
+on the number of stations or days. The same functions serve the nightly job and the backfill of a whole year.
+"""
+import logging
+import time
+from calendar import monthrange
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from ..models import DailyClassification, DailyPatientData, Station, StationWorkloadDaily, StationWorkloadMonthly
+from .analysis_cache import invalidate_workload
+from .workload_rollups import get_period_end, get_period_start, refresh_rollups
+
+logger = logging.getLogger(__name__)
+
+WEEKLY_HOURS = 38.5  # Weekly working time of a full-time caregiver
+MINUTES_PER_FULLTIME_EQUIVALENT = WEEKLY_HOURS * 60
+NIGHT_SHIFT_HOURS = 8  # 10 PM until 6 AM
+UPSERT_BATCH_SIZE = 1000  # Rows per bulk upsert
+
+
+def get_days(start: date, end: date) -> list:
+    """Get all dates of a range.
+
+    Args:
+        start (date): The first date.
+        end (date): The last date.
+
+    Returns:
+        list: The dates from start to end.
+    """
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def upsert(model, rows: list, unique_fields: list, update_fields: list) -> int:
+    """Insert or update workload rows with batched bulk upserts.
+
+    Args:
+        model (Model): StationWorkloadDaily or StationWorkloadMonthly.
+        rows (list): The model instances.
+        unique_fields (list): The fields identifying a row.
+        update_fields (list): The fields overwritten if the row already exists.
+
+    Returns:
+        int: The number of upserted rows.
+    """
+    model.objects.bulk_create(
+        rows,
+        batch_size=UPSERT_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=update_fields,
+    )
+    # Bulk upserts do not send the save signals
+    invalidate_workload()
+    return len(rows)
+
+
+def compute_night_shifts(start: date, end: date, station_ids: list = None) -> int:
+    """Compute the caregivers needed in the night shifts of all stations according to the PPBV.
+
+    Args:
+        start (date): The first night, named by the date it starts on.
+        end (date): The last night.
+        station_ids (list, optional): The IDs of the stations, defaults to all stations.
+
+    Returns:
+        int: The number of upserted night shifts.
+    """
+    stations = Station.objects.all()
+    patients = DailyPatientData.objects.filter(date__gte=start, date__lte=end, night_stay=True)
+    if station_ids is not None:
+        stations = stations.filter(id__in=station_ids)
+        patients = patients.filter(station__in=station_ids)
+    ratios = dict(stations.values_list('id', 'max_patients_per_caregiver'))
+    counts = {
+        (row['station_id'], row['date']): row['patients']
+        for row in patients.values('station_id', 'date').annotate(patients=Count('id')).order_by()
+    }
+
+    rows = []
+    for station_id, ratio in ratios.items():
+        for day in get_days(start, end):
+            caregivers = counts.get((station_id, day), 0) / ratio
+            # At least one full-time equivalent according to the PPBV
+            fulltime_equivalents = max(caregivers * NIGHT_SHIFT_HOURS / WEEKLY_HOURS, 1)
+            rows.append(StationWorkloadDaily(
+                station_id=station_id,
+                date=day,
+                shift='NIGHT',
+                PPBV_suggested_caregivers=fulltime_equivalents,
+                minutes_total=int(fulltime_equivalents * MINUTES_PER_FULLTIME_EQUIVALENT),
+            ))
+    return upsert(StationWorkloadDaily, rows, ['station', 'date', 'shift'],
+                  ['PPBV_suggested_caregivers', 'minutes_total'])
+
+
+def compute_daily_minutes(start: date, end: date, station_ids: list = None) -> int:
+    """Sum up the minutes of the classifications of all stations per day.
+
+    Args:
+        start (date): The first date.
+        end (date): The last date.
+        station_ids (list, optional): The IDs of the stations, defaults to all stations.
+
+    Returns:
+        int: The number of upserted days.
+    """
+    classifications = DailyClassification.objects.filter(date__gte=start, date__lte=end)
+    if station_ids is None:
+        station_ids = list(Station.objects.values_list('id', flat=True))
+    else:
+        classifications = classifications.filter(station__in=station_ids)
+    minutes = {
+        (row['station_id'], row['date']): row['minutes']
+        for row in classifications.values('station_id', 'date').annotate(minutes=Sum('result_minutes')).order_by()
+    }
+
+    rows = [
+        StationWorkloadDaily(
+            station_id=station_id,
+            date=day,
+            shift='DAY',
+            minutes_total=minutes.get((station_id, day), 0),
+            PPBV_suggested_caregivers=minutes.get((station_id, day), 0) / MINUTES_PER_FULLTIME_EQUIVALENT,
+        )
+        for station_id in station_ids
+        for day in get_days(start, end)
+    ]
+    return upsert(StationWorkloadDaily, rows, ['station', 'date', 'shift'],
+                  ['minutes_total', 'PPBV_suggested_caregivers'])
+
+
+def compute_monthly_averages(start: date, end: date, station_ids: list = None, shifts: tuple = ('DAY', 'NIGHT')) \
+        -> int:
+    """Compute the monthly averages of all stations from their daily workload.
+
+    The averages are taken over all days of the month, months without any daily workload are skipped.
+
+    Args:
+        start (date): A date of the first month.
+        end (date): A date of the last month.
+        station_ids (list, optional): The IDs of the stations, defaults to all stations.
+        shifts (tuple, optional): The shifts to compute, defaults to both.
+
+    Returns:
+        int: The number of upserted months.
+    """
+    days = StationWorkloadDaily.objects.filter(
+        date__gte=get_period_start(start, 'MONTH'), date__lte=get_period_end(end, 'MONTH'), shift__in=shifts
+    )
+    if station_ids is not None:
+        days = days.filter(station__in=station_ids)
+
+    rows = []
+    for row in days.annotate(month=TruncMonth('date')).values('station_id', 'month', 'shift').annotate(
+        minutes=Sum('minutes_total'), patients=Sum('patients_total'), caregivers=Sum('caregivers_total')
+    ).order_by():
+        days_in_month = monthrange(row['month'].year, row['month'].month)[1]
+        minutes = row['minutes'] or 0
+        rows.append(StationWorkloadMonthly(
+            station_id=row['station_id'],
+            month=row['month'],
+            shift=row['shift'],
+            patients_avg=(row['patients'] or 0) / days_in_month,
+            actual_caregivers_avg=(row['caregivers'] or 0) / days_in_month,
+            # According to article 4.2 of the PPBV
+            suggested_caregivers_avg=minutes / MINUTES_PER_FULLTIME_EQUIVALENT / days_in_month,
+            minutes_total=minutes,
+        ))
+    return upsert(StationWorkloadMonthly, rows, ['station', 'month', 'shift'],
+                  ['patients_avg', 'actual_caregivers_avg', 'suggested_caregivers_avg', 'minutes_total'])
+
+
+def run_nightly_rollup(start: date, end: date) -> dict:
+    """Compute the night shifts, the daily minutes, the monthly averages and the analysis rollups of a range.
+
+    Args:
+        start (date): The first date.
+        end (date): The last date.
+
+    Returns:
+        dict: The number of upserted rows per step and the duration in seconds.
+    """
+    started = time.perf_counter()
+    with transaction.atomic():
+        statistics = {
+            'night_shifts': compute_night_shifts(start, end),
+            'days': compute_daily_minutes(start, end),
+            # The months depend on the daily workload computed before
+            'months': compute_monthly_averages(start, end),
+            'rollups': refresh_rollups(start, end),
+        }
+    statistics['seconds'] = round(time.perf_counter() - started, 3)
+    logger.info("Rolled up the workload from %s to %s: %s", start, end, statistics)
+    return statistics
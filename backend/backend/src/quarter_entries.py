@@ -0,0 +1,103 @@
+"""Keep a ledger of the quarters in which patients used their quarter entry.
+
+The quarter entry grants the admission minutes to one repeating semi-stationary visit per quarter. It is
+flagged on the patient data of that day and mirrored into the QuarterEntry ledger, keyed by patient and the
+first day of the quarter, so that the check for a used entry is a single index lookup.
+"""
+from datetime import date
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from ..models import DailyPatientData, QuarterEntry
+
+
+def get_quarter_start(day: date) -> date:
+    """Get the first day of the quarter of a date.
+
+    Args:
+        day (date): The date.
+
+    Returns:
+        date: The first day of the quarter.
+    """
+    return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+
+
+def has_quarter_entry(patient_id: int, day: date) -> bool:
+    """Check if a patient already used the quarter entry in the quarter of a date.
+
+    Args:
+        patient_id (int): The ID of the patient.
+        day (date): The date.
+
+    Returns:
+        bool: True if the quarter entry was used, False otherwise.
+    """
+    return QuarterEntry.objects.filter(patient=patient_id, quarter=get_quarter_start(day)).exists()
+
+
+def get_quarter_entries(patient_ids: set, start: date, end: date) -> set:
+    """Find the quarters in which patients used their quarter entry with a single query.
+
+    Args:
+        patient_ids (set): The IDs of the patients.
+        start (date): The first date whose quarter is needed.
+        end (date): The last date whose quarter is needed.
+
+    Returns:
+        set: The (patient ID, first day of the quarter) of every used quarter entry.
+    """
+    return set(
+        QuarterEntry.objects.filter(
+            patient__in=patient_ids,
+            quarter__gte=get_quarter_start(start),
+            quarter__lte=get_quarter_start(end),
+        ).values_list('patient_id', 'quarter')
+    )
+
+
+def use_quarter_entry(patient_data_id: int, patient_id: int, day: date) -> None:
+    """Flag the patient data of a day as using the quarter entry and record it in the ledger.
+
+    Args:
+        patient_data_id (int): The ID of the patient data of the day.
+        patient_id (int): The ID of the patient.
+        day (date): The date of the patient data.
+    """
+    DailyPatientData.objects.filter(id=patient_data_id).update(uses_quarter_entry=True)
+    QuarterEntry.objects.get_or_create(
+        patient_data_id=patient_data_id,
+        defaults={'patient_id': patient_id, 'quarter': get_quarter_start(day)},
+    )
+
+
+def sync_quarter_entries(patient_data: QuerySet = None) -> int:
+    """Record flagged patient data missing in the ledger, e.g. after an import.
+
+    Args:
+        patient_data (QuerySet, optional): The patient data to sync, defaults to all.
+
+    Returns:
+        int: The number of flagged patient-days.
+    """
+    if patient_data is None:
+        patient_data = DailyPatientData.objects.all()
+    entries = [
+        QuarterEntry(patient_data_id=patient_data_id, patient_id=patient_id, quarter=get_quarter_start(day))
+        for patient_data_id, patient_id, day in patient_data.filter(uses_quarter_entry=True).values_list(
+            'id', 'patient_id', 'date'
+        )
+    ]
+    QuarterEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(entries)
+
+
+@receiver(post_save, sender=DailyPatientData)
+def handle_patient_data_change(sender, instance, **kwargs) -> None:
+    """Keep the ledger in line with patient data saved directly, e.g. in the admin panel or from a fixture."""
+    if instance.uses_quarter_entry:
+        sync_quarter_entries(DailyPatientData.objects.filter(id=instance.id))
+    else:
+        QuarterEntry.objects.filter(patient_data=instance.id).delete()
@@ -0,0 +1,118 @@
+"""Count the database queries of every request and report them in a Server-Timing header.
+
+The middleware is enabled with QUERY_PROFILING. If it is disabled, Django drops it when loading the middleware,
+so requests do not pass through it at all. If it is enabled, an execute wrapper times every query of the request
+and groups them by fingerprint, the SQL with its values and IN lists collapsed. Requests above QUERY_BUDGET
+queries or LATENCY_BUDGET milliseconds are logged together with the fingerprints executed at least
+REPEATED_QUERY_THRESHOLD times, which are usually queries issued in a loop (N+1).
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from typing import Iterator
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+WHITESPACE = re.compile(r'\s+')
+
+
+def get_fingerprint(sql: str) -> str:
+    """Get the fingerprint of a query, which is the same for all executions of the query with other values.
+
+    Args:
+        sql (str): The executed SQL with placeholders.
+
+    Returns:
+        str: The SQL with IN lists, literals and whitespace collapsed.
+    """
+    sql = IN_LIST.sub('(...)', sql)
+    sql = LITERAL.sub('?', sql)
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryProfile:
+    """Database execute wrapper counting and timing the queries of a request."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[get_fingerprint(sql)] += 1
+
+    def record(self) -> ExitStack:
+        """Install the wrapper on all database connections of the current thread until the stack is closed."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    def get_repeated(self) -> list:
+        """Get the fingerprints executed at least REPEATED_QUERY_THRESHOLD times, most frequent first."""
+        return [
+            (count, fingerprint) for fingerprint, count in self.fingerprints.most_common()
+            if count >= settings.REPEATED_QUERY_THRESHOLD
+        ]
+
+
+class QueryProfilingMiddleware:
+    """Add the number and duration of the queries to the response and log requests above the budgets.
+
+    The queries of a streaming response are executed while it is sent, after its headers. Its Server-Timing
+    header therefore only covers the queries before the stream, while the budgets are checked after it.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = QueryProfile()
+        started = time.perf_counter()
+        with profile.record():
+            response = self.get_response(request)
+
+        milliseconds = (time.perf_counter() - started) * 1000
+        timing = f'db;desc="{profile.count} queries";dur={profile.seconds * 1000:.1f}, total;dur={milliseconds:.1f}'
+        if response.has_header('Server-Timing'):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response['Server-Timing'] = timing
+
+        if response.streaming:
+            response.streaming_content = self.stream(request, response.streaming_content, profile, started)
+        else:
+            self.check_budgets(request, profile, milliseconds)
+        return response
+
+    def stream(self, request, content: Iterator, profile: QueryProfile, started: float) -> Iterator:
+        """Pass the content of a streaming response through while its queries are recorded."""
+        with profile.record():
+            yield from content
+        self.check_budgets(request, profile, (time.perf_counter() - started) * 1000)
+
+    def check_budgets(self, request, profile: QueryProfile, milliseconds: float) -> None:
+        """Log the request with its repeated queries if it exceeded the query or latency budget."""
+        if profile.count <= settings.QUERY_BUDGET and milliseconds <= settings.LATENCY_BUDGET:
+            return
+        repeated = ''.join(f'\n  {count}x {fingerprint}' for count, fingerprint in profile.get_repeated())
+        logger.warning(
+            "%s %s took %.1f ms with %d queries in %.1f ms (budgets: %d queries, %d ms)%s",
+            request.method, request.get_full_path(), milliseconds, profile.count, profile.seconds * 1000,
+            settings.QUERY_BUDGET, settings.LATENCY_BUDGET, repeated,
+        )
@@ -0,0 +1,236 @@
+"""Cache the PPBV questionnaire catalog once per process.
+
+The catalog only changes when the questions fixture is loaded or an admin edits an option. It is therefore
+built once and kept under a version key, which is replaced once the save or deletion of a care service option,
+field or category is committed. Fixture loads are covered as well, since loaddata sends the save signals.
+
+The catalog is immutable. The selections of a classification are overlaid per request by picking one of two
+prebuilt variants of each option (selected or not), so no option is copied or modified per request.
+"""
+import threading
+from collections import defaultdict
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ..models import CareServiceCategory, CareServiceField, CareServiceOption, IsCareServiceUsed
+
+CATALOG_VERSION_KEY = 'question_catalog_version'
+
+_catalog = {'version': None, 'options': [], 'grouped': [], 'variants': {}}
+_catalog_lock = threading.Lock()
+
+
+def group_questions(questions: list) -> list:
+    """Group the questions by field, category and severity.
+
+    Args:
+        questions (list): The questions to group.
+
+    Returns:
+        list: The questions grouped by field, category and severity.
+    """
+    # Sort questions by id to always get the same order
+    questions = sorted(questions, key=lambda x: (x['id']))
+    grouped_questions = []
+
+    def split_by_attribute(objects, attribute):
+        grouped = defaultdict(list)
+
+        for obj in objects:
+            key = obj.get(attribute)
+            grouped[key].append(obj)
+
+        return grouped.values()
+
+    fields = split_by_attribute(questions, "field__name")
+
+    for field in fields:
+        field_name = field[0]["field__name"]
+        field_value = {
+            "id": 1,
+            "name": field_name,
+            "short": field[0]["field__short"],
+            "categories": []
+        }
+
+        categories = split_by_attribute(field, "category__name")
+
+        for category in categories:
+            category_name = category[0]['category__name']
+            category_value = {
+                "id": 1,
+                "name": category_name,
+                "short": category[0]['category__short'],
+                "severities": []
+            }
+            severities = split_by_attribute(category, "severity")
+
+            for severity in severities:
+                # Skip the questions that are not needed
+                if field[0]["field__short"] == 'A' and severity[0]['severity'] == 1:
+                    continue
+                if field[0]["field__short"] == 'S' and severity[0]['severity'] == 1:
+                    continue
+                if field[0]["field__short"] == 'S' and severity[0]['severity'] == 4:
+                    continue
+                severity_index = severity[0]['severity']
+                severity_value = {
+                    "severity": severity_index,
+                    "questions": severity
+                }
+
+                category_value["severities"].append(severity_value)
+            field_value["categories"].append(category_value)
+        grouped_questions.append(field_value)
+
+    return grouped_questions
+
+
+def get_catalog_version() -> str:
+    """Get the current version of the catalog, creating one if none exists yet.
+
+    Returns:
+        str: The version key of the catalog.
+    """
+    return cache.get_or_set(CATALOG_VERSION_KEY, lambda: uuid4().hex, timeout=None)
+
+
+def invalidate_catalog() -> None:
+    """Replace the version key once the current transaction is committed.
+
+    Replacing it only after the commit ensures that no catalog of the new version is built from the old rows.
+    """
+    transaction.on_commit(replace_catalog_version)
+
+
+def replace_catalog_version() -> None:
+    """Replace the version key so that every process rebuilds its catalog on the next access."""
+    cache.set(CATALOG_VERSION_KEY, uuid4().hex, timeout=None)
+    with _catalog_lock:
+        _catalog['version'] = None
+
+
+def build_catalog() -> dict:
+    """Load all care service options from the database and group them.
+
+    Returns:
+        dict: The options sorted by ID and the options grouped by field, category and severity.
+    """
+    options = list(
+        CareServiceOption.objects.select_related('field', 'category').values(
+            'id',
+            'field__name',
+            'field__short',
+            'category__name',
+            'category__short',
+            'name',
+            'severity',
+            'description',
+            'short'
+        ).order_by('id')
+    )
+    # Prebuild the unselected and the selected variant of each option for the selection overlay
+    variants = {
+        option['id']: ({**option, 'selected': False}, {**option, 'selected': True})
+        for option in options
+    }
+    return {'options': options, 'grouped': group_questions(options), 'variants': variants}
+
+
+def get_catalog() -> dict:
+    """Get the catalog of the current version, building it only if it is outdated.
+
+    The returned options are shared between requests and must not be modified.
+
+    Returns:
+        dict: The options sorted by ID, the options grouped by field, category and severity and the
+            unselected and selected variant per option ID.
+    """
+    version = get_catalog_version()
+    with _catalog_lock:
+        if _catalog['version'] != version:
+            _catalog.update(build_catalog(), version=version)
+        return {'options': _catalog['options'], 'grouped': _catalog['grouped'], 'variants': _catalog['variants']}
+
+
+def get_selected_option_ids(classification_id: int) -> frozenset:
+    """Load the IDs of all care service options used in a classification with a single query.
+
+    Args:
+        classification_id (int): The ID of the classification, None if there is no classification.
+
+    Returns:
+        frozenset: The IDs of the selected care service options.
+    """
+    if classification_id is None:
+        return frozenset()
+    return frozenset(
+        IsCareServiceUsed.objects.filter(classification=classification_id)
+        .values_list('care_service_option', flat=True)
+    )
+
+
+def overlay_options(catalog: dict, selected_ids: frozenset) -> list:
+    """Get the options of the catalog with the 'selected' attribute.
+
+    Args:
+        catalog (dict): The catalog to overlay the selections on.
+        selected_ids (frozenset): The IDs of the selected care service options.
+
+    Returns:
+        list: The shared option variants matching the selections, sorted by ID.
+    """
+    variants = catalog['variants']
+    return [variants[option['id']][option['id'] in selected_ids] for option in catalog['options']]
+
+
+def overlay_grouped(catalog: dict, selected_ids: frozenset) -> list:
+    """Get the grouped questions of the catalog with the 'selected' attribute.
+
+    Only the containers of the tree are created per call, the questions are the shared option variants.
+
+    Args:
+        catalog (dict): The catalog to overlay the selections on.
+        selected_ids (frozenset): The IDs of the selected care service options.
+
+    Returns:
+        list: The questions grouped by field, category and severity with the 'selected' attribute.
+    """
+    variants = catalog['variants']
+    return [
+        {
+            **field,
+            'categories': [
+                {
+                    **category,
+                    'severities': [
+                        {
+                            **severity,
+                            'questions': [
+                                variants[question['id']][question['id'] in selected_ids]
+                                for question in severity['questions']
+                            ]
+                        }
+                        for severity in category['severities']
+                    ]
+                }
+                for category in field['categories']
+            ]
+        }
+        for field in catalog['grouped']
+    ]
+
+
+@receiver(post_save, sender=CareServiceOption)
+@receiver(post_save, sender=CareServiceField)
+@receiver(post_save, sender=CareServiceCategory)
+@receiver(post_delete, sender=CareServiceOption)
+@receiver(post_delete, sender=CareServiceField)
+@receiver(post_delete, sender=CareServiceCategory)
+def handle_catalog_change(sender, **kwargs) -> None:
+    """Invalidate the catalog whenever one of its models is saved, deleted or loaded from a fixture."""
+    invalidate_catalog()
@@ -0,0 +1,184 @@
+"""Run the periodic jobs registered in code, either in one long-lived scheduler process or as management commands.
+
+Every job runs once per day for the previous day. Before running, a process takes the job's lock with a
+conditional update in the database, which only succeeds for one process even if several try at once. The lock
+expires after SCHEDULER_LOCK_TIMEOUT seconds, so a process that stopped during a run does not block the job
+forever. The last date a job completed for is stored with it, so days missed during a downtime are caught up
+in order, and every run is recorded with its duration and the number of written rows.
+"""
+import logging
+import os
+import socket
+import time
+from datetime import date, datetime, time as daytime, timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import JobRun, ScheduledJob
+from .nightly_rollup import get_days, run_nightly_rollup
+
+logger = logging.getLogger(__name__)
+
+
+def rollup_workload(day: date) -> int:
+    """Compute the night shifts, daily minutes, monthly averages and analysis rollups of all stations for a day.
+
+    Args:
+        day (date): The date to compute.
+
+    Returns:
+        int: The number of written rows.
+    """
+    statistics = run_nightly_rollup(day, day)
+    return sum(statistics[step] for step in ('night_shifts', 'days', 'months', 'rollups'))
+
+
+# The function run for a date and the local time from which on the previous day is due
+JOBS = {
+    'rollup_workload': {'function': rollup_workload, 'run_at': daytime(0, 5)},
+}
+
+
+def get_worker() -> str:
+    """Get the host and process ID identifying the lock holder."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def get_due_dates(last_run_for: date, run_at: daytime, now: datetime) -> list:
+    """Get the dates a job still has to run for.
+
+    Args:
+        last_run_for (date): The last date the job completed for, None if it never ran.
+        run_at (time): The local time from which on the previous day is due.
+        now (datetime): The current time.
+
+    Returns:
+        list: The due dates in order, only the latest one if the job never ran.
+    """
+    local = timezone.localtime(now)
+    last_due = local.date() - timedelta(days=1 if local.time() >= run_at else 2)
+    first_due = last_run_for + timedelta(days=1) if last_run_for else last_due
+    return get_days(first_due, last_due)
+
+
+def acquire_lock(name: str, worker: str) -> bool:
+    """Take the lock of a job if it is free, expired or already held by the worker.
+
+    Args:
+        name (str): The name of the job.
+        worker (str): The host and process ID of the caller.
+
+    Returns:
+        bool: Whether the worker holds the lock now.
+    """
+    now = timezone.now()
+    ScheduledJob.objects.get_or_create(name=name)
+    # Only one process can move the lock to itself
+    return ScheduledJob.objects.filter(name=name).filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now) | Q(locked_by=worker)
+    ).update(locked_by=worker, locked_until=now + timedelta(seconds=settings.SCHEDULER_LOCK_TIMEOUT)) == 1
+
+
+def release_lock(name: str, worker: str) -> None:
+    """Release the lock of a job if the worker still holds it.
+
+    Args:
+        name (str): The name of the job.
+        worker (str): The host and process ID of the caller.
+    """
+    ScheduledJob.objects.filter(name=name, locked_by=worker).update(locked_by='', locked_until=None)
+
+
+def run_job(name: str, day: date, worker: str) -> JobRun:
+    """Run a job for a date and record the run. The caller has to hold the job's lock.
+
+    Args:
+        name (str): The name of the job.
+        day (date): The date to run the job for.
+        worker (str): The host and process ID of the caller.
+
+    Returns:
+        JobRun: The finished run.
+    """
+    run = JobRun.objects.create(job=ScheduledJob.objects.get(name=name), run_for=day, worker=worker,
+                                started_at=timezone.now())
+    started = time.perf_counter()
+    try:
+        run.rows = JOBS[name]['function'](day)
+        run.status = 'SUCCEEDED'
+    except Exception as e:
+        logger.exception("Job %s failed for %s", name, day)
+        run.status = 'FAILED'
+        run.error = str(e)
+    run.duration = round(time.perf_counter() - started, 3)
+    run.finished_at = timezone.now()
+    run.save(update_fields=['status', 'rows', 'error', 'duration', 'finished_at'])
+    if run.status == 'SUCCEEDED':
+        logger.info("Ran job %s for %s: %d rows in %s s", name, day, run.rows, run.duration)
+    return run
+
+
+def run_due_dates(name: str, now: datetime = None) -> list:
+    """Run a job for all dates it is due for, oldest first.
+
+    The catch-up stops at the first failed run, so no date is skipped. A failed date is retried once
+    SCHEDULER_RETRY_DELAY seconds have passed.
+
+    Args:
+        name (str): The name of the job.
+        now (datetime, optional): The current time, defaults to now.
+
+    Returns:
+        list: The runs, empty if nothing was due or another process holds the lock.
+    """
+    now = now or timezone.now()
+    worker = get_worker()
+    if not acquire_lock(name, worker):
+        logger.info("Skipped job %s, it is locked by another process", name)
+        return []
+
+    runs = []
+    try:
+        job = ScheduledJob.objects.get(name=name)
+        for day in get_due_dates(job.last_run_for, JOBS[name]['run_at'], now):
+            retry_at = now - timedelta(seconds=settings.SCHEDULER_RETRY_DELAY)
+            if JobRun.objects.filter(job=job, run_for=day, status='FAILED', finished_at__gt=retry_at).exists():
+                break
+            run = run_job(name, day, worker)
+            runs.append(run)
+            if run.status == 'FAILED':
+                break
+            # Store the progress and extend the lock for the next date, unless the lock expired and was taken
+            if not ScheduledJob.objects.filter(name=name, locked_by=worker).update(
+                last_run_for=day,
+                locked_until=timezone.now() + timedelta(seconds=settings.SCHEDULER_LOCK_TIMEOUT),
+            ):
+                logger.warning("Stopped job %s, its lock was taken by another process", name)
+                break
+    finally:
+        release_lock(name, worker)
+    return runs
+
+
+def run_scheduler(poll_interval: float, once: bool = False) -> None:
+    """Run all registered jobs whenever they are due until stopped.
+
+    Args:
+        poll_interval (float): The seconds to wait between two checks for due jobs.
+        once (bool, optional): Stop after the first check.
+    """
+    while True:
+        # The process lives for days, so connections dropped by the database have to be replaced
+        close_old_connections()
+        for name in JOBS:
+            # A failing job must not stop the scheduler, it is retried with the next check
+            try:
+                run_due_dates(name)
+            except Exception:
+                logger.exception("Running job %s failed", name)
+        if once:
+            return
+        time.sleep(poll_interval)
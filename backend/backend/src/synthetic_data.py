@@ -0,0 +1,449 @@
+"""Generate synthetic stations, patients, stays and classifications at any scale.
+
+Fully stationary patients are admitted with fewer admissions on weekends, stay for a log-normally distributed
+number of days, are rather discharged on weekdays and are partly transferred to another station during their
+stay. Semi-stationary patients come for a series of weekly or biweekly visits on the same station, using the
+quarter entry on their first repeating visit per quarter. Most patient-days are classified, selecting care
+service options with a density growing with the frailty of the patient, and their care groups and minutes are
+computed with the batch classification engine, so they are the same as if the options were selected one by one.
+
+The rows are written with bulk_create in chunks, so the memory does not depend on the generated volume.
+"""
+import logging
+import time
+from collections import Counter
+from datetime import date, datetime, time as daytime, timedelta
+from typing import Iterator
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ..models import DailyClassification, DailyPatientData, IsCareServiceUsed, Patient, Station, StationWorkloadDaily
+from .batch_classification import build_option_layout, classify_batch
+from .classification_snapshot import invalidate_snapshot
+from .nightly_rollup import run_nightly_rollup, upsert
+from .quarter_entries import get_quarter_start, sync_quarter_entries
+from .question_catalog import get_catalog
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_WEEKDAY_WEIGHTS = np.array([1.0, 1.0, 0.9, 0.9, 0.8, 0.3, 0.25])  # Monday to Sunday
+WEEKEND_DISCHARGE_DELAY = 0.6  # Probability that a discharge on a weekend is moved to Monday
+STAY_MEDIAN_DAYS = 5
+STAY_SIGMA = 0.8  # Spread of the log-normal length of stay
+MAX_STAY_DAYS = 60
+SEMI_STATIONARY_SHARE = 0.2  # Patients coming for semi-stationary visits
+SEMI_STATIONARY_VISITS = (2, 10)  # Smallest and largest number of visits of a series
+SEMI_STATIONARY_INTERVALS = (7, 14)  # Days between two visits
+TRANSFER_SHARE = 0.15  # Fully stationary stays moved to another station
+ISOLATION_SHARE = 0.05
+INTENSIVE_CARE_SHARE = 0.1
+CHILD_CARE_SHARE = 0.1
+PATIENTS_PER_CAREGIVER = (10, 15, 20, 22)  # Ratios of normal stations, intensive care stations use 2
+ROOMS_PER_STATION = 15
+BEDS_PER_ROOM = 3
+
+# Probability to select an option of each severity on a day of a patient with average frailty
+SELECTION_PROBABILITIES = {1: 0.25, 2: 0.12, 3: 0.06, 4: 0.03}
+
+FIRST_NAMES = ('Anna', 'Ben', 'Clara', 'David', 'Emma', 'Felix', 'Greta', 'Hans', 'Ida', 'Jonas', 'Karla', 'Lukas',
+               'Marie', 'Noah', 'Olga', 'Paul', 'Rosa', 'Stefan', 'Tina', 'Uwe')
+LAST_NAMES = ('Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner', 'Becker', 'Schulz', 'Hoffmann',
+              'Koch', 'Richter', 'Klein', 'Wolf', 'Schröder', 'Neumann')
+
+PATIENT_DATA_FIELDS = (
+    'station_id',
+    'patient_id',
+    'date',
+    'is_semi_stationary',
+    'is_fully_stationary',
+    'day_of_admission',
+    'day_of_discharge',
+    'is_repeating_visit',
+    'uses_quarter_entry',
+    'night_stay',
+    'day_stay',
+    'room_name',
+    'bed_number',
+    'barthel_index',
+    'expanded_barthel_index',
+    'mini_mental_status',
+)
+
+
+def get_next_id(model) -> int:
+    """Get the first free ID of a model with manually assigned IDs."""
+    return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+
+def create_stations(count: int, rng: np.random.Generator) -> list:
+    """Create stations, a share of them intensive care or child care units.
+
+    Args:
+        count (int): The number of stations.
+        rng (Generator): The random number generator.
+
+    Returns:
+        list: The IDs of the created stations.
+    """
+    first_id = get_next_id(Station)
+    stations = []
+    for station_id in range(first_id, first_id + count):
+        is_intensive_care = bool(rng.random() < INTENSIVE_CARE_SHARE)
+        stations.append(Station(
+            id=station_id,
+            name=f'Station {station_id}',
+            is_intensive_care=is_intensive_care,
+            is_child_care_unit=bool(rng.random() < CHILD_CARE_SHARE),
+            max_patients_per_caregiver=2 if is_intensive_care else float(rng.choice(PATIENTS_PER_CAREGIVER)),
+        ))
+    Station.objects.bulk_create(stations)
+    return [station.id for station in stations]
+
+
+def create_patients(count: int, rng: np.random.Generator, chunk_size: int) -> list:
+    """Create patients with random names.
+
+    Args:
+        count (int): The number of patients.
+        rng (Generator): The random number generator.
+        chunk_size (int): The number of patients inserted at once.
+
+    Returns:
+        list: The IDs of the created patients.
+    """
+    first_id = get_next_id(Patient)
+    first_names = rng.choice(FIRST_NAMES, count).tolist()
+    last_names = rng.choice(LAST_NAMES, count).tolist()
+    Patient.objects.bulk_create(
+        [
+            Patient(id=first_id + index, first_name=first_names[index], last_name=last_names[index])
+            for index in range(count)
+        ],
+        batch_size=chunk_size,
+    )
+    return list(range(first_id, first_id + count))
+
+
+def get_scores(frailty: float) -> dict:
+    """Get the barthel index, the expanded barthel index and the mini mental status of a patient.
+
+    Args:
+        frailty (float): The frailty of the patient between 0 and 1.
+
+    Returns:
+        dict: The scores, decreasing with the frailty.
+    """
+    return {
+        'barthel_index': int(round((1 - frailty) * 20)) * 5,
+        'expanded_barthel_index': int(round((1 - frailty) * 90)),
+        'mini_mental_status': int(round((1 - 0.6 * frailty) * 30)),
+    }
+
+
+def generate_stay(patient_id: int, station_ids: list, admission_day: date, start: date, end: date,
+                  rng: np.random.Generator) -> list:
+    """Generate the patient-days of a fully stationary stay, possibly with a transfer to another station.
+
+    Args:
+        patient_id (int): The ID of the patient.
+        station_ids (list): The IDs of all stations.
+        admission_day (date): The day of the admission, may be before the start.
+        start (date): The first generated date.
+        end (date): The last generated date.
+        rng (Generator): The random number generator.
+
+    Returns:
+        list: The patient-days within the generated range.
+    """
+    length = int(min(max(round(rng.lognormal(np.log(STAY_MEDIAN_DAYS), STAY_SIGMA)), 1), MAX_STAY_DAYS))
+    discharge_day = admission_day + timedelta(days=length)
+    if discharge_day.weekday() >= 5 and rng.random() < WEEKEND_DISCHARGE_DELAY:
+        discharge_day += timedelta(days=7 - discharge_day.weekday())
+    admission = timezone.make_aware(datetime.combine(admission_day, daytime(int(rng.integers(7, 20)))))
+    discharge = timezone.make_aware(datetime.combine(discharge_day, daytime(int(rng.integers(9, 16)))))
+
+    stations = [int(rng.choice(station_ids))]
+    transfer_day = None
+    if len(station_ids) > 1 and length > 1 and rng.random() < TRANSFER_SHARE:
+        transfer_day = admission_day + timedelta(days=int(rng.integers(1, length)))
+        stations.append(int(rng.choice([station_id for station_id in station_ids if station_id != stations[0]])))
+
+    frailty = rng.beta(2, 3)
+    rooms = [(f'Room {rng.integers(1, ROOMS_PER_STATION + 1)}', str(rng.integers(1, BEDS_PER_ROOM + 1)))
+             for _ in stations]
+    days = []
+    day = max(admission_day, start)
+    while day <= min(discharge_day, end):
+        segment = 1 if transfer_day and day >= transfer_day else 0
+        days.append({
+            'station_id': stations[segment],
+            'patient_id': patient_id,
+            'date': day,
+            'is_semi_stationary': False,
+            'is_fully_stationary': True,
+            'day_of_admission': admission,
+            'day_of_discharge': discharge,
+            'is_repeating_visit': False,
+            'uses_quarter_entry': False,
+            'night_stay': day != discharge_day,
+            'day_stay': True,
+            'room_name': rooms[segment][0],
+            'bed_number': rooms[segment][1],
+            **get_scores(frailty),
+            'frailty': frailty,
+            'is_day_of_admission': day == admission_day,
+            'has_entry_for_current_quarter': False,
+        })
+        day += timedelta(days=1)
+    return days
+
+
+def generate_visits(patient_id: int, station_ids: list, first_day: date, start: date, end: date,
+                    rng: np.random.Generator) -> list:
+    """Generate a series of semi-stationary visits on one station.
+
+    The first visit is a new one, the following ones are repeating visits. The first generated repeating visit
+    of each quarter uses the quarter entry, the later ones of the quarter do not get the admission minutes again.
+
+    Args:
+        patient_id (int): The ID of the patient.
+        station_ids (list): The IDs of all stations.
+        first_day (date): The day of the first visit, may be before the start.
+        start (date): The first generated date.
+        end (date): The last generated date.
+        rng (Generator): The random number generator.
+
+    Returns:
+        list: The patient-days of the visits within the generated range.
+    """
+    station_id = int(rng.choice(station_ids))
+    interval = timedelta(days=int(rng.choice(SEMI_STATIONARY_INTERVALS)))
+    visits = int(rng.integers(SEMI_STATIONARY_VISITS[0], SEMI_STATIONARY_VISITS[1] + 1))
+    frailty = rng.beta(2, 5)
+    used_quarters = set()
+    days = []
+    for visit in range(visits):
+        day = first_day + visit * interval
+        if day > end:
+            break
+        if day < start:
+            continue
+        quarter = get_quarter_start(day)
+        uses_quarter_entry = visit > 0 and quarter not in used_quarters
+        if uses_quarter_entry:
+            used_quarters.add(quarter)
+        days.append({
+            'station_id': station_id,
+            'patient_id': patient_id,
+            'date': day,
+            'is_semi_stationary': True,
+            'is_fully_stationary': False,
+            'day_of_admission': timezone.make_aware(datetime.combine(day, daytime(8))),
+            'day_of_discharge': timezone.make_aware(datetime.combine(day, daytime(15))),
+            'is_repeating_visit': visit > 0,
+            'uses_quarter_entry': uses_quarter_entry,
+            'night_stay': False,
+            'day_stay': True,
+            'room_name': 'Day clinic',
+            'bed_number': str(rng.integers(1, BEDS_PER_ROOM + 1)),
+            **get_scores(frailty),
+            'frailty': frailty,
+            'is_day_of_admission': True,
+            'has_entry_for_current_quarter': visit > 0 and not uses_quarter_entry,
+        })
+    return days
+
+
+def generate_patient_days(patient_ids: list, station_ids: list, start: date, end: date, rng: np.random.Generator) \
+        -> Iterator[dict]:
+    """Generate the patient-days of all patients, one patient after the other.
+
+    Stays and series of visits may begin before the start, so the stations are already occupied on the first day.
+
+    Args:
+        patient_ids (list): The IDs of the patients.
+        station_ids (list): The IDs of the stations.
+        start (date): The first generated date.
+        end (date): The last generated date.
+        rng (Generator): The random number generator.
+
+    Yields:
+        dict: The next patient-day with the patient data and the inputs of its classification.
+    """
+    first_admission = start - timedelta(days=STAY_MEDIAN_DAYS * 2)
+    candidates = [first_admission + timedelta(days=offset) for offset in range((end - first_admission).days + 1)]
+    weights = ADMISSION_WEEKDAY_WEIGHTS[[day.weekday() for day in candidates]]
+    admission_days = rng.choice(len(candidates), size=len(patient_ids), p=weights / weights.sum())
+    is_semi_stationary = rng.random(len(patient_ids)) < SEMI_STATIONARY_SHARE
+
+    for patient_id, admission_index, semi_stationary in zip(patient_ids, admission_days, is_semi_stationary):
+        if semi_stationary:
+            yield from generate_visits(patient_id, station_ids, candidates[admission_index], start, end, rng)
+        else:
+            yield from generate_stay(patient_id, station_ids, candidates[admission_index], start, end, rng)
+
+
+def write_chunk(days: list, layout: dict, probabilities: np.ndarray, classified_share: float,
+                rng: np.random.Generator) -> dict:
+    """Write the patient data of a chunk of patient-days and classify a share of them.
+
+    Args:
+        days (list): The patient-days.
+        layout (dict): The option layout of the selection matrix.
+        probabilities (ndarray): The probability to select each option on a day of average frailty.
+        classified_share (float): The share of classified patient-days.
+        rng (Generator): The random number generator.
+
+    Returns:
+        dict: The number of written classifications and selected options.
+    """
+    DailyPatientData.objects.bulk_create(
+        [DailyPatientData(**{field: day[field] for field in PATIENT_DATA_FIELDS}) for day in days],
+        batch_size=len(days),
+    )
+
+    classified = [day for day in days if rng.random() < classified_share]
+    frailty = np.array([day['frailty'] for day in classified])
+    selections = rng.random((len(classified), len(layout['ids']))) < (
+        probabilities[np.newaxis, :] * (0.5 + 1.5 * frailty[:, np.newaxis])
+    )
+    flags = {flag: np.array([day[flag] for day in classified], dtype=bool) for flag in (
+        'is_semi_stationary', 'is_fully_stationary', 'is_day_of_admission', 'is_repeating_visit',
+        'has_entry_for_current_quarter',
+    )}
+    flags['is_in_isolation'] = rng.random(len(classified)) < ISOLATION_SHARE
+    result = classify_batch(
+        selections,
+        layout,
+        np.array([day['barthel_index'] for day in classified]),
+        np.array([day['expanded_barthel_index'] for day in classified]),
+        np.array([day['mini_mental_status'] for day in classified]),
+        flags,
+    )
+
+    classifications = DailyClassification.objects.bulk_create(
+        [
+            DailyClassification(
+                patient_id=day['patient_id'],
+                station_id=day['station_id'],
+                date=day['date'],
+                is_in_isolation=bool(flags['is_in_isolation'][row]),
+                # The minutes are stored as integer
+                result_minutes=int(result['minutes'][row]),
+                a_index=int(result['a_index'][row]),
+                s_index=int(result['s_index'][row]),
+            )
+            for row, day in enumerate(classified)
+        ],
+        batch_size=len(days),
+    )
+    rows, columns = np.nonzero(selections)
+    IsCareServiceUsed.objects.bulk_create(
+        [
+            IsCareServiceUsed(classification_id=classifications[row].id, care_service_option_id=option_id)
+            for row, option_id in zip(rows.tolist(), layout['ids'][columns].tolist())
+        ],
+        batch_size=len(days),
+    )
+    return {'classifications': len(classifications), 'selections': len(rows)}
+
+
+def write_shift_plans(occupancy: Counter, station_ids: list, start: date, end: date, rng: np.random.Generator) \
+        -> int:
+    """Write the patients and the caregivers of both shifts of all stations and days, like the shift plan import.
+
+    Args:
+        occupancy (Counter): The number of patients per station, date and shift.
+        station_ids (list): The IDs of the stations.
+        start (date): The first date.
+        end (date): The last date.
+        rng (Generator): The random number generator.
+
+    Returns:
+        int: The number of written shifts.
+    """
+    ratios = dict(Station.objects.filter(id__in=station_ids).values_list('id', 'max_patients_per_caregiver'))
+    rows = []
+    for station_id in station_ids:
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            for shift in ('DAY', 'NIGHT'):
+                patients = occupancy[(station_id, day, shift)]
+                rows.append(StationWorkloadDaily(
+                    station_id=station_id,
+                    date=day,
+                    shift=shift,
+                    patients_total=patients,
+                    # At least one caregiver, staffed a bit below or above the ratio
+                    caregivers_total=round(max(patients / ratios[station_id] * rng.uniform(0.8, 1.15), 1), 2),
+                ))
+    return upsert(StationWorkloadDaily, rows, ['station', 'date', 'shift'], ['patients_total', 'caregivers_total'])
+
+
+def generate_data(stations: int, patients: int, days: int, end: date = None, seed: int = None,
+                  classified_share: float = 0.9, selection_density: float = 1.0, chunk_size: int = 5000,
+                  rollup: bool = True) -> dict:
+    """Generate stations, patients, their patient-days, classifications and shift plans.
+
+    The care service options have to be loaded before, otherwise all patient-days are classified without
+    selected options.
+
+    Args:
+        stations (int): The number of new stations, 0 distributes the patients over the existing stations.
+        patients (int): The number of new patients.
+        days (int): The number of generated days.
+        end (date, optional): The last generated date, defaults to yesterday.
+        seed (int, optional): The seed of the random number generator, to generate the same data again.
+        classified_share (float, optional): The share of classified patient-days.
+        selection_density (float, optional): The factor applied to the probability to select an option.
+        chunk_size (int, optional): The number of patient-days written at once.
+        rollup (bool, optional): Compute the station workload and the analysis rollups of the range afterwards.
+
+    Returns:
+        dict: The number of generated rows per kind and the duration in seconds.
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    end = end or timezone.localdate() - timedelta(days=1)
+    start = end - timedelta(days=days - 1)
+
+    with transaction.atomic():
+        station_ids = create_stations(stations, rng) if stations else list(Station.objects.values_list('id', flat=True))
+        if not station_ids:
+            raise ValueError("There are no stations to distribute the patients over.")
+        patient_ids = create_patients(patients, rng, chunk_size)
+
+    options = get_catalog()['options']
+    layout = build_option_layout(options)
+    probabilities = np.array([SELECTION_PROBABILITIES[option['severity']] for option in options]) * selection_density
+
+    statistics = {'stations': len(station_ids), 'patients': len(patient_ids), 'patient_days': 0,
+                  'classifications': 0, 'selections': 0}
+    occupancy = Counter()
+    patient_days = generate_patient_days(patient_ids, station_ids, start, end, rng)
+    while chunk := [day for _, day in zip(range(chunk_size), patient_days)]:
+        with transaction.atomic():
+            written = write_chunk(chunk, layout, probabilities, classified_share, rng)
+        for day in chunk:
+            occupancy[(day['station_id'], day['date'], 'DAY')] += day['day_stay']
+            occupancy[(day['station_id'], day['date'], 'NIGHT')] += day['night_stay']
+        statistics['patient_days'] += len(chunk)
+        statistics['classifications'] += written['classifications']
+        statistics['selections'] += written['selections']
+        logger.info("Generated %d patient-days, %d classifications and %d selected options",
+                    statistics['patient_days'], statistics['classifications'], statistics['selections'])
+
+    with transaction.atomic():
+        if patient_ids:
+            sync_quarter_entries(DailyPatientData.objects.filter(patient__gte=patient_ids[0]))
+        statistics['shifts'] = write_shift_plans(occupancy, station_ids, start, end, rng)
+    # Bulk inserts do not send the save signals
+    invalidate_snapshot()
+    if rollup:
+        run_nightly_rollup(start, end)
+    statistics['seconds'] = round(time.perf_counter() - started, 3)
+    logger.info("Generated data from %s to %s: %s", start, end, statistics)
+    return statistics
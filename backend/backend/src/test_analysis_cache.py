@@ -0,0 +1,111 @@
+from datetime import date, datetime, timedelta
+
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from .analysis_cache import get_workload_version
+from .handle_calculations import calculate_direct_classification
+from .workload_rollups import refresh_rollups
+from ..models import DailyPatientData, Patient, Station, StationWorkloadDaily
+
+
+class AnalysisCacheTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def setUp(self):
+        cache.clear()
+        caches['analysis'].clear()
+        StationWorkloadDaily.objects.create(station_id=1, date=date(2025, 1, 6), shift='DAY', minutes_total=100,
+                                            caregivers_total=2, PPBV_suggested_caregivers=0.5)
+        refresh_rollups(date(2025, 1, 6), date(2025, 1, 6))
+        self.stations_url = reverse('stations-analysis')
+        self.stations_params = {'granularity': 'month', 'from': '2025-01-01', 'to': '2025-01-31'}
+        self.caregivers_url = reverse('handle_should_vs_is_analysis', args=['2025-01-01', '2025-01-31'])
+
+    def test_conditional_get(self):
+        for url, params in ((self.stations_url, self.stations_params), (self.caregivers_url, {})):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('ETag', response)
+            self.assertIn('Last-Modified', response)
+
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+            response = self.client.get(url, params, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_cached_response(self):
+        first = self.client.get(self.stations_url, self.stations_params)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.stations_url, self.stations_params)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        # Other parameters are cached separately
+        other = self.client.get(self.stations_url, {**self.stations_params, 'granularity': 'year'})
+        self.assertNotEqual(other['ETag'], first['ETag'])
+        self.assertEqual(other.json()[0]['data'], [{'date': '2025-01-01', 'minutes': 100}])
+
+    def test_cached_streamed_response(self):
+        first = self.client.get(self.caregivers_url)
+        self.assertTrue(first.streaming)
+        content = b''.join(first.streaming_content)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.caregivers_url)
+        self.assertEqual(second.content, content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    @override_settings(ANALYSIS_CACHE_MAX_SIZE=10)
+    def test_large_streamed_response_is_not_cached(self):
+        response = self.client.get(self.caregivers_url)
+        b''.join(response.streaming_content)
+        self.assertIsNone(caches['analysis'].get(response['ETag'].strip('"')))
+        self.assertTrue(self.client.get(self.caregivers_url).streaming)
+
+    def test_workload_write_invalidates(self):
+        response = self.client.get(self.stations_url, self.stations_params)
+        version = get_workload_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StationWorkloadDaily.objects.filter(station=1, date=date(2025, 1, 6)).update(minutes_total=250)
+            refresh_rollups(date(2025, 1, 6), date(2025, 1, 6))
+        self.assertNotEqual(get_workload_version()['version'], version['version'])
+
+        changed = self.client.get(self.stations_url, self.stations_params, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()[0]['sum'], 250)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+
+    def test_last_modified(self):
+        response = self.client.get(self.stations_url, self.stations_params)
+        self.assertEqual(response['Last-Modified'],
+                         http_date(max(get_workload_version()['modified'], timezone.localtime().replace(
+                             hour=0, minute=0, second=0, microsecond=0)).timestamp()))
+        older = http_date((timezone.now() - timedelta(days=2)).timestamp())
+        self.assertEqual(self.client.get(self.stations_url, self.stations_params,
+                                         HTTP_IF_MODIFIED_SINCE=older).status_code, 200)
+
+    def test_method_not_allowed(self):
+        self.assertEqual(self.client.post(self.stations_url).status_code, 405)
+
+    @override_settings(WORKLOAD_RECOMPUTE_MODE='immediate')
+    def test_classification_invalidates(self):
+        admission = timezone.make_aware(datetime(2025, 1, 1))
+        patient = Patient.objects.create(id=1, first_name='Max', last_name='Muster')
+        DailyPatientData.objects.create(
+            station=Station.objects.get(id=1), patient=patient, date=date(2025, 1, 6), is_semi_stationary=False,
+            is_fully_stationary=False, day_of_admission=admission, day_of_discharge=admission + timedelta(days=10),
+            is_repeating_visit=False, room_name='Room 1', bed_number='1', barthel_index=50,
+            expanded_barthel_index=50, mini_mental_status=20,
+        )
+        response = self.client.get(self.stations_url, self.stations_params)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            minutes = calculate_direct_classification(1, 1, '2025-01-06', '2', '2')['minutes']
+        changed = self.client.get(self.stations_url, self.stations_params, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()[0]['sum'], 100 + minutes)
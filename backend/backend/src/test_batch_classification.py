@@ -0,0 +1,81 @@
+import numpy as np
+from django.test import TestCase
+
+from .batch_classification import STAY_FLAGS, build_option_layout, build_selection_matrix, classify_batch
+from .handle_calculations import calculate_care_minutes
+from .question_catalog import get_catalog, replace_catalog_version
+
+
+def random_patient_days(rng: np.random.Generator, count: int, option_count: int) -> dict:
+    # Mix sparse and dense selections, so that every care group is reached
+    density = rng.choice([0.02, 0.05, 0.1, 0.3], size=(count, 1))
+    return {
+        'selections': rng.random((count, option_count)) < density,
+        'barthel_index': rng.integers(0, 101, count),
+        'expanded_barthel_index': rng.integers(0, 91, count),
+        'mini_mental_status': rng.integers(0, 31, count),
+        'flags': {name: rng.random(count) < 0.3 for name in STAY_FLAGS},
+    }
+
+
+class BatchClassificationTestCase(TestCase):
+    fixtures = ['questions.json']
+
+    def setUp(self):
+        replace_catalog_version()
+        self.options = get_catalog()['options']
+        self.layout = build_option_layout(self.options)
+
+    def classify(self, days: dict) -> dict:
+        return classify_batch(days['selections'], self.layout, days['barthel_index'],
+                              days['expanded_barthel_index'], days['mini_mental_status'], days['flags'])
+
+    def test_batch_matches_scalar_functions(self):
+        rng = np.random.default_rng(12)
+        days = random_patient_days(rng, 3000, len(self.options))
+        result = self.classify(days)
+
+        for row in range(3000):
+            body = {
+                'care_service_options': [
+                    option for option, selected in zip(self.options, days['selections'][row]) if selected
+                ],
+                'barthel_index': days['barthel_index'][row],
+                'expanded_barthel_index': days['expanded_barthel_index'][row],
+                'mini_mental_status': days['mini_mental_status'][row],
+                **{name: bool(values[row]) for name, values in days['flags'].items()},
+            }
+            minutes, a_index, s_index = calculate_care_minutes(body)
+            self.assertEqual(
+                (result['minutes'][row], result['a_index'][row], result['s_index'][row]),
+                (minutes, a_index, s_index),
+                f"Patient-day {row} differs",
+            )
+
+        # Every care group has to be covered for the comparison to be meaningful
+        self.assertEqual(set(result['a_index']), {1, 2, 3, 4})
+        self.assertEqual(set(result['s_index']), {1, 2, 3, 4})
+
+    def test_missing_flags_count_as_false(self):
+        days = random_patient_days(np.random.default_rng(1), 10, len(self.options))
+        days['flags'] = {}
+        minutes = self.classify(days)['minutes']
+        for row in range(10):
+            expected, _, _ = calculate_care_minutes({
+                'care_service_options': [
+                    option for option, selected in zip(self.options, days['selections'][row]) if selected
+                ],
+                'barthel_index': days['barthel_index'][row],
+                'expanded_barthel_index': days['expanded_barthel_index'][row],
+                'mini_mental_status': days['mini_mental_status'][row],
+            })
+            self.assertEqual(minutes[row], expected)
+
+    def test_selection_matrix_from_option_ids(self):
+        ids = self.layout['ids']
+        selections = build_selection_matrix(np.array([0, 0, 2]), np.array([ids[0], ids[5], ids[-1]]), 3, self.layout)
+        self.assertEqual(selections.shape, (3, len(ids)))
+        self.assertEqual(list(np.argwhere(selections).tolist()), [[0, 0], [0, 5], [2, len(ids) - 1]])
+
+        with self.assertRaises(ValueError):
+            build_selection_matrix(np.array([0]), np.array([ids.max() + 1]), 1, self.layout)
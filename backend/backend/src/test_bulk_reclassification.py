@@ -0,0 +1,125 @@
+import random
+from datetime import date, datetime, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .bulk_reclassification import reclassify
+from .handle_calculations import calculate_direct_classification, calculate_result
+from .question_catalog import replace_catalog_version
+from ..models import CareServiceOption, DailyClassification, DailyPatientData, IsCareServiceUsed, Patient, \
+    QuarterEntry, Station, StationWorkloadDaily
+
+
+@override_settings(WORKLOAD_RECOMPUTE_MODE='immediate')
+class BulkReclassificationTestCase(TestCase):
+    fixtures = ['stations.json', 'questions.json']
+
+    def setUp(self):
+        replace_catalog_version()
+        rng = random.Random(13)
+        self.station = Station.objects.get(id=1)
+        self.days = [date(2025, 1, 6), date(2025, 1, 7)]
+        option_ids = list(CareServiceOption.objects.values_list('id', flat=True))
+        admission = timezone.make_aware(datetime(2025, 1, 6, 10))
+
+        for patient_id in range(1, 21):
+            patient = Patient.objects.create(id=patient_id, first_name='Max', last_name='Muster')
+            semi = patient_id % 3 == 0
+            for day in self.days:
+                DailyPatientData.objects.create(
+                    station=self.station, patient=patient, date=day, is_semi_stationary=semi,
+                    is_fully_stationary=not semi, day_of_admission=admission,
+                    day_of_discharge=admission + timedelta(days=10), is_repeating_visit=patient_id % 2 == 0,
+                    uses_quarter_entry=patient_id % 4 == 0 and day == self.days[1],
+                    room_name='Room 1', bed_number='1', barthel_index=rng.randint(0, 100),
+                    expanded_barthel_index=rng.randint(0, 90), mini_mental_status=rng.randint(0, 30),
+                )
+
+        for patient_id in range(1, 21):
+            for day in self.days:
+                if patient_id > 16:
+                    # Directly classified without selecting any option
+                    calculate_direct_classification(self.station.id, patient_id, str(day), '3', '2')
+                    continue
+                classification = DailyClassification.objects.create(
+                    patient_id=patient_id, station=self.station, date=day, is_in_isolation=patient_id % 5 == 0,
+                    result_minutes=0,
+                )
+                IsCareServiceUsed.objects.bulk_create(
+                    IsCareServiceUsed(classification=classification, care_service_option_id=option_id)
+                    for option_id in rng.sample(option_ids, rng.randint(1, 25))
+                )
+                calculate_result(self.station.id, patient_id, str(day))
+
+        self.expected = self.stored()
+        # Corrupt the stored results, as a rule fix would make them outdated
+        DailyClassification.objects.update(result_minutes=1)
+        DailyClassification.objects.filter(patient__lte=16).update(a_index=1, s_index=1)
+
+    def stored(self) -> dict:
+        return {
+            (classification[0], classification[1]): classification[2:]
+            for classification in DailyClassification.objects.values_list(
+                'patient', 'date', 'result_minutes', 'a_index', 's_index'
+            )
+        }
+
+    def reset_quarter_entries(self):
+        QuarterEntry.objects.all().delete()
+        DailyPatientData.objects.update(uses_quarter_entry=False)
+
+    def test_quarter_entries_are_used_like_in_the_calculation(self):
+        self.reset_quarter_entries()
+        for day in self.days:
+            for patient_id in range(1, 21):
+                if patient_id > 16:
+                    calculate_direct_classification(self.station.id, patient_id, str(day), '3', '2')
+                else:
+                    calculate_result(self.station.id, patient_id, str(day))
+        expected = self.stored()
+        used = set(DailyPatientData.objects.filter(uses_quarter_entry=True).values_list('patient', 'date'))
+        # The repeating semi-stationary visits use the entry on their first day only
+        self.assertEqual(used, {(6, self.days[0]), (12, self.days[0]), (18, self.days[0])})
+
+        self.reset_quarter_entries()
+        DailyClassification.objects.update(result_minutes=1)
+        with self.assertLogs('backend', level='INFO'):
+            reclassify([self.station.id], self.days[0], self.days[1], chunk_size=7)
+        self.assertEqual(self.stored(), expected)
+        self.assertEqual(set(DailyPatientData.objects.filter(uses_quarter_entry=True).values_list('patient', 'date')),
+                         used)
+        self.assertEqual(QuarterEntry.objects.count(), 3)
+
+    def test_dry_run_reports_changes_without_storing_them(self):
+        corrupted = self.stored()
+        output = StringIO()
+        with self.assertLogs('backend', level='INFO'):
+            call_command('reclassify', '--stations', '1', '--from', '2025-01-06', '--to', '2025-01-07', '--dry-run',
+                         '--chunk-size', '7', stdout=output)
+
+        self.assertEqual(self.stored(), corrupted)
+        self.assertIn("Station 1: 40 classifications checked, 40 changed.", output.getvalue())
+        self.assertIn("Dry run: 40 classifications would change", output.getvalue())
+
+    def test_reclassification_matches_calculation_endpoint(self):
+        with self.assertLogs('backend', level='INFO'):
+            results = reclassify([self.station.id], self.days[0], self.days[1], chunk_size=7)
+
+        self.assertEqual(len(results[0]['changes']), 40)
+        self.assertEqual(self.stored(), self.expected)
+
+        # The workload is rebuilt from the recomputed minutes
+        for day in self.days:
+            workload = StationWorkloadDaily.objects.get(station=self.station, date=day, shift='DAY')
+            self.assertEqual(
+                workload.minutes_total,
+                sum(minutes for (_, stored_day), (minutes, _, _) in self.expected.items() if stored_day == day),
+            )
+
+        # A second run finds nothing to change
+        with self.assertLogs('backend', level='INFO'):
+            results = reclassify([self.station.id], self.days[0], self.days[1], chunk_size=7)
+        self.assertEqual(results[0]['changes'], [])
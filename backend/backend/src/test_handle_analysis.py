@@ -0,0 +1,90 @@
+import json
+import random
+from datetime import date, timedelta
+
+from django.core.cache import cache, caches
+from django.test import TestCase
+from django.urls import reverse
+
+from .handle_analysis import stream_should_vs_is_analysis
+from ..models import Station, StationWorkloadDaily
+
+
+class ShouldVsIsAnalysisTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def setUp(self):
+        cache.clear()
+        caches['analysis'].clear()
+        generator = random.Random(7)
+        self.start = date(2024, 1, 1)
+        rows = []
+        # The last station has no workload at all
+        for station in Station.objects.order_by('id')[:Station.objects.count() - 1]:
+            for offset in range(400):
+                for shift in ('DAY', 'NIGHT'):
+                    if generator.random() < 0.2:
+                        continue
+                    rows.append(StationWorkloadDaily(
+                        station=station, date=self.start + timedelta(days=offset), shift=shift,
+                        caregivers_total=generator.choice([None, 0, round(generator.uniform(1, 20), 2)]),
+                        PPBV_suggested_caregivers=generator.choice([None, 0, generator.uniform(0.1, 5)]),
+                    ))
+        StationWorkloadDaily.objects.bulk_create(rows)
+
+    def expected(self, start: date, end: date) -> list:
+        """The analysis as computed per station and shift in Python."""
+        analysis = []
+        for station in Station.objects.order_by('id'):
+            workload = StationWorkloadDaily.objects.filter(station=station, date__gte=start, date__lte=end) \
+                .order_by('-date')
+
+            def dataset(shift):
+                return [
+                    {
+                        'date': str(entry.date),
+                        'should': round(entry.PPBV_suggested_caregivers * 38.5 / 8, 2)
+                        if entry.PPBV_suggested_caregivers else 0,
+                        'is': round(entry.caregivers_total, 2) if entry.caregivers_total else 0,
+                    }
+                    for entry in workload if entry.shift == shift
+                ]
+            analysis.append({'station_id': station.id, 'station_name': station.name,
+                             'dataset_night': dataset('NIGHT'), 'dataset_day': dataset('DAY')})
+        return analysis
+
+    def test_matches_per_station_computation(self):
+        end = self.start + timedelta(days=399)
+        with self.assertNumQueries(1):
+            analysis = json.loads(''.join(stream_should_vs_is_analysis(self.start, end)))
+
+        expected = self.expected(self.start, end)
+        self.assertEqual(len(analysis), Station.objects.count())
+        self.assertEqual([station['station_id'] for station in analysis],
+                         [station['station_id'] for station in expected])
+        for station, expected_station in zip(analysis, expected):
+            for dataset in ('dataset_night', 'dataset_day'):
+                self.assertEqual(len(station[dataset]), len(expected_station[dataset]))
+                for entry, expected_entry in zip(station[dataset], expected_station[dataset]):
+                    self.assertEqual(entry['date'], expected_entry['date'])
+                    # The database may round halves differently than Python
+                    self.assertAlmostEqual(entry['should'], expected_entry['should'], delta=0.01)
+                    self.assertAlmostEqual(entry['is'], expected_entry['is'], delta=0.01)
+        self.assertEqual(analysis[-1]['dataset_night'], [])
+        self.assertEqual(analysis[-1]['dataset_day'], [])
+
+    def test_empty_range(self):
+        analysis = json.loads(''.join(stream_should_vs_is_analysis(date(2030, 1, 1), date(2030, 1, 31))))
+        self.assertEqual(len(analysis), Station.objects.count())
+        self.assertTrue(all(not station['dataset_day'] and not station['dataset_night'] for station in analysis))
+
+    def test_endpoint_streams(self):
+        response = self.client.get(reverse('handle_should_vs_is_analysis', args=['2024-01-01', '2024-01-31']))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        analysis = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(analysis[0]['dataset_day'][0]['date'], '2024-01-31')
+        self.assertTrue(all(entry['date'] >= '2024-01-01' for entry in analysis[0]['dataset_day']))
+
+        response = self.client.get(reverse('handle_should_vs_is_analysis', args=['2024-01-01', '2024-13-31']))
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,74 @@
+from datetime import date, datetime, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .handle_calculations import calculate_direct_classification, save_classification_result
+from .workload_recompute import flush_recomputes
+from ..models import DailyClassification, DailyPatientData, Patient, Station, StationWorkloadDaily, \
+    StationWorkloadMonthly
+
+
+@override_settings(WORKLOAD_RECOMPUTE_MODE='memory', WORKLOAD_RECOMPUTE_DELAY=60)
+class IncrementalWorkloadTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def setUp(self):
+        self.station = Station.objects.get(id=1)
+        self.day = date(2025, 1, 6)
+        admission = timezone.make_aware(datetime(2025, 1, 1))
+        for patient_id in range(1, 31):
+            patient = Patient.objects.create(id=patient_id, first_name='Max', last_name='Muster')
+            DailyPatientData.objects.create(
+                station=self.station, patient=patient, date=self.day, is_semi_stationary=False,
+                is_fully_stationary=True, day_of_admission=admission,
+                day_of_discharge=admission + timedelta(days=10), is_repeating_visit=False,
+                room_name='Room 1', bed_number='1', barthel_index=50, expanded_barthel_index=50,
+                mini_mental_status=20,
+            )
+
+    def tearDown(self):
+        flush_recomputes()
+
+    def workload(self) -> tuple:
+        flush_recomputes()
+        daily = StationWorkloadDaily.objects.get(station=self.station, date=self.day, shift='DAY')
+        monthly = StationWorkloadMonthly.objects.get(station=self.station, month=self.day.replace(day=1), shift='DAY')
+        return daily.minutes_total, monthly.minutes_total
+
+    def test_workload_follows_classification_changes(self):
+        first = calculate_direct_classification(self.station.id, 1, '2025-01-06', '1', '1')['minutes']
+        self.assertEqual(self.workload(), (first, first))
+
+        second = calculate_direct_classification(self.station.id, 2, '2025-01-06', '4', '4')['minutes']
+        self.assertEqual(self.workload(), (first + second, first + second))
+
+        changed = calculate_direct_classification(self.station.id, 1, '2025-01-06', '2', '3')['minutes']
+        self.assertEqual(self.workload(), (changed + second, changed + second))
+        daily = StationWorkloadDaily.objects.get(station=self.station, date=self.day, shift='DAY')
+        self.assertAlmostEqual(daily.PPBV_suggested_caregivers, (changed + second) / (38.5 * 60))
+
+        # A full reconciliation leads to the same result
+        call_command('reconcile_station_workload', '--from', '2025-01-06', stdout=StringIO())
+        self.assertEqual(self.workload(), (changed + second, changed + second))
+
+    def test_delta_starts_from_the_stored_minutes(self):
+        calculate_direct_classification(self.station.id, 1, '2025-01-06', '1', '1')
+        stale = DailyClassification.objects.get(patient=1)
+        # Another submission for the same classification is saved in the meantime
+        calculate_direct_classification(self.station.id, 1, '2025-01-06', '4', '4')
+
+        save_classification_result(stale, self.day, 200, 2, 2)
+        self.assertEqual(self.workload(), (200, 200))
+
+    def test_query_count_does_not_grow_with_station_size(self):
+        for patient_id in range(1, 31):
+            calculate_direct_classification(self.station.id, patient_id, '2025-01-06', '2', '2')
+        self.assertEqual(DailyClassification.objects.count(), 30)
+
+        # Patient, station, classification, patient data, quarter entry, the locked minutes, save and the daily
+        # workload update, the monthly workload is left to the recompute scheduler
+        with self.assertNumQueries(12):
+            calculate_direct_classification(self.station.id, 1, '2025-01-06', '3', '2')
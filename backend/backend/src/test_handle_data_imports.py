@@ -0,0 +1,159 @@
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .handle_data_imports import (
+    insert_caregiver_shift_excel_into_db,
+    insert_patient_excel_into_db,
+    read_excel_chunks,
+    run_chunked_import,
+)
+from ..models import DailyPatientData, Patient, StationWorkloadDaily, StationWorkloadMonthly
+
+
+def create_patient_sheet(rows: int, station: str = 'Station 3') -> pd.DataFrame:
+    """Create a patient import sheet with stays of different length."""
+    return pd.DataFrame({
+        'Vorname': ['Max'] * rows,
+        'Nachname': [f'Muster{index % 50}' for index in range(rows)],
+        'Patienten-ID': [1000 + index % 50 for index in range(rows)],
+        'Datum': [datetime(2025, 1, 1 + index // 50) for index in range(rows)],
+        'Stationsname': [station] * rows,
+        'Teilstationär': ['Ja' if index % 5 == 0 else 'Nein' for index in range(rows)],
+        'Vollstationär': ['Nein' if index % 5 == 0 else 'Ja' for index in range(rows)],
+        'Aufnahmetag': [datetime(2025, 1, 1, index % 24) for index in range(rows)],
+        'Entlassungstag': [datetime(2025, 1, 1 + index // 50, 23 - index % 20) for index in range(rows)],
+        'Wiederkehrend': ['Nein'] * rows,
+        'Zimmer': [f'Room {index % 10}' for index in range(rows)],
+        'Bett': [index % 3 for index in range(rows)],
+        'Barthel-Index': [index % 100 for index in range(rows)],
+        'Erweiterter Barthel-Index': [index % 90 for index in range(rows)],
+        'Mini-Mental-Status-Test': [index % 30 for index in range(rows)],
+    })
+
+
+def to_excel_file(df: pd.DataFrame) -> BytesIO:
+    """Write the DataFrame into an in-memory excel file."""
+    file = BytesIO()
+    df.to_excel(file, index=False, engine='openpyxl')
+    file.seek(0)
+    return file
+
+
+class PatientImportTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def test_bulk_import(self):
+        df = create_patient_sheet(500)
+        with CaptureQueriesContext(connection) as queries:
+            rows = insert_patient_excel_into_db(df)
+
+        # Bulk inserts are only split into batches, the number of queries does not depend on the rows
+        self.assertLess(len(queries), 20)
+        self.assertEqual(rows, 500)
+        self.assertEqual(Patient.objects.count(), 50)
+        self.assertEqual(DailyPatientData.objects.count(), 500)
+        self.assertEqual(DailyPatientData.objects.filter(is_semi_stationary=True).count(), 100)
+
+        # Admitted at 02:00 and discharged at 21:00 on the same day
+        entry = DailyPatientData.objects.get(patient=1002, date='2025-01-01')
+        self.assertEqual(entry.bed_number, '2')
+        self.assertTrue(entry.day_stay)
+        self.assertFalse(entry.night_stay)
+        # Admitted at 00:00 and discharged at 23:00 on the same day
+        self.assertTrue(DailyPatientData.objects.get(patient=1000, date='2025-01-01').night_stay)
+
+    def test_excel_is_read_in_chunks(self):
+        chunks = list(read_excel_chunks(to_excel_file(create_patient_sheet(250)), chunk_size=100))
+        self.assertEqual([len(chunk) for chunk in chunks], [100, 100, 50])
+        self.assertEqual(chunks[2]['Patienten-ID'].iloc[0], 1000)
+        self.assertEqual(chunks[0]['Datum'].iloc[0], datetime(2025, 1, 1))
+
+    def test_chunked_import_logs_statistics(self):
+        with self.assertLogs('backend', level='INFO') as logs:
+            statistics = run_chunked_import(
+                to_excel_file(create_patient_sheet(250)), insert_patient_excel_into_db, chunk_size=100
+            )
+        self.assertEqual(statistics['rows'], 250)
+        self.assertGreater(statistics['peak_memory_bytes'], 0)
+        self.assertIn('peak memory', logs.output[0])
+        self.assertEqual(DailyPatientData.objects.count(), 250)
+
+    def test_import_endpoint(self):
+        with self.assertLogs('backend', level='INFO'):
+            response = self.client.post(
+                reverse('handle_patient_data_import'),
+                data=to_excel_file(create_patient_sheet(60)).read(),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['rows'], 60)
+
+    def test_unknown_station_is_rejected(self):
+        with self.assertRaises(ValueError):
+            insert_patient_excel_into_db(create_patient_sheet(10, station='Station X'))
+        self.assertFalse(Patient.objects.exists())
+
+    def test_import_endpoint_logs_errors(self):
+        with self.assertLogs('backend', level='ERROR') as logs:
+            response = self.client.post(
+                reverse('handle_patient_data_import'),
+                data=to_excel_file(create_patient_sheet(10, station='Station X')).read(),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Station X', response.json()['error'])
+        self.assertIn('Traceback', logs.output[-1])
+
+
+class CaregiverShiftImportTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def test_daily_upsert(self):
+        days = pd.date_range('2025-01-01', '2025-12-31')
+        df = pd.DataFrame({
+            'Station': ['3', ' 5 '] * len(days),
+            'Datum': days.repeat(2),
+            'Schicht': ['Tag', 'Nacht'] * len(days),
+            'Summe\nPflegefachkräfte': ['2,5'] * 2 * len(days),
+            'Summe\nPflegehilfskräfte': ['1'] * 2 * len(days),
+            'Summe\nHebammen': ['0,25'] * 2 * len(days),
+            'Summe\nPatientenbelegung': ['20,0'] * 2 * len(days),
+        })
+        with CaptureQueriesContext(connection) as queries:
+            insert_caregiver_shift_excel_into_db(df)
+        self.assertLess(len(queries), 20)
+        self.assertEqual(StationWorkloadDaily.objects.count(), 2 * len(days))
+
+        # Importing again updates the existing rows, the last duplicate wins
+        StationWorkloadDaily.objects.filter(date='2025-01-01').update(minutes_total=100)
+        update = df.head(2).copy()
+        update['Summe\nHebammen'] = ['3', '3']
+        insert_caregiver_shift_excel_into_db(pd.concat([df.head(2), update]))
+        entry = StationWorkloadDaily.objects.get(station__name='Station 3', date='2025-01-01', shift='DAY')
+        self.assertEqual(entry.caregivers_total, 6.5)
+        self.assertEqual(entry.patients_total, 20)
+        self.assertEqual(entry.minutes_total, 100)
+        self.assertEqual(StationWorkloadDaily.objects.count(), 2 * len(days))
+
+    def test_monthly_upsert(self):
+        df = pd.DataFrame({
+            'Station': ['3', '3'],
+            'Monat': ['März', 'März'],
+            'Schicht': ['Tag', 'Nacht'],
+            'Durchschnittliche\nPflegepersonalausstattung\nPflegefachkräfte': ['4,5', '2'],
+            'Durchschnittliche\nPflegepersonalausstattung\nPflegehilfskräfte': ['1', '1'],
+            'Durchschnittliche\nPflegepersonalausstattung\nHebammen': ['0', '0'],
+            'Durchschnittliche\nPatientenbelegung': ['18,5', '17'],
+        })
+        insert_caregiver_shift_excel_into_db(df)
+        entry = StationWorkloadMonthly.objects.get(shift='DAY')
+        self.assertEqual(entry.month.month, 3)
+        self.assertEqual(entry.actual_caregivers_avg, 5.5)
+        self.assertEqual(entry.patients_avg, 18.5)
+        self.assertEqual(entry.minutes_total, 0)
@@ -0,0 +1,83 @@
+import csv
+import gzip
+import io
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from openpyxl import load_workbook
+
+from ..models import DailyClassification, Patient, StationWorkloadDaily, StationWorkloadMonthly
+
+
+class HandleExportsTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def setUp(self):
+        self.start = date(2025, 1, 1)
+        StationWorkloadDaily.objects.bulk_create([
+            StationWorkloadDaily(station_id=station_id, date=self.start + timedelta(days=offset), shift=shift,
+                                 patients_total=10, caregivers_total=2.5, minutes_total=offset * 10,
+                                 PPBV_suggested_caregivers=0.5)
+            for station_id in (1, 2)
+            for offset in range(60)
+            for shift in ('DAY', 'NIGHT')
+        ])
+        StationWorkloadMonthly.objects.create(station_id=1, month=date(2025, 1, 1), shift='DAY', minutes_total=100)
+        patient = Patient.objects.create(id=1, first_name='Max', last_name='Muster')
+        DailyClassification.objects.create(patient=patient, station_id=1, date=date(2025, 1, 6),
+                                           is_in_isolation=False, result_minutes=92, a_index=1, s_index=1)
+
+    def read_csv(self, response) -> list:
+        content = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        return list(csv.reader(io.StringIO(content.decode())))
+
+    def test_csv(self):
+        response = self.client.get(reverse('handle_export', args=['daily']),
+                                   {'from': '2025-01-10', 'to': '2025-01-19', 'stations': '2'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="daily_2025-01-10_2025-01-19.csv"')
+
+        rows = self.read_csv(response)
+        self.assertEqual(rows[0][:4], ['Station-ID', 'Station', 'Datum', 'Schicht'])
+        self.assertEqual(len(rows), 1 + 10 * 2)
+        self.assertTrue(all(row[0] == '2' for row in rows[1:]))
+        self.assertEqual([row[2] for row in rows[1:3]], ['2025-01-10', '2025-01-10'])
+        self.assertEqual(rows[-1][2], '2025-01-19')
+
+    def test_gzip(self):
+        response = self.client.get(reverse('handle_export', args=['daily']), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(self.read_csv(response)), 1 + 60 * 2 * 2)
+
+    def test_xlsx(self):
+        response = self.client.get(reverse('handle_export', args=['monthly']), {'format': 'xlsx'},
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        rows = list(workbook.active.values)
+        self.assertEqual(rows[0][:3], ('Station-ID', 'Station', 'Monat'))
+        self.assertEqual(rows[1][0], 1)
+        self.assertEqual(rows[1][-1], 100)
+
+    def test_classifications(self):
+        response = self.client.get(reverse('handle_export', args=['classifications']), {'stations': '1,2'})
+        rows = self.read_csv(response)
+        self.assertEqual(rows[1][2:], ['1', '2025-01-06', 'False', '1', '1', '92'])
+
+    def test_query_count_is_constant(self):
+        with self.assertNumQueries(1):
+            rows = self.read_csv(self.client.get(reverse('handle_export', args=['daily'])))
+        self.assertEqual(len(rows), 241)
+
+    def test_invalid_requests(self):
+        url = reverse('handle_export', args=['daily'])
+        self.assertEqual(self.client.get(reverse('handle_export', args=['patients'])).status_code, 400)
+        self.assertEqual(self.client.get(url, {'format': 'pdf'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': '2025-02-30'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'stations': '1,a'}).status_code, 400)
+        self.assertEqual(self.client.post(url).status_code, 405)
@@ -0,0 +1,105 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .handle_import_jobs import claim_next_job, process_next_job, run_worker
+from .test_handle_data_imports import create_patient_sheet, to_excel_file
+from ..models import DailyPatientData, ImportJob
+
+
+class ImportJobTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload(self, rows: int, station: str = 'Station 3'):
+        return self.client.post(
+            reverse('handle_import_jobs') + '?type=patient',
+            data=to_excel_file(create_patient_sheet(rows, station)).read(),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+
+    def test_job_is_queued_and_processed(self):
+        response = self.upload(120)
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+        self.assertEqual(response.json()['status'], 'QUEUED')
+        self.assertFalse(DailyPatientData.objects.exists())
+
+        with self.assertLogs('backend', level='INFO'):
+            self.assertEqual(process_next_job().id, job_id)
+        self.assertIsNone(process_next_job())
+
+        status = self.client.get(reverse('handle_import_job_status', args=[job_id])).json()
+        self.assertEqual(status['status'], 'SUCCEEDED')
+        self.assertEqual(status['rows_processed'], 120)
+        self.assertIsNotNone(status['duration_seconds'])
+        self.assertEqual(DailyPatientData.objects.count(), 120)
+
+    def test_failed_job_is_rolled_back(self):
+        job_id = self.upload(20, station='Station X').json()['id']
+        with self.assertLogs('backend', level='ERROR'):
+            process_next_job()
+
+        job = ImportJob.objects.get(id=job_id)
+        self.assertEqual(job.status, 'FAILED')
+        self.assertIn('Station X', job.error)
+        self.assertFalse(DailyPatientData.objects.exists())
+
+    def test_invalid_type_is_rejected(self):
+        response = self.client.post(reverse('handle_import_jobs') + '?type=unknown', data=b'',
+                                    content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ImportJob.objects.exists())
+
+    def abandon(self, job_id: int, attempts: int, heartbeat_age: timedelta) -> None:
+        # A worker claimed the job and stopped sending heartbeats
+        self.assertEqual(claim_next_job().id, job_id)
+        ImportJob.objects.filter(id=job_id).update(worker='stopped:1', attempts=attempts,
+                                                   heartbeat_at=timezone.now() - heartbeat_age)
+
+    def test_abandoned_job_is_queued_again(self):
+        job_id = self.upload(30).json()['id']
+        self.abandon(job_id, 1, timedelta(hours=1))
+
+        with self.assertLogs('backend', level='INFO') as logs:
+            self.assertEqual(process_next_job().id, job_id)
+        self.assertIn('Released 1 abandoned import jobs', logs.output[0])
+        status = self.client.get(reverse('handle_import_job_status', args=[job_id])).json()
+        self.assertEqual((status['status'], status['attempts']), ('SUCCEEDED', 2))
+        self.assertEqual(DailyPatientData.objects.count(), 30)
+
+    def test_abandoned_job_fails_after_the_last_attempt(self):
+        job_id = self.upload(30).json()['id']
+        self.abandon(job_id, 3, timedelta(hours=1))
+
+        with self.assertLogs('backend', level='WARNING'):
+            self.assertIsNone(process_next_job())
+        job = ImportJob.objects.get(id=job_id)
+        self.assertEqual(job.status, 'FAILED')
+        self.assertEqual(job.error, 'The worker stopped during the import.')
+        self.assertIsNotNone(job.finished_at)
+
+    def test_running_job_with_heartbeat_is_kept(self):
+        job_id = self.upload(30).json()['id']
+        self.abandon(job_id, 1, timedelta(seconds=10))
+
+        self.assertIsNone(process_next_job())
+        self.assertEqual(ImportJob.objects.get(id=job_id).status, 'RUNNING')
+
+    def test_worker_survives_errors_outside_the_jobs(self):
+        with patch('backend.src.handle_import_jobs.claim_next_job', side_effect=RuntimeError("Database gone")):
+            with self.assertLogs('backend', 'ERROR'):
+                run_worker(poll_interval=0, progress_interval=None, once=True)
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .handle_patients import get_dates_for_patient_classification, get_patients_with_additional_information
+from ..models import DailyClassification, DailyPatientData, Patient, Station
+
+
+class PatientRosterTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def setUp(self):
+        self.station = Station.objects.get(id=1)
+        self.today = timezone.now().date()
+
+    def add_patient(self, patient_id: int, days: int, classified_days_ago: tuple = ()) -> None:
+        """Add a patient who stayed on the station for the last days and classify some of these days."""
+        patient = Patient.objects.create(id=patient_id, first_name='Max', last_name=f'Muster{patient_id}')
+        admission = timezone.make_aware(datetime.combine(self.today - timedelta(days=days), datetime.min.time()))
+        for days_ago in range(days + 1):
+            DailyPatientData.objects.create(
+                station=self.station, patient=patient, date=self.today - timedelta(days=days_ago),
+                is_semi_stationary=False, is_fully_stationary=True, day_of_admission=admission,
+                day_of_discharge=admission + timedelta(days=days + 3), is_repeating_visit=False,
+                room_name=f'Room {patient_id}', bed_number='1', barthel_index=50,
+                expanded_barthel_index=50, mini_mental_status=20,
+            )
+        for days_ago in classified_days_ago:
+            DailyClassification.objects.create(
+                patient=patient, station=self.station, date=self.today - timedelta(days=days_ago),
+                is_in_isolation=False, result_minutes=100 + days_ago, a_index=2, s_index=days_ago % 4 + 1,
+            )
+
+    def test_roster_content(self):
+        self.add_patient(1, days=10, classified_days_ago=(2, 5, 9))
+        self.add_patient(2, days=1)
+
+        first, second = get_patients_with_additional_information(self.station.id)
+
+        self.assertEqual(first['name'], 'Max Muster1')
+        self.assertEqual(first['currentRoom'], 'Room 1')
+        self.assertEqual(first['lastClassificationDate'], self.today - timedelta(days=2))
+        self.assertEqual(first['lastClassificationMinutes'], 102)
+        self.assertEqual(first['lastClassificationSIndex'], 3)
+        self.assertEqual(
+            first['missing_classifications_last_week'],
+            [self.today - timedelta(days=days_ago) for days_ago in (7, 6, 4, 3, 1, 0)],
+        )
+        self.assertIsNone(second['lastClassificationDate'])
+        self.assertEqual(len(second['missing_classifications_last_week']), 2)
+
+    def test_query_budget_is_constant(self):
+        """The roster must not issue queries per patient or per day of stay (N+1)."""
+        self.add_patient(1, days=2, classified_days_ago=(1,))
+        with self.assertNumQueries(3):
+            get_patients_with_additional_information(self.station.id)
+
+        for patient_id in range(2, 20):
+            self.add_patient(patient_id, days=30, classified_days_ago=(0, 3))
+        with self.assertNumQueries(3):
+            patients = get_patients_with_additional_information(self.station.id)
+        self.assertEqual(len(patients), 19)
+
+    def test_dates_for_patient_classification(self):
+        self.add_patient(1, days=3, classified_days_ago=(1,))
+        with self.assertNumQueries(1):
+            dates = get_dates_for_patient_classification(1, self.station.id)
+        self.assertEqual(sum(entry['hasClassification'] for entry in dates), 1)
+        self.assertEqual(len(dates), 4)
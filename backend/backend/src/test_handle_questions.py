@@ -0,0 +1,59 @@
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+
+from .question_catalog import get_selected_option_ids, replace_catalog_version
+from ..models import DailyClassification, IsCareServiceUsed
+
+
+class BatchQuestionUpdateTestCase(TestCase):
+    fixtures = ['stations.json', 'patients.json', 'questions.json']
+
+    def setUp(self):
+        replace_catalog_version()
+        self.url = reverse('handle_questions', args=[1, 1, '2025-01-06'])
+
+    def patch(self, body: dict):
+        return self.client.patch(self.url, data=json.dumps(body), content_type='application/json')
+
+    def test_batch_update_returns_delta(self):
+        response = self.patch({
+            'changes': [{'id': 2, 'selected': True}, {'id': 3, 'selected': True}, {'id': 4, 'selected': False}],
+            'is_in_isolation': True,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'selected': [2, 3], 'deselected': [], 'is_in_isolation': True})
+
+        classification = DailyClassification.objects.get(patient=1, date='2025-01-06')
+        self.assertTrue(classification.is_in_isolation)
+        self.assertEqual(get_selected_option_ids(classification.id), {2, 3})
+
+        response = self.patch({'changes': [{'id': 2, 'selected': False}, {'id': 3, 'selected': True}]})
+        self.assertEqual(response.json(), {'selected': [], 'deselected': [2], 'is_in_isolation': True})
+        self.assertEqual(IsCareServiceUsed.objects.count(), 1)
+
+    def test_batch_update_query_count_does_not_grow_with_changes(self):
+        self.patch({'changes': [{'id': 2, 'selected': True}]})
+        changes = [{'id': option_id, 'selected': option_id % 2 == 1} for option_id in range(2, 30)]
+        with self.assertNumQueries(7):
+            self.patch({'changes': changes, 'is_in_isolation': True})
+
+    def test_batch_update_rejects_unknown_options(self):
+        response = self.patch({'changes': [{'id': 2, 'selected': True}, {'id': 999, 'selected': True}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IsCareServiceUsed.objects.exists())
+
+    def test_batch_update_rejects_malformed_bodies(self):
+        for body in (
+            [{'id': 2, 'selected': True}],
+            {'changes': {'id': 2, 'selected': True}},
+            {'changes': [{'id': '2', 'selected': True}, {'id': 5, 'selected': True}]},
+            {'changes': [{'id': 2}]},
+            {'changes': [2]},
+            {'changes': [], 'is_in_isolation': 'yes'},
+        ):
+            self.assertEqual(self.patch(body).status_code, 400, body)
+        response = self.client.patch(self.url, data='{', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(DailyClassification.objects.exists())
@@ -0,0 +1,157 @@
+import json
+from datetime import date, datetime, timedelta
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .classification_snapshot import replace_snapshot_version
+from .handle_calculations import calculate_direct_classification
+from .handle_simulation import parse_rules, simulate_workload
+from ..models import DailyClassification, DailyPatientData, Patient, Station
+
+
+@override_settings(WORKLOAD_RECOMPUTE_MODE='immediate')
+class WorkloadSimulationTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def setUp(self):
+        replace_snapshot_version()
+        self.day = date(2025, 1, 6)
+        admission = timezone.make_aware(datetime(2025, 1, 6, 9))
+        for patient_id in range(1, 11):
+            patient = Patient.objects.create(id=patient_id, first_name='Max', last_name='Muster')
+            station = Station.objects.get(id=1 if patient_id <= 6 else 2)
+            DailyPatientData.objects.create(
+                station=station, patient=patient, date=self.day, is_semi_stationary=patient_id == 1,
+                is_fully_stationary=patient_id != 1, day_of_admission=admission,
+                day_of_discharge=admission + timedelta(days=10), is_repeating_visit=False,
+                room_name='Room 1', bed_number='1', barthel_index=50, expanded_barthel_index=50,
+                mini_mental_status=20,
+            )
+            calculate_direct_classification(station.id, patient_id, str(self.day), '1', '1')
+
+    def stations(self, result: list) -> dict:
+        return {station['station_id']: station for station in result if station['station_id'] in (1, 2)}
+
+    def test_ppbv_rules_reproduce_stored_minutes(self):
+        stations = self.stations(simulate_workload(self.day, self.day, parse_rules({})))
+        for station_id in (1, 2):
+            stored = sum(
+                DailyClassification.objects.filter(station=station_id).values_list('result_minutes', flat=True)
+            )
+            self.assertEqual(stations[station_id]['minutes'], stored)
+            self.assertEqual(stations[station_id]['simulated_minutes'], stored)
+            self.assertEqual(stations[station_id]['caregivers'], round(stored / (38.5 * 60), 2))
+
+    def test_alternative_rules_without_writes(self):
+        before = list(DailyClassification.objects.values_list('id', 'result_minutes', 'a_index', 's_index'))
+        rules = parse_rules({'minutes_per_classification': {'A1': {'S1': 69}}, 'admission_minutes': 0})
+
+        with CaptureQueriesContext(connection) as queries:
+            stations = self.stations(simulate_workload(self.day, self.day, rules))
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in queries.captured_queries))
+        self.assertEqual(list(DailyClassification.objects.values_list('id', 'result_minutes', 'a_index', 's_index')),
+                         before)
+
+        # Fully stationary patients on their day of admission: 33 + 69 instead of 33 + 59 + 75
+        # The semi-stationary patient: (33 + 69) / 2 instead of (33 + 59) / 2 + 75
+        self.assertEqual(stations[1]['minutes'], 5 * 167 + 121)
+        self.assertEqual(stations[1]['simulated_minutes'], 5 * 102 + 51)
+        self.assertEqual(stations[2]['simulated_minutes'], 4 * 102)
+
+    def test_snapshot_follows_new_classifications(self):
+        rules = parse_rules({})
+        self.assertEqual(self.stations(simulate_workload(self.day, self.day, rules))[2]['minutes'], 4 * 167)
+        with self.captureOnCommitCallbacks(execute=True):
+            calculate_direct_classification(2, 7, str(self.day), '4', '4')
+        self.assertEqual(self.stations(simulate_workload(self.day, self.day, rules))[2]['minutes'], 3 * 167 + 535)
+        self.assertEqual(self.stations(simulate_workload(self.day + timedelta(days=1), date(2025, 2, 1), rules))[2]
+                         ['minutes'], 0)
+
+    def test_snapshot_is_replaced_after_the_commit(self):
+        rules = parse_rules({})
+        self.assertEqual(self.stations(simulate_workload(self.day, self.day, rules))[2]['minutes'], 4 * 167)
+        with self.captureOnCommitCallbacks() as callbacks:
+            calculate_direct_classification(2, 7, str(self.day), '4', '4')
+            # Until the commit the snapshot of the previous version is kept
+            self.assertEqual(self.stations(simulate_workload(self.day, self.day, rules))[2]['minutes'], 4 * 167)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.stations(simulate_workload(self.day, self.day, rules))[2]['minutes'], 3 * 167 + 535)
+
+    def test_empty_history(self):
+        DailyClassification.objects.all().delete()
+        DailyPatientData.objects.all().delete()
+        stations = self.stations(simulate_workload(self.day, self.day, parse_rules({})))
+        self.assertEqual(stations[1]['simulated_minutes'], 0)
+
+    def test_endpoint(self):
+        response = self.client.post(reverse('handle_workload_simulation'), json.dumps({
+            'start': '2025-01-01', 'end': '2025-01-31', 'rules': {'base_minutes': 40},
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stations(response.json())[2]['simulated_minutes'], 4 * 174)
+
+        for body in ({'start': '2025-01-01', 'end': '2025-01-31', 'rules': {'base': 40}},
+                     {'start': '2025-01-01', 'end': '2025-01-31', 'rules': {'base_minutes': -1}},
+                     {'start': '2025-01-01', 'end': '2025-01-31',
+                      'rules': {'minutes_per_classification': {'A5': {'S1': 1}}}},
+                     {'start': '2025-01-31', 'end': '2025-01-01'},
+                     {'start': '01.01.2025', 'end': '2025-01-31'}):
+            response = self.client.post(reverse('handle_workload_simulation'), json.dumps(body),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+        self.assertEqual(self.client.get(reverse('handle_workload_simulation')).status_code, 405)
+
+
+class WorkloadSimulationBenchmarkTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def setUp(self):
+        replace_snapshot_version()
+        # A year of ten classified patients on every station
+        start = date(2025, 1, 1)
+        stations = list(Station.objects.values_list('id', flat=True))
+        Patient.objects.bulk_create(
+            Patient(id=patient_id, first_name='Max', last_name='Muster')
+            for patient_id in range(1, 10 * len(stations) + 1)
+        )
+        DailyClassification.objects.bulk_create(
+            DailyClassification(
+                patient_id=index * 10 + patient + 1, station_id=station, date=start + timedelta(days=day),
+                is_in_isolation=patient % 7 == 0, result_minutes=0, a_index=patient % 4 + 1,
+                s_index=(patient + day) % 4 + 1,
+            )
+            for index, station in enumerate(stations)
+            for day in range(365)
+            for patient in range(10)
+        )
+
+    def test_simulation_of_a_year_benchmark(self):
+        rules = parse_rules({'base_minutes': 40})
+        simulate_workload(date(2025, 1, 1), date(2025, 12, 31), rules)
+        # The snapshot is kept, so only the stations are loaded again
+        with CaptureQueriesContext(connection) as queries:
+            stations = simulate_workload(date(2025, 1, 1), date(2025, 12, 31), rules)
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertEqual(sum(station['simulated_minutes'] for station in stations),
+                         sum(station['simulated_minutes'] for station in
+                             simulate_workload(date(2025, 1, 1), date(2025, 12, 31), rules)))
+
+    def test_simulation_after_a_write_benchmark(self):
+        rules = parse_rules({})
+        before = simulate_workload(date(2025, 6, 2), date(2025, 6, 2), rules)
+        with self.captureOnCommitCallbacks(execute=True):
+            classification = DailyClassification.objects.get(patient=1, date=date(2025, 6, 2))
+            classification.a_index, classification.s_index = 4, 4
+            classification.save()
+
+        # The first simulation after the write rebuilds the snapshot from the stations, classifications, patient
+        # data and quarter entries
+        with CaptureQueriesContext(connection) as queries:
+            after = simulate_workload(date(2025, 6, 2), date(2025, 6, 2), rules)
+        self.assertEqual(len(queries.captured_queries), 4)
+        self.assertEqual(after[0]['simulated_minutes'] - before[0]['simulated_minutes'], 535 - 167)
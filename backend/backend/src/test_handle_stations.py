@@ -1,7 +1,10 @@
+from datetime import datetime, timedelta
+
 from django.test import TestCase
+from django.utils import timezone
 
 from .handle_stations import get_all_stations, get_stations_analysis
-from ..models import Station
+from ..models import DailyClassification, DailyPatientData, Patient, Station
 
 
 class HandleStationsTestCase(TestCase):
@@ -30,3 +33,49 @@ class HandleStationsTestCase(TestCase):
         daily_station_workload = get_stations_analysis("monthly")
         self.assertEqual(len(daily_station_workload), 1,
                          "get_stations_analysis monthly count should be 1 (no imports).")
+
+
+class StationOverviewQueryBudgetTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def add_patients(self, station: Station, count: int, classified: int, first_id: int) -> None:
+        """Add patients staying on the station today and classify the first few of them."""
+        today = timezone.now().date()
+        admission = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+        for index in range(count):
+            patient = Patient.objects.create(id=first_id + index, first_name='Test', last_name=str(index))
+            DailyPatientData.objects.create(
+                station=station, patient=patient, date=today, is_semi_stationary=False,
+                is_fully_stationary=True, day_of_admission=admission,
+                day_of_discharge=admission + timedelta(days=3), is_repeating_visit=False,
+                room_name='Room 1', bed_number=str(index), barthel_index=50,
+                expanded_barthel_index=50, mini_mental_status=20,
+            )
+            if index < classified:
+                DailyClassification.objects.create(
+                    patient=patient, station=station, date=today, is_in_isolation=False,
+                    result_minutes=100, a_index=1, s_index=1,
+                )
+
+    def test_counts(self):
+        station = Station.objects.get(id=1)
+        self.add_patients(station, count=5, classified=2, first_id=1000)
+
+        stations = {entry['id']: entry for entry in get_all_stations()}
+        self.assertEqual(stations[1]['patientCount'], 5)
+        self.assertEqual(stations[1]['classifiedCount'], 2)
+        self.assertEqual(stations[1]['missing_classifications'], 3)
+        self.assertEqual(stations[2]['patientCount'], 0)
+        self.assertEqual(stations[2]['missing_classifications'], 0)
+
+    def test_query_budget_is_constant(self):
+        """The overview must not fall back to one query per station or patient (N+1)."""
+        with self.assertNumQueries(1):
+            get_all_stations()
+
+        for station in Station.objects.all():
+            self.add_patients(station, count=10, classified=4, first_id=station.id * 100)
+
+        with self.assertNumQueries(1):
+            stations = get_all_stations()
+        self.assertTrue(all(entry['missing_classifications'] == 6 for entry in stations))
@@ -0,0 +1,96 @@
+from datetime import date, datetime, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .nightly_rollup import compute_daily_minutes, compute_monthly_averages, compute_night_shifts
+from .scheduler import JOBS, get_due_dates, run_due_dates
+from ..models import (
+    DailyClassification,
+    DailyPatientData,
+    Patient,
+    Station,
+    StationWorkloadDaily,
+    StationWorkloadMonthly,
+    StationWorkloadRollup,
+)
+
+
+class NightlyRollupTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def setUp(self):
+        admission = timezone.make_aware(datetime(2025, 1, 1))
+        # 44 patients stay the night of the 6th on station 8, which allows 5 patients per caregiver
+        for patient_id in range(1, 45):
+            patient = Patient.objects.create(id=patient_id, first_name='Max', last_name='Muster')
+            DailyPatientData.objects.create(
+                station_id=8, patient=patient, date=date(2025, 1, 6), is_semi_stationary=False,
+                is_fully_stationary=True, day_of_admission=admission, day_of_discharge=admission + timedelta(days=10),
+                is_repeating_visit=False, room_name='Room 1', bed_number='1', barthel_index=50,
+                expanded_barthel_index=50, mini_mental_status=20, night_stay=True,
+            )
+            DailyClassification.objects.create(patient=patient, station_id=1 + patient_id % 2, date=date(2025, 1, 6),
+                                               is_in_isolation=False, result_minutes=100, a_index=1, s_index=1)
+
+    def test_night_shifts(self):
+        self.assertEqual(compute_night_shifts(date(2025, 1, 6), date(2025, 1, 7)), 2 * Station.objects.count())
+
+        night = StationWorkloadDaily.objects.get(station=8, date=date(2025, 1, 6), shift='NIGHT')
+        self.assertAlmostEqual(night.PPBV_suggested_caregivers, 44 / 5 * 8 / 38.5)
+        self.assertEqual(night.minutes_total, int(night.PPBV_suggested_caregivers * 38.5 * 60))
+        # At least one full-time equivalent, also without patients
+        empty = StationWorkloadDaily.objects.get(station=2, date=date(2025, 1, 7), shift='NIGHT')
+        self.assertEqual((empty.PPBV_suggested_caregivers, empty.minutes_total), (1, 2310))
+
+    def test_daily_minutes_keep_imported_shift_data(self):
+        StationWorkloadDaily.objects.create(station_id=1, date=date(2025, 1, 6), shift='DAY', caregivers_total=4.5,
+                                            patients_total=30)
+        compute_daily_minutes(date(2025, 1, 6), date(2025, 1, 6))
+
+        day = StationWorkloadDaily.objects.get(station=1, date=date(2025, 1, 6), shift='DAY')
+        self.assertEqual((day.minutes_total, day.caregivers_total, day.patients_total), (2200, 4.5, 30))
+        self.assertAlmostEqual(day.PPBV_suggested_caregivers, 2200 / (38.5 * 60))
+        self.assertEqual(StationWorkloadDaily.objects.get(station=2, date=date(2025, 1, 6)).minutes_total, 2200)
+        self.assertEqual(StationWorkloadDaily.objects.get(station=3, date=date(2025, 1, 6)).minutes_total, 0)
+
+    def test_monthly_averages(self):
+        StationWorkloadDaily.objects.create(station_id=1, date=date(2025, 1, 7), shift='DAY', caregivers_total=31,
+                                            patients_total=62)
+        compute_daily_minutes(date(2025, 1, 6), date(2025, 1, 6))
+        compute_night_shifts(date(2025, 1, 6), date(2025, 1, 6))
+        self.assertEqual(compute_monthly_averages(date(2025, 1, 6), date(2025, 1, 6), [1]), 2)
+
+        month = StationWorkloadMonthly.objects.get(station=1, month=date(2025, 1, 1), shift='DAY')
+        self.assertEqual(month.minutes_total, 2200)
+        self.assertEqual((month.patients_avg, month.actual_caregivers_avg), (2, 1))
+        self.assertAlmostEqual(month.suggested_caregivers_avg, 2200 / (38.5 * 60) / 31)
+        self.assertTrue(StationWorkloadMonthly.objects.filter(station=1, shift='NIGHT').exists())
+        self.assertFalse(StationWorkloadMonthly.objects.filter(station=2).exists())
+
+    def test_scheduled_job_writes_the_month_of_the_previous_day(self):
+        day = get_due_dates(None, JOBS['rollup_workload']['run_at'], timezone.now())[0]
+        with self.assertLogs('backend', 'INFO'):
+            run_due_dates('rollup_workload')
+        # At least one full-time equivalent in the night
+        self.assertEqual(
+            StationWorkloadMonthly.objects.get(station=1, month=day.replace(day=1), shift='NIGHT').minutes_total,
+            2310,
+        )
+
+    def test_command_rebuilds_a_year(self):
+        with self.assertLogs('backend', 'INFO'), CaptureQueriesContext(connection) as queries:
+            call_command('rollup_workload', '--from', '2025-01-01', '--to', '2025-12-31', stdout=StringIO())
+
+        stations = Station.objects.count()
+        self.assertEqual(StationWorkloadDaily.objects.count(), 365 * 2 * stations)
+        self.assertEqual(StationWorkloadMonthly.objects.count(), 12 * 2 * stations)
+        year = StationWorkloadRollup.objects.get(station=2, granularity='YEAR', period_start=date(2025, 1, 1))
+        # The classified minutes plus at least one full-time equivalent in every night
+        self.assertEqual(year.minutes_total, 2200 + 365 * 2310)
+        # The stations and days are computed in grouped queries and bulk upserts, not one by one
+        self.assertLess(len(queries), 365)
@@ -0,0 +1,75 @@
+from datetime import date, datetime, timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .handle_calculations import calculate_direct_classification
+from .quarter_entries import get_quarter_entries, get_quarter_start, has_quarter_entry, sync_quarter_entries
+from ..models import DailyPatientData, Patient, QuarterEntry, Station
+
+
+@override_settings(WORKLOAD_RECOMPUTE_MODE='immediate')
+class QuarterEntryTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def setUp(self):
+        self.station = Station.objects.get(id=1)
+        admission = timezone.make_aware(datetime(2025, 1, 1))
+        for patient_id in range(1, 4):
+            patient = Patient.objects.create(id=patient_id, first_name='Max', last_name='Muster')
+            for day in (date(2025, 1, 6), date(2025, 2, 3), date(2025, 4, 7)):
+                DailyPatientData.objects.create(
+                    station=self.station, patient=patient, date=day, is_semi_stationary=True,
+                    is_fully_stationary=False, day_of_admission=admission,
+                    day_of_discharge=admission + timedelta(days=200), is_repeating_visit=True,
+                    room_name='Room 1', bed_number='1', barthel_index=50, expanded_barthel_index=50,
+                    mini_mental_status=20,
+                )
+
+    def test_quarter_start(self):
+        self.assertEqual(get_quarter_start(date(2025, 3, 31)), date(2025, 1, 1))
+        self.assertEqual(get_quarter_start(date(2025, 4, 1)), date(2025, 4, 1))
+        self.assertEqual(get_quarter_start(date(2025, 12, 24)), date(2025, 10, 1))
+
+    def test_classification_uses_entry_once_per_quarter(self):
+        # (33 + 59) / 2 plus the admission minutes of the quarter entry
+        self.assertEqual(calculate_direct_classification(1, 1, '2025-01-06', '1', '1')['minutes'], 121)
+        self.assertTrue(DailyPatientData.objects.get(patient=1, date=date(2025, 1, 6)).uses_quarter_entry)
+        self.assertTrue(has_quarter_entry(1, date(2025, 3, 31)))
+
+        # Another day of the same quarter does not get the admission minutes again, the same day does
+        self.assertEqual(calculate_direct_classification(1, 1, '2025-02-03', '1', '1')['minutes'], 46)
+        self.assertEqual(calculate_direct_classification(1, 1, '2025-01-06', '1', '1')['minutes'], 121)
+        self.assertEqual(QuarterEntry.objects.filter(patient=1).count(), 1)
+
+        # The next quarter has its own entry
+        self.assertEqual(calculate_direct_classification(1, 1, '2025-04-07', '1', '1')['minutes'], 121)
+        self.assertEqual(QuarterEntry.objects.filter(patient=1).count(), 2)
+
+    def test_point_and_batch_lookups(self):
+        for patient_id in (1, 2):
+            calculate_direct_classification(1, patient_id, '2025-01-06', '1', '1')
+        calculate_direct_classification(1, 3, '2025-04-07', '1', '1')
+
+        with self.assertNumQueries(1):
+            self.assertFalse(has_quarter_entry(3, date(2025, 2, 1)))
+        with self.assertNumQueries(1):
+            entries = get_quarter_entries({1, 2, 3}, date(2025, 1, 1), date(2025, 6, 30))
+        self.assertEqual(entries, {(1, date(2025, 1, 1)), (2, date(2025, 1, 1)), (3, date(2025, 4, 1))})
+        self.assertEqual(get_quarter_entries({1, 2, 3}, date(2025, 4, 1), date(2025, 4, 30)), {(3, date(2025, 4, 1))})
+
+    def test_ledger_follows_direct_changes(self):
+        patient_data = DailyPatientData.objects.get(patient=2, date=date(2025, 2, 3))
+        patient_data.uses_quarter_entry = True
+        patient_data.save()
+        self.assertTrue(has_quarter_entry(2, date(2025, 1, 1)))
+
+        patient_data.uses_quarter_entry = False
+        patient_data.save()
+        self.assertFalse(has_quarter_entry(2, date(2025, 1, 1)))
+
+        # Bulk updates are synced afterwards
+        DailyPatientData.objects.filter(patient=3).update(uses_quarter_entry=True)
+        self.assertEqual(sync_quarter_entries(), 3)
+        self.assertEqual(get_quarter_entries({3}, date(2025, 1, 1), date(2025, 12, 31)),
+                         {(3, date(2025, 1, 1)), (3, date(2025, 4, 1))})
@@ -0,0 +1,82 @@
+from datetime import date
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .nightly_rollup import compute_monthly_averages
+from .quarter_entries import get_quarter_entries, has_quarter_entry
+from ..models import DailyClassification, DailyPatientData, QuarterEntry, StationWorkloadDaily
+
+
+class MigrationTestCase(TestCase):
+
+    def test_models_match_migrations(self):
+        # Fails if a model was changed without committing its migration
+        call_command('makemigrations', 'backend', check=True, dry_run=True, stdout=StringIO())
+
+
+@skipUnless(connection.vendor == 'sqlite', "The expected plans are those of SQLite.")
+class QueryIndexTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def explain(self, sql: str) -> str:
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+    def assertUsesIndex(self, queryset, index: str):
+        plan = queryset.explain()
+        self.assertIn(f'INDEX {index}', plan)
+
+    def test_classification_queries(self):
+        self.assertUsesIndex(
+            DailyClassification.objects.filter(station=1, date__gte=date(2025, 1, 1), date__lte=date(2025, 1, 31)),
+            'classif_station_date_idx',
+        )
+        self.assertUsesIndex(
+            DailyClassification.objects.filter(patient=1, station=1, date__lt=date(2025, 1, 31)).order_by('-date'),
+            'classif_patient_recent_idx',
+        )
+
+    def test_patient_data_queries(self):
+        self.assertUsesIndex(
+            DailyPatientData.objects.filter(station=1, date=date(2025, 1, 6)), 'patientdata_station_date_idx'
+        )
+        self.assertUsesIndex(
+            DailyPatientData.objects.filter(patient=1, date__gte=date(2025, 1, 1)), 'patientdata_patient_date_idx'
+        )
+        self.assertUsesIndex(
+            DailyPatientData.objects.filter(patient__in=[1, 2], uses_quarter_entry=True), 'patientdata_quarter_idx'
+        )
+        self.assertUsesIndex(
+            DailyPatientData.objects.filter(station=1, date=date(2025, 1, 6), night_stay=True),
+            'patientdata_night_stay_idx',
+        )
+
+    def test_workload_queries(self):
+        self.assertUsesIndex(
+            StationWorkloadDaily.objects.filter(date__gte=date(2025, 1, 1), date__lte=date(2025, 3, 31))
+            .order_by('date', 'station'),
+            'workload_date_station_idx',
+        )
+
+        # The monthly rollup looks up a date range of one station and shift
+        with CaptureQueriesContext(connection) as queries:
+            compute_monthly_averages(date(2025, 2, 14), date(2025, 2, 14), [1], ('DAY',))
+        plan = self.explain(queries.captured_queries[0]['sql'])
+        self.assertIn('SEARCH backend_stationworkloaddaily', plan)
+        self.assertIn('station_id=? AND date>? AND date<?', plan)
+
+    def test_quarter_entry_queries(self):
+        self.assertUsesIndex(
+            QuarterEntry.objects.filter(patient=1, quarter=date(2025, 1, 1)), 'quarterentry_patient_idx'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            has_quarter_entry(1, date(2025, 2, 1))
+            get_quarter_entries({1, 2}, date(2025, 1, 1), date(2025, 6, 30))
+        for query in queries.captured_queries:
+            self.assertIn('quarterentry_patient_idx', self.explain(query['sql']))
@@ -0,0 +1,55 @@
+import re
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .query_profiling import get_fingerprint
+
+SERVER_TIMING = re.compile(r'db;desc="(\d+) queries";dur=[\d.]+, total;dur=[\d.]+')
+
+
+class QueryProfilingTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def test_disabled_by_default(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('handle_stations')))
+
+    @override_settings(QUERY_PROFILING=True)
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('handle_stations'))
+        self.assertEqual(response.status_code, 200)
+        match = SERVER_TIMING.fullmatch(response['Server-Timing'])
+        self.assertIsNotNone(match)
+        self.assertEqual(int(match.group(1)), len(queries))
+
+    @override_settings(QUERY_PROFILING=True, QUERY_BUDGET=0, REPEATED_QUERY_THRESHOLD=1)
+    def test_budget_logs_repeated_queries(self):
+        with self.assertLogs('backend', 'WARNING') as logs:
+            self.client.get(reverse('handle_stations'))
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn(f"GET {reverse('handle_stations')} took", logs.output[0])
+        self.assertIn('FROM "backend_station"', logs.output[0])
+
+    @override_settings(QUERY_PROFILING=True, QUERY_BUDGET=0)
+    def test_streaming_queries_are_counted_after_the_stream(self):
+        response = self.client.get(reverse('handle_should_vs_is_analysis', args=['2025-01-01', '2025-01-31']))
+        self.assertTrue(response.streaming)
+        with self.assertLogs('backend', 'WARNING') as logs:
+            content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'['))
+        self.assertRegex(logs.output[0], r'with [1-9]\d* queries')
+
+    @override_settings(QUERY_PROFILING=True, QUERY_BUDGET=1000, LATENCY_BUDGET=10000)
+    def test_within_budgets_nothing_is_logged(self):
+        with self.assertNoLogs('backend', 'WARNING'):
+            self.client.get(reverse('handle_stations'))
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            get_fingerprint('SELECT "id" FROM "t0" WHERE "id" IN (%s, %s, %s) AND "name" = \'a\' LIMIT 21'),
+            get_fingerprint('SELECT "id"\n  FROM "t0" WHERE "id" IN (%s) AND "name" = \'b\'\'c\' LIMIT 1'),
+        )
+        self.assertNotEqual(get_fingerprint('SELECT "a" FROM "t0"'), get_fingerprint('SELECT "b" FROM "t0"'))
@@ -0,0 +1,92 @@
+from django.test import TestCase
+
+from .handle_questions import get_grouped_data
+from .question_catalog import get_catalog, overlay_grouped, overlay_options, replace_catalog_version
+from ..models import CareServiceOption, DailyClassification, IsCareServiceUsed, Patient, Station
+
+
+class QuestionCatalogTestCase(TestCase):
+    fixtures = ['stations.json', 'patients.json', 'questions.json']
+
+    def setUp(self):
+        replace_catalog_version()
+
+    def test_catalog_is_built_once(self):
+        with self.assertNumQueries(1):
+            catalog = get_catalog()
+        with self.assertNumQueries(0):
+            self.assertIs(get_catalog()['grouped'], catalog['grouped'])
+        self.assertEqual(len(catalog['options']), CareServiceOption.objects.count())
+
+    def test_catalog_is_invalidated_on_save(self):
+        catalog = get_catalog()
+        option = CareServiceOption.objects.get(id=2)
+        option.short = 'Changed'
+        with self.captureOnCommitCallbacks() as callbacks:
+            option.save()
+            # Until the commit the catalog of the previous version is kept
+            self.assertIs(get_catalog()['options'], catalog['options'])
+        for callback in callbacks:
+            callback()
+
+        options = {option['id']: option for option in get_catalog()['options']}
+        self.assertEqual(options[2]['short'], 'Changed')
+
+    def test_selections_are_not_shared(self):
+        patient = Patient.objects.get(id=1)
+        station = Station.objects.get(id=1)
+        classification = DailyClassification.objects.create(
+            patient=patient, station=station, date='2025-01-06', is_in_isolation=False,
+            result_minutes=0, a_index=0, s_index=0,
+        )
+        IsCareServiceUsed.objects.create(classification=classification, care_service_option_id=2)
+
+        selected = get_grouped_data(station.id, patient.id, '2025-01-06')['careServices']
+        unselected = get_grouped_data(station.id, patient.id, '2025-01-07')['careServices']
+
+        def selected_ids(grouped):
+            return [
+                question['id']
+                for field in grouped
+                for category in field['categories']
+                for severity in category['severities']
+                for question in severity['questions']
+                if question['selected']
+            ]
+
+        self.assertEqual(selected_ids(selected), [2])
+        self.assertEqual(selected_ids(unselected), [])
+        self.assertTrue(all('selected' not in option for option in get_catalog()['options']))
+
+
+class SelectionOverlayTestCase(TestCase):
+    fixtures = ['questions.json']
+
+    def setUp(self):
+        replace_catalog_version()
+        self.catalog = get_catalog()
+        # A fully selected A4/S3 patient has every A and S question ticked
+        self.all_selected = frozenset(option['id'] for option in self.catalog['options'])
+
+    def test_overlay_shares_option_variants(self):
+        options = overlay_options(self.catalog, self.all_selected)
+        self.assertTrue(all(option['selected'] for option in options))
+        self.assertIs(options[0], self.catalog['variants'][options[0]['id']][True])
+        self.assertTrue(all('selected' not in option for option in self.catalog['options']))
+
+    def test_grouped_overlay_reuses_option_variants(self):
+        def questions(grouped):
+            return [
+                question
+                for field in grouped
+                for category in field['categories']
+                for severity in category['severities']
+                for question in severity['questions']
+            ]
+
+        for selected_ids in (frozenset(), frozenset([2]), self.all_selected):
+            overlaid = questions(overlay_grouped(self.catalog, selected_ids))
+            # Every question is one of the prebuilt variants, no option is copied per call
+            self.assertEqual(len(overlaid), len(questions(self.catalog['grouped'])))
+            for question in overlaid:
+                self.assertIs(question, self.catalog['variants'][question['id']][question['id'] in selected_ids])
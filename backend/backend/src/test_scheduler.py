@@ -0,0 +1,109 @@
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .scheduler import JOBS, acquire_lock, get_due_dates, rollup_workload, run_due_dates, run_scheduler
+from ..models import JobRun, ScheduledJob, Station, StationWorkloadDaily, StationWorkloadRollup
+
+
+class SchedulerTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def setUp(self):
+        self.days = []
+        self.failing = set()
+
+        def count_days(day):
+            if day in self.failing:
+                raise RuntimeError(f"No data for {day}")
+            self.days.append(day)
+            return 10
+
+        jobs = patch.dict(JOBS, {'count_days': {'function': count_days, 'run_at': time(0, 5)}}, clear=True)
+        jobs.start()
+        self.addCleanup(jobs.stop)
+        self.now = timezone.make_aware(datetime(2025, 3, 10, 1, 0))
+
+    def test_due_dates(self):
+        run_at = time(0, 5)
+        self.assertEqual(get_due_dates(None, run_at, self.now), [date(2025, 3, 9)])
+        self.assertEqual(get_due_dates(date(2025, 3, 6), run_at, self.now),
+                         [date(2025, 3, 7), date(2025, 3, 8), date(2025, 3, 9)])
+        self.assertEqual(get_due_dates(date(2025, 3, 9), run_at, self.now), [])
+        # Before the run time the previous day is not due yet
+        self.assertEqual(get_due_dates(date(2025, 3, 8), run_at, self.now.replace(hour=0, minute=1)), [])
+
+    def test_catch_up_in_order(self):
+        ScheduledJob.objects.create(name='count_days', last_run_for=date(2025, 3, 6))
+        with self.assertLogs('backend', 'INFO'):
+            runs = run_due_dates('count_days', self.now)
+
+        self.assertEqual(self.days, [date(2025, 3, 7), date(2025, 3, 8), date(2025, 3, 9)])
+        self.assertEqual([(run.status, run.rows) for run in runs], [('SUCCEEDED', 10)] * 3)
+        self.assertTrue(all(run.duration is not None and run.finished_at for run in runs))
+        job = ScheduledJob.objects.get(name='count_days')
+        self.assertEqual((job.last_run_for, job.locked_by, job.locked_until), (date(2025, 3, 9), '', None))
+        # Nothing is due anymore
+        self.assertEqual(run_due_dates('count_days', self.now), [])
+
+    def test_failed_run_stops_the_catch_up(self):
+        ScheduledJob.objects.create(name='count_days', last_run_for=date(2025, 3, 6))
+        self.failing.add(date(2025, 3, 8))
+        with self.assertLogs('backend', 'INFO'):
+            runs = run_due_dates('count_days', self.now)
+
+        self.assertEqual([run.status for run in runs], ['SUCCEEDED', 'FAILED'])
+        self.assertEqual(runs[-1].error, "No data for 2025-03-08")
+        self.assertEqual(ScheduledJob.objects.get(name='count_days').last_run_for, date(2025, 3, 7))
+        # The failed date is only retried after the delay, and later dates wait for it
+        JobRun.objects.filter(status='FAILED').update(finished_at=self.now)
+        self.assertEqual(run_due_dates('count_days', self.now + timedelta(minutes=1)), [])
+        self.failing.clear()
+        with self.assertLogs('backend', 'INFO'):
+            runs = run_due_dates('count_days', self.now + timedelta(hours=1))
+        self.assertEqual([run.run_for for run in runs], [date(2025, 3, 8), date(2025, 3, 9)])
+
+    def test_lock(self):
+        self.assertTrue(acquire_lock('count_days', 'other:1'))
+        with self.assertLogs('backend', 'INFO'):
+            self.assertEqual(run_due_dates('count_days', self.now), [])
+        self.assertEqual(self.days, [])
+
+        # An expired lock is taken over
+        ScheduledJob.objects.filter(name='count_days').update(locked_until=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('backend', 'INFO'):
+            self.assertEqual(len(run_due_dates('count_days', self.now)), 1)
+
+    def test_run_job_command(self):
+        out = StringIO()
+        with self.assertLogs('backend', 'INFO'):
+            call_command('run_job', 'count_days', '--for', '2025-01-01', stdout=out)
+        self.assertIn('count_days for 2025-01-01: SUCCEEDED, 10 rows', out.getvalue())
+        # Runs for a given date do not change the schedule
+        self.assertIsNone(ScheduledJob.objects.get(name='count_days').last_run_for)
+
+        acquire_lock('count_days', 'other:1')
+        with self.assertRaises(CommandError):
+            call_command('run_job', 'count_days', '--for', '2025-01-02', stdout=out)
+
+    def test_scheduler_survives_failing_jobs(self):
+        with patch('backend.src.scheduler.run_due_dates', side_effect=RuntimeError("Database gone")) as run:
+            with self.assertLogs('backend', 'ERROR'):
+                run_scheduler(poll_interval=0, once=True)
+        run.assert_called_once_with('count_days')
+
+    def test_rollup_workload_job(self):
+        with patch.dict(JOBS, {'rollup_workload': {'function': rollup_workload, 'run_at': time(0, 5)}}):
+            with self.assertLogs('backend', 'INFO'):
+                run_scheduler(poll_interval=0, once=True)
+
+        run = JobRun.objects.get(job__name='rollup_workload')
+        day = get_due_dates(None, time(0, 5), timezone.now())[0]
+        self.assertEqual((run.status, run.run_for), ('SUCCEEDED', day))
+        self.assertEqual(StationWorkloadDaily.objects.filter(date=day).count(), 2 * Station.objects.count())
+        self.assertTrue(StationWorkloadRollup.objects.filter(period_start=day, granularity='DAY').exists())
+        self.assertGreater(run.rows, 2 * Station.objects.count())
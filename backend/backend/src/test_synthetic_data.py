@@ -0,0 +1,76 @@
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from .bulk_reclassification import reclassify
+from ..models import (
+    DailyClassification,
+    DailyPatientData,
+    IsCareServiceUsed,
+    QuarterEntry,
+    Station,
+    StationWorkloadDaily,
+    StationWorkloadRollup,
+)
+
+
+class SyntheticDataTestCase(TestCase):
+    fixtures = ['stations.json', 'questions.json']
+
+    def generate(self, *arguments):
+        out = StringIO()
+        with self.assertLogs('backend', 'INFO'):
+            call_command('generate_data', '--end', '2025-06-30', '--seed', '1', *arguments, stdout=out)
+        return out.getvalue()
+
+    def test_generated_data(self):
+        self.generate('--stations', '6', '--patients', '2000', '--days', '120', '--chunk-size', '1000')
+
+        station_ids = list(Station.objects.filter(name__startswith='Station ', id__gt=9).values_list('id', flat=True))
+        self.assertEqual(len(station_ids), 6)
+        patient_days = DailyPatientData.objects.filter(station__in=station_ids)
+        self.assertEqual(patient_days.filter(date__lt=date(2025, 3, 3)).count(), 0)
+        self.assertGreater(patient_days.count(), 5000)
+        # Stays beginning before the range already occupy the stations on its first day
+        self.assertGreater(patient_days.filter(date=date(2025, 3, 3)).count(), 0)
+        # Transfers, semi-stationary visits and quarter entries
+        transferred = patient_days.values('patient').annotate(stations=Count('station', distinct=True)) \
+            .filter(stations__gt=1)
+        self.assertGreater(transferred.count(), 0)
+        self.assertGreater(patient_days.filter(is_semi_stationary=True, is_repeating_visit=True).count(), 0)
+        self.assertEqual(QuarterEntry.objects.count(), patient_days.filter(uses_quarter_entry=True).count())
+
+        # One classification per patient and day with realistic selection densities
+        classifications = DailyClassification.objects.filter(station__in=station_ids)
+        self.assertAlmostEqual(classifications.count() / patient_days.count(), 0.9, delta=0.03)
+        selections_per_day = IsCareServiceUsed.objects.count() / classifications.count()
+        self.assertTrue(3 < selections_per_day < 15, selections_per_day)
+        self.assertGreater(classifications.filter(a_index__gt=1).count(), 0)
+
+        # The stored minutes and care groups are the ones of the calculation
+        with self.assertLogs('backend', 'INFO'):
+            results = reclassify(station_ids, date(2025, 3, 3), date(2025, 6, 30), dry_run=True)
+        self.assertEqual(sum(len(result['changes']) for result in results), 0)
+
+        # Shift plans and the workload of all stations and days
+        self.assertEqual(StationWorkloadDaily.objects.filter(station__in=station_ids).count(), 6 * 120 * 2)
+        self.assertFalse(StationWorkloadDaily.objects.filter(station__in=station_ids, caregivers_total=None).exists())
+        self.assertTrue(StationWorkloadRollup.objects.filter(station__in=station_ids, granularity='MONTH').exists())
+
+    def test_seed_reproduces_the_data(self):
+        def generate_minutes():
+            self.generate('--stations', '0', '--patients', '50', '--days', '14', '--skip-rollup')
+            minutes = list(DailyClassification.objects.order_by('patient', 'date')
+                           .values_list('patient', 'date', 'result_minutes'))
+            DailyPatientData.objects.all().delete()
+            DailyClassification.objects.all().delete()
+            return minutes
+
+        first = generate_minutes()
+        self.assertTrue(first)
+        # The patients of the second run get new IDs
+        self.assertEqual([row[1:] for row in first], [row[1:] for row in generate_minutes()])
+        self.assertEqual(StationWorkloadRollup.objects.count(), 0)
@@ -0,0 +1,79 @@
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+class ViewProfilingTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def setUp(self):
+        cache.clear()
+        caches['analysis'].clear()
+        self.profiling_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(PROFILING=True, PROFILING_DIR=self.profiling_dir)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.profiling_dir)
+
+    def get_profiles(self, url_name: str) -> list:
+        return list(Path(self.profiling_dir, url_name).glob('*.prof'))
+
+    def test_header(self):
+        self.client.get(reverse('handle_stations'))
+        # The header of anonymous clients from other addresses is ignored
+        self.client.get(reverse('handle_stations'), HTTP_X_PROFILE='1')
+        self.assertEqual(self.get_profiles('handle_stations'), [])
+
+        self.client.force_login(User.objects.create(username='admin', is_staff=True))
+        with self.assertLogs('backend', 'INFO'):
+            response = self.client.get(reverse('handle_stations'), HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.get_profiles('handle_stations')), 1)
+        # The profiles are only aggregated on request
+        self.assertEqual([path.suffix for path in Path(self.profiling_dir, 'handle_stations').iterdir()], ['.prof'])
+
+        out = StringIO()
+        call_command('profile_report', 'handle_stations', stdout=out)
+        self.assertIn('handle_stations: 1 profiled requests', out.getvalue())
+        self.assertIn('(handle_stations)', out.getvalue())
+
+    @override_settings(PROFILING_HEADER_IPS=['127.0.0.1'])
+    def test_header_from_allowed_address(self):
+        with self.assertLogs('backend', 'INFO'):
+            self.client.get(reverse('handle_stations'), HTTP_X_PROFILE='1')
+        self.assertEqual(len(self.get_profiles('handle_stations')), 1)
+
+    @override_settings(PROFILING_URL_NAMES=['handle_stations'], PROFILING_KEEP=2)
+    def test_url_names_and_kept_profiles(self):
+        with self.assertLogs('backend', 'INFO'):
+            for _ in range(3):
+                self.client.get(reverse('handle_stations'))
+        self.assertEqual(len(self.get_profiles('handle_stations')), 2)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sampling_and_streaming(self):
+        with self.assertLogs('backend', 'INFO'):
+            response = self.client.get(reverse('handle_should_vs_is_analysis', args=['2025-01-01', '2025-01-31']))
+            # The profile is written once the stream is complete
+            self.assertEqual(self.get_profiles('handle_should_vs_is_analysis'), [])
+            b''.join(response.streaming_content)
+        self.assertEqual(len(self.get_profiles('handle_should_vs_is_analysis')), 1)
+
+        out = StringIO()
+        call_command('profile_report', '--top', '5', stdout=out)
+        self.assertIn('handle_should_vs_is_analysis: 1 profiled requests', out.getvalue())
+        self.assertIn('(stream_should_vs_is_analysis)', out.getvalue())
+
+    @override_settings(PROFILING=False)
+    def test_disabled(self):
+        self.client.get(reverse('handle_stations'), HTTP_X_PROFILE='1')
+        self.assertEqual(list(Path(self.profiling_dir).iterdir()), [])
@@ -0,0 +1,102 @@
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .handle_calculations import calculate_direct_classification
+from .workload_recompute import claim_due_recomputes, flush_at_exit, flush_database, flush_recomputes, \
+    run_recompute_worker
+from ..models import DailyPatientData, Patient, Station, StationWorkloadDaily, StationWorkloadMonthly, \
+    WorkloadRecompute
+
+
+class WorkloadRecomputeTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def setUp(self):
+        self.station = Station.objects.get(id=1)
+        self.days = [date(2025, 1, 6), date(2025, 1, 7)]
+        admission = timezone.make_aware(datetime(2025, 1, 1))
+        for patient_id in range(1, 11):
+            patient = Patient.objects.create(id=patient_id, first_name='Max', last_name='Muster')
+            for day in self.days:
+                DailyPatientData.objects.create(
+                    station=self.station, patient=patient, date=day, is_semi_stationary=False,
+                    is_fully_stationary=False, day_of_admission=admission,
+                    day_of_discharge=admission + timedelta(days=10), is_repeating_visit=False,
+                    room_name='Room 1', bed_number='1', barthel_index=50, expanded_barthel_index=50,
+                    mini_mental_status=20,
+                )
+
+    def tearDown(self):
+        flush_recomputes()
+
+    def classify_all(self) -> int:
+        minutes = 0
+        for patient_id in range(1, 11):
+            for day in self.days:
+                minutes += calculate_direct_classification(self.station.id, patient_id, str(day), '2', '2')['minutes']
+        return minutes
+
+    def monthly_minutes(self) -> int:
+        return StationWorkloadMonthly.objects.get(station=self.station, month=date(2025, 1, 1), shift='DAY') \
+            .minutes_total
+
+    @override_settings(WORKLOAD_RECOMPUTE_MODE='immediate')
+    def test_immediate_mode_recomputes_on_save(self):
+        minutes = self.classify_all()
+        self.assertEqual(self.monthly_minutes(), minutes)
+
+    @override_settings(WORKLOAD_RECOMPUTE_MODE='memory', WORKLOAD_RECOMPUTE_DELAY=60)
+    def test_memory_mode_coalesces_until_flush(self):
+        minutes = self.classify_all()
+        self.assertFalse(StationWorkloadMonthly.objects.exists())
+        self.assertFalse(StationWorkloadDaily.objects.exists())
+
+        # Two missing days and one month, no matter how many classifications were saved
+        self.assertEqual(flush_recomputes(), 3)
+        self.assertEqual(self.monthly_minutes(), minutes)
+        self.assertEqual(flush_recomputes(), 0)
+
+    @override_settings(WORKLOAD_RECOMPUTE_MODE='memory', WORKLOAD_RECOMPUTE_DELAY=60)
+    def test_memory_mode_flushes_at_exit(self):
+        minutes = self.classify_all()
+        flush_at_exit()
+        self.assertEqual(self.monthly_minutes(), minutes)
+        self.assertEqual(flush_recomputes(), 0)
+
+    @override_settings(WORKLOAD_RECOMPUTE_MODE='database', WORKLOAD_RECOMPUTE_DELAY=60)
+    def test_database_mode_coalesces_until_due(self):
+        minutes = self.classify_all()
+        self.assertEqual(WorkloadRecompute.objects.count(), 3)
+
+        # Nothing is due before the debounce window has passed
+        self.assertEqual(flush_database(), 0)
+        self.assertFalse(StationWorkloadMonthly.objects.exists())
+
+        self.assertEqual(flush_database(due_at=timezone.now() + timedelta(seconds=60)), 3)
+        self.assertEqual(self.monthly_minutes(), minutes)
+        self.assertFalse(WorkloadRecompute.objects.exists())
+
+    @override_settings(WORKLOAD_RECOMPUTE_MODE='database', WORKLOAD_RECOMPUTE_DELAY=0)
+    def test_claimed_recomputes_are_not_claimed_again(self):
+        self.classify_all()
+        claimed = claim_due_recomputes(2, timezone.now())
+        self.assertEqual(len(claimed), 2)
+        remaining = claim_due_recomputes(10, timezone.now())
+        self.assertEqual(len(remaining), 1)
+        self.assertFalse(claimed & remaining)
+
+    @override_settings(WORKLOAD_RECOMPUTE_MODE='database', WORKLOAD_RECOMPUTE_DELAY=0)
+    def test_worker_survives_failed_recomputes(self):
+        self.classify_all()
+        with patch('backend.src.workload_recompute.run_recomputes', side_effect=RuntimeError("Database gone")):
+            with self.assertLogs('backend', 'ERROR'):
+                run_recompute_worker(poll_interval=0, once=True)
+        # The failed rows stay marked for the next pass
+        self.assertEqual(WorkloadRecompute.objects.count(), 3)
+
+        with self.assertLogs('backend', 'INFO'):
+            run_recompute_worker(poll_interval=0, once=True)
+        self.assertFalse(WorkloadRecompute.objects.exists())
@@ -0,0 +1,128 @@
+from datetime import date, datetime, timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .handle_calculations import calculate_direct_classification
+from .handle_stations import get_stations_analysis, get_workload_analysis
+from .workload_rollups import get_period_end, get_period_start, get_rollups, refresh_rollups
+from ..models import DailyPatientData, Patient, Station, StationWorkloadDaily, StationWorkloadRollup
+
+
+class WorkloadRollupTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def add_workload(self, station_id: int, day: date, minutes: int, shift: str = 'DAY') -> None:
+        StationWorkloadDaily.objects.update_or_create(
+            station_id=station_id, date=day, shift=shift, defaults={'minutes_total': minutes}
+        )
+
+    def test_periods(self):
+        # 2025-01-01 is a Wednesday, its ISO week starts in 2024
+        self.assertEqual(get_period_start(date(2025, 1, 1), 'WEEK'), date(2024, 12, 30))
+        self.assertEqual(get_period_end(date(2025, 1, 1), 'WEEK'), date(2025, 1, 5))
+        self.assertEqual(get_period_start(date(2025, 5, 17), 'QUARTER'), date(2025, 4, 1))
+        self.assertEqual(get_period_end(date(2025, 5, 17), 'QUARTER'), date(2025, 6, 30))
+        self.assertEqual(get_period_end(date(2024, 2, 3), 'MONTH'), date(2024, 2, 29))
+        self.assertEqual(get_period_end(date(2025, 11, 3), 'QUARTER'), date(2025, 12, 31))
+        self.assertEqual(get_period_end(date(2025, 11, 3), 'YEAR'), date(2025, 12, 31))
+        with self.assertRaises(ValueError):
+            get_period_start(date(2025, 1, 1), 'DECADE')
+
+    def test_refresh(self):
+        for day in (date(2024, 12, 30), date(2025, 1, 5), date(2025, 2, 5), date(2025, 3, 5)):
+            self.add_workload(1, day, 100)
+        self.add_workload(1, date(2025, 1, 5), 20, 'NIGHT')
+        self.add_workload(2, date(2025, 1, 5), 50)
+        refresh_rollups(date(2024, 12, 30), date(2025, 3, 5))
+
+        def minutes(granularity, station_id=1):
+            return {
+                rollup['period_start']: rollup['minutes_total']
+                for rollup in get_rollups(date(2024, 1, 1), date(2025, 12, 31), granularity)
+                if rollup['station_id'] == station_id
+            }
+
+        self.assertEqual(minutes('DAY')[date(2025, 1, 5)], 120)
+        self.assertEqual(minutes('WEEK'), {date(2024, 12, 30): 220, date(2025, 2, 3): 100, date(2025, 3, 3): 100})
+        self.assertEqual(minutes('MONTH'), {date(2024, 12, 1): 100, date(2025, 1, 1): 120, date(2025, 2, 1): 100,
+                                            date(2025, 3, 1): 100})
+        # The fifth day of three months is not summed up into a single bucket
+        self.assertEqual(minutes('QUARTER'), {date(2024, 10, 1): 100, date(2025, 1, 1): 320})
+        self.assertEqual(minutes('YEAR'), {date(2024, 1, 1): 100, date(2025, 1, 1): 320})
+        self.assertEqual(minutes('YEAR', 2), {date(2025, 1, 1): 50})
+
+        # A refresh of a single changed day updates every period containing it and removes empty ones
+        self.add_workload(1, date(2025, 2, 5), 40)
+        StationWorkloadDaily.objects.filter(station=1, date=date(2025, 3, 5)).delete()
+        refresh_rollups(date(2025, 2, 5), date(2025, 3, 5), [1])
+        self.assertEqual(minutes('QUARTER'), {date(2024, 10, 1): 100, date(2025, 1, 1): 160})
+        self.assertNotIn(date(2025, 3, 1), minutes('MONTH'))
+        self.assertEqual(minutes('YEAR', 2), {date(2025, 1, 1): 50})
+
+    def test_analysis_is_a_single_read(self):
+        for offset in range(400):
+            self.add_workload(1 + offset % 2, date(2024, 1, 1) + timedelta(days=offset), 10)
+        refresh_rollups(date(2024, 1, 1), date(2025, 2, 3))
+
+        for granularity in ('day', 'week', 'month', 'quarter', 'year'):
+            with self.assertNumQueries(1):
+                stations = get_workload_analysis(date(2024, 1, 1), date(2025, 2, 3), granularity)
+            self.assertEqual(stations[-1]['sum'], 4000)
+        with self.assertRaises(ValueError):
+            get_workload_analysis(date(2024, 1, 1), date(2025, 2, 3), 'hourly')
+
+    def test_endpoint(self):
+        self.add_workload(1, date(2025, 1, 5), 100)
+        self.add_workload(1, date(2025, 2, 5), 100)
+        refresh_rollups(date(2025, 1, 5), date(2025, 2, 5))
+        url = reverse('stations-analysis')
+
+        response = self.client.get(url, {'granularity': 'month', 'from': '2025-01-01', 'to': '2025-03-31'})
+        self.assertEqual(response.status_code, 200)
+        station = response.json()[0]
+        self.assertEqual(station['sum'], 200)
+        self.assertEqual(station['data'], [
+            {'date': '2025-01-01', 'minutes': 100},
+            {'date': '2025-02-01', 'minutes': 100},
+        ])
+
+        self.assertEqual(self.client.get(url, {'granularity': 'month'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'granularity': 'month', 'from': '2025-13-01', 'to': '2025-03-31'})
+                         .status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_quarterly_frequency(self):
+        # The same day of the month in the current and the two previous months
+        month = timezone.localdate().replace(day=5)
+        days = [month, (month - timedelta(days=30)).replace(day=5), (month - timedelta(days=60)).replace(day=5)]
+        for day in days:
+            self.add_workload(1, day, 100)
+        refresh_rollups(min(days), max(days))
+
+        station = get_stations_analysis('quarterly')[0]
+        self.assertEqual(station['sum'], 300)
+        self.assertEqual([entry['date'] for entry in station['data']], sorted(days))
+
+
+@override_settings(WORKLOAD_RECOMPUTE_MODE='immediate')
+class WorkloadRollupRecomputeTestCase(TestCase):
+    fixtures = ['stations.json']
+
+    def test_classification_refreshes_rollups(self):
+        station = Station.objects.get(id=1)
+        admission = timezone.make_aware(datetime(2025, 1, 1))
+        patient = Patient.objects.create(id=1, first_name='Max', last_name='Muster')
+        DailyPatientData.objects.create(
+            station=station, patient=patient, date=date(2025, 1, 6), is_semi_stationary=False,
+            is_fully_stationary=False, day_of_admission=admission, day_of_discharge=admission + timedelta(days=10),
+            is_repeating_visit=False, room_name='Room 1', bed_number='1', barthel_index=50,
+            expanded_barthel_index=50, mini_mental_status=20,
+        )
+
+        minutes = calculate_direct_classification(1, 1, '2025-01-06', '2', '2')['minutes']
+        for granularity, period_start in (('DAY', date(2025, 1, 6)), ('WEEK', date(2025, 1, 6)),
+                                          ('QUARTER', date(2025, 1, 1)), ('YEAR', date(2025, 1, 1))):
+            rollup = StationWorkloadRollup.objects.get(station=1, granularity=granularity)
+            self.assertEqual((rollup.period_start, rollup.minutes_total), (period_start, minutes))
@@ -0,0 +1,151 @@
+"""Profile the Python code of the views with cProfile and aggregate the profiles per URL name.
+
+The middleware is enabled with PROFILING. A request is profiled if its URL name is listed in PROFILING_URL_NAMES,
+with the probability PROFILING_SAMPLE_RATE, or if it carries the header X-Profile and comes from a staff user or
+an address listed in PROFILING_HEADER_IPS. If it is disabled, Django drops it when loading the middleware, so
+requests do not pass through it at all.
+
+Every profile is written to PROFILING_DIR/<url name>/ as a file readable with pstats or snakeviz. The profiles
+are only aggregated when the profile_report command asks for a report, so a profiled request pays for writing
+its own profile only.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import time
+from pathlib import Path
+from typing import Iterator
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PROFILING_HEADER = 'X-Profile'
+
+
+def get_profiles(url_name: str) -> list:
+    """Get the profile files of a URL name.
+
+    Args:
+        url_name (str): The name of the URL pattern.
+
+    Returns:
+        list: The paths of the profiles, oldest first.
+    """
+    return sorted(Path(settings.PROFILING_DIR, url_name).glob('*.prof'))
+
+
+def create_report(url_name: str, top: int = None, sort: str = 'cumulative') -> str:
+    """Aggregate all kept profiles of a URL name into a report of the most expensive functions.
+
+    Args:
+        url_name (str): The name of the URL pattern.
+        top (int, optional): The number of listed functions, defaults to PROFILING_TOP.
+        sort (str, optional): The pstats sort key, defaults to the cumulative time.
+
+    Returns:
+        str: The report, empty if there are no profiles.
+    """
+    profiles = get_profiles(url_name)
+    if not profiles:
+        return ''
+    report = io.StringIO()
+    report.write(f"{url_name}: {len(profiles)} profiled requests\n")
+    stats = pstats.Stats(*map(str, profiles), stream=report)
+    stats.sort_stats(sort).print_stats(top or settings.PROFILING_TOP)
+    return report.getvalue()
+
+
+def save_profile(profiler: cProfile.Profile, url_name: str, method: str, milliseconds: float) -> Path:
+    """Write a profile and remove the oldest profiles of the URL name above PROFILING_KEEP.
+
+    Args:
+        profiler (Profile): The finished profiler.
+        url_name (str): The name of the URL pattern.
+        method (str): The HTTP method of the request.
+        milliseconds (float): The duration of the request.
+
+    Returns:
+        Path: The path of the profile.
+    """
+    directory = Path(settings.PROFILING_DIR, url_name)
+    directory.mkdir(parents=True, exist_ok=True)
+    # The timestamp first, so the files sort by age
+    path = directory / f"{timezone.now():%Y%m%dT%H%M%S%f}-{os.getpid()}-{method}-{milliseconds:.0f}ms.prof"
+    profiler.dump_stats(path)
+
+    for old_profile in get_profiles(url_name)[:-settings.PROFILING_KEEP]:
+        old_profile.unlink(missing_ok=True)
+    return path
+
+
+class ViewProfilingMiddleware:
+    """Run the view of selected requests, including the content of streaming responses, under cProfile."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def should_profile(self, request, url_name: str) -> bool:
+        """Check if the URL name, the sample rate or the header of an allowed client select the request."""
+        return (
+            url_name in settings.PROFILING_URL_NAMES
+            or random.random() < settings.PROFILING_SAMPLE_RATE
+            or PROFILING_HEADER in request.headers and self.may_request_profile(request)
+        )
+
+    def may_request_profile(self, request) -> bool:
+        """Check if the client may have its request profiled with the header, since profiling slows it down."""
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_staff) or request.META.get('REMOTE_ADDR') in settings.PROFILING_HEADER_IPS
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name or view_func.__name__
+        if not self.should_profile(request, url_name):
+            return None
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            response = profiler.runcall(view_func, request, *view_args, **view_kwargs)
+        except Exception:
+            self.finish(profiler, request, url_name, started)
+            raise
+        if response.streaming:
+            response.streaming_content = self.stream(profiler, response.streaming_content, request, url_name,
+                                                     started)
+        else:
+            self.finish(profiler, request, url_name, started)
+        return response
+
+    def stream(self, profiler: cProfile.Profile, content: Iterator, request, url_name: str, started: float) \
+            -> Iterator:
+        """Profile the creation of each part of a streaming response, but not the time spent sending it."""
+        content = iter(content)
+        try:
+            while True:
+                profiler.enable()
+                try:
+                    part = next(content)
+                except StopIteration:
+                    return
+                finally:
+                    profiler.disable()
+                yield part
+        finally:
+            self.finish(profiler, request, url_name, started)
+
+    def finish(self, profiler: cProfile.Profile, request, url_name: str, started: float) -> None:
+        """Write the profile of a request and log where it went."""
+        milliseconds = (time.perf_counter() - started) * 1000
+        path = save_profile(profiler, url_name, request.method, milliseconds)
+        logger.info("Profiled %s %s in %.1f ms: %s", request.method, request.get_full_path(), milliseconds, path)
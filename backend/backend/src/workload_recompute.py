@@ -0,0 +1,256 @@
+"""Coalesce recomputations of the station workload and run them in batches.
+
+Saving a classification applies its change to the daily workload right away, but the rollups depending on it
+are only marked dirty. Marks for the same station, period and date are merged, and all marked rollups are
+recomputed together once a short debounce window has passed or a flush is requested.
+
+The pending marks are either kept in the current process ('memory'), stored in the database so that all
+processes share them and a single worker recomputes them ('database'), or recomputed right away ('immediate').
+The marks kept in memory are flushed when the process exits normally, but are lost if it is killed, which is
+why the database is the default.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from ..models import WorkloadRecompute
+from .nightly_rollup import compute_daily_minutes, compute_monthly_averages
+from .workload_rollups import get_period_end, refresh_rollups
+
+logger = logging.getLogger(__name__)
+
+RECOMPUTE_MODES = ('immediate', 'memory', 'database')
+
+_pending = set()
+_pending_lock = threading.Lock()
+_timer = None
+
+
+def get_recompute_keys(station_id: int, date: date, daily: bool) -> set:
+    """Get the keys of the rollups depending on the workload of a station on a date.
+
+    Args:
+        station_id (int): The ID of the station.
+        date (date): The date whose workload changed.
+        daily (bool): Whether the daily workload itself has to be recomputed as well.
+
+    Returns:
+        set: The (period, station ID, date) keys, monthly keys use the first day of the month.
+    """
+    keys = {('MONTH', station_id, date.replace(day=1))}
+    if daily:
+        keys.add(('DAY', station_id, date))
+    return keys
+
+
+def run_recomputes(keys: set) -> int:
+    """Recompute the daily and monthly workload of the given keys and refresh the rollups of the analysis.
+
+    The daily workload is recomputed first, since the monthly workload is summed up from it. The month of a
+    recomputed day is always recomputed as well.
+
+    Args:
+        keys (set): The (period, station ID, date) keys to recompute.
+
+    Returns:
+        int: The number of recomputed rollups.
+    """
+    days = sorted((station_id, day) for period, station_id, day in keys if period == 'DAY')
+    months = {(station_id, month) for period, station_id, month in keys if period == 'MONTH'}
+    months.update((station_id, day.replace(day=1)) for station_id, day in days)
+
+    for day in sorted({day for _, day in days}):
+        compute_daily_minutes(day, day, [station_id for station_id, other in days if other == day])
+    for month in sorted({month for _, month in months}):
+        compute_monthly_averages(month, month, [station_id for station_id, other in months if other == month],
+                                 ('DAY',))
+    if months:
+        refresh_rollups(
+            min(month for _, month in months),
+            get_period_end(max(month for _, month in months), 'MONTH'),
+            sorted({station_id for station_id, _ in months}),
+        )
+    return len(days) + len(months)
+
+
+def schedule_recompute(station_id: int, date: date, daily: bool = False) -> None:
+    """Mark the workload rollups of a station on a date as dirty.
+
+    Args:
+        station_id (int): The ID of the station.
+        date (date): The date whose workload changed.
+        daily (bool, optional): Whether the daily workload itself has to be recomputed as well.
+    """
+    keys = get_recompute_keys(station_id, date, daily)
+    mode = settings.WORKLOAD_RECOMPUTE_MODE
+    if mode == 'immediate':
+        run_recomputes(keys)
+    elif mode == 'memory':
+        mark_in_memory(keys)
+    elif mode == 'database':
+        mark_in_database(keys)
+    else:
+        raise ValueError(f"Invalid recompute mode. Use {' or '.join(map(repr, RECOMPUTE_MODES))}.")
+
+
+def mark_in_memory(keys: set) -> None:
+    """Add keys to the pending recomputations of this process and start the debounce window if needed.
+
+    Args:
+        keys (set): The (period, station ID, date) keys to mark.
+    """
+    global _timer
+    with _pending_lock:
+        _pending.update(keys)
+        # The window starts with the first mark, so a steady stream of saves cannot postpone the flush forever
+        if _timer is None:
+            _timer = threading.Timer(settings.WORKLOAD_RECOMPUTE_DELAY, flush_in_background)
+            _timer.daemon = True
+            _timer.start()
+
+
+def flush_in_background() -> None:
+    """Flush the pending recomputations of this process from the debounce timer."""
+    try:
+        flush_memory()
+    except Exception:
+        logger.exception("Recomputing the station workload failed")
+    finally:
+        connection.close()
+
+
+@atexit.register
+def flush_at_exit() -> None:
+    """Flush the pending recomputations of this process before it exits, instead of waiting for the timer."""
+    if not _pending:
+        return
+    try:
+        flush_memory()
+    except Exception:
+        logger.exception("Recomputing the station workload failed at exit")
+
+
+def flush_memory() -> int:
+    """Recompute all pending rollups of this process.
+
+    Returns:
+        int: The number of recomputed rollups.
+    """
+    global _timer
+    with _pending_lock:
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+        keys = set(_pending)
+        _pending.clear()
+    try:
+        return run_recomputes(keys)
+    except Exception:
+        # Keep the keys to retry them with the next flush
+        with _pending_lock:
+            _pending.update(keys)
+        raise
+
+
+def mark_in_database(keys: set) -> None:
+    """Store keys as pending recomputations, keys which are already pending are left untouched.
+
+    Args:
+        keys (set): The (period, station ID, date) keys to mark.
+    """
+    due_at = timezone.now() + timedelta(seconds=settings.WORKLOAD_RECOMPUTE_DELAY)
+    WorkloadRecompute.objects.bulk_create(
+        [
+            WorkloadRecompute(period=period, station_id=station_id, date=day, due_at=due_at)
+            for period, station_id, day in keys
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def claim_due_recomputes(batch_size: int, due_at: datetime) -> set:
+    """Claim pending recomputations from the database for the current process.
+
+    Claimed rows are deleted, so a mark arriving during the recomputation is stored again and recomputed
+    later. Rows locked by another worker are skipped on databases supporting it.
+
+    Args:
+        batch_size (int): The maximal number of rows to claim.
+        due_at (datetime): Claim the rows due until then.
+
+    Returns:
+        set: The claimed (period, station ID, date) keys.
+    """
+    with transaction.atomic():
+        rows = list(
+            WorkloadRecompute.objects.select_for_update(skip_locked=True)
+            .filter(due_at__lte=due_at)
+            .order_by('due_at')
+            .values_list('id', 'period', 'station_id', 'date')[:batch_size]
+        )
+        WorkloadRecompute.objects.filter(id__in=[row[0] for row in rows]).delete()
+    return {row[1:] for row in rows}
+
+
+def flush_database(batch_size: int = 500, due_at: datetime = None) -> int:
+    """Recompute the pending rollups stored in the database.
+
+    Args:
+        batch_size (int, optional): The maximal number of rows claimed at once.
+        due_at (datetime, optional): Recompute the rows due until then, defaults to now.
+
+    Returns:
+        int: The number of recomputed rollups.
+    """
+    # Rows marked during the flush are due later and are left for the next one
+    due_at = due_at or timezone.now()
+    recomputed = 0
+    while True:
+        keys = claim_due_recomputes(batch_size, due_at)
+        if not keys:
+            return recomputed
+        try:
+            recomputed += run_recomputes(keys)
+        except Exception:
+            mark_in_database(keys)
+            raise
+
+
+def flush_recomputes() -> int:
+    """Recompute all pending rollups without waiting for the debounce window.
+
+    Returns:
+        int: The number of recomputed rollups.
+    """
+    if settings.WORKLOAD_RECOMPUTE_MODE == 'database':
+        # Every row marked so far is due at the latest after one debounce window
+        return flush_database(due_at=timezone.now() + timedelta(seconds=settings.WORKLOAD_RECOMPUTE_DELAY))
+    return flush_memory()
+
+
+def run_recompute_worker(poll_interval: float, once: bool = False) -> None:
+    """Recompute the rollups pending in the database until stopped.
+
+    Args:
+        poll_interval (float): The seconds to wait between two checks for due rows.
+        once (bool, optional): Stop as soon as no row is due.
+    """
+    while True:
+        # The process lives for days, so connections dropped by the database have to be replaced
+        close_old_connections()
+        try:
+            recomputed = flush_database()
+            if recomputed:
+                logger.info("Recomputed %d station workload rollups", recomputed)
+        except Exception:
+            # The failed rows are marked again and retried with a later pass
+            logger.exception("Recomputing the station workload failed")
+        if once:
+            return
+        time.sleep(poll_interval)
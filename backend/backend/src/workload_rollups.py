@@ -0,0 +1,143 @@
+"""Keep the station workload summed up per day, ISO week, month, quarter and year.
+
+The rollups are stored in their own table, so the analysis reads one row per station and period no matter how
+long the requested range is. They are refreshed set-based from the daily workload, with one grouped query and
+one bulk upsert per granularity, whenever the daily workload of a date range is recomputed.
+"""
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth, TruncQuarter, TruncWeek, TruncYear
+
+from ..models import StationWorkloadDaily, StationWorkloadRollup
+from .analysis_cache import invalidate_workload
+
+GRANULARITIES = ('DAY', 'WEEK', 'MONTH', 'QUARTER', 'YEAR')
+TRUNCATIONS = {'WEEK': TruncWeek, 'MONTH': TruncMonth, 'QUARTER': TruncQuarter, 'YEAR': TruncYear}
+
+
+def get_period_start(day: date, granularity: str) -> date:
+    """Get the first day of the period containing a date.
+
+    Args:
+        day (date): The date.
+        granularity (str): The granularity of the period, one of GRANULARITIES.
+
+    Returns:
+        date: The first day of the period, the Monday for ISO weeks.
+    """
+    if granularity == 'DAY':
+        return day
+    if granularity == 'WEEK':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'MONTH':
+        return day.replace(day=1)
+    if granularity == 'QUARTER':
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    if granularity == 'YEAR':
+        return date(day.year, 1, 1)
+    raise ValueError(f"Invalid granularity. Use {', '.join(map(repr, GRANULARITIES))}.")
+
+
+def get_period_end(day: date, granularity: str) -> date:
+    """Get the last day of the period containing a date.
+
+    Args:
+        day (date): The date.
+        granularity (str): The granularity of the period, one of GRANULARITIES.
+
+    Returns:
+        date: The last day of the period.
+    """
+    start = get_period_start(day, granularity)
+    if granularity == 'DAY':
+        return start
+    if granularity == 'WEEK':
+        return start + timedelta(days=6)
+    months = {'MONTH': 1, 'QUARTER': 3, 'YEAR': 12}[granularity]
+    month = start.month - 1 + months
+    return date(start.year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+
+
+def refresh_rollups(start: date, end: date, station_ids: list = None) -> int:
+    """Recompute the rollups of all periods overlapping a date range from the daily workload.
+
+    Args:
+        start (date): The first changed date.
+        end (date): The last changed date.
+        station_ids (list, optional): The IDs of the changed stations, defaults to all stations.
+
+    Returns:
+        int: The number of stored rollups.
+    """
+    stored = 0
+    with transaction.atomic():
+        for granularity in GRANULARITIES:
+            # Periods only partially inside the range are recomputed as a whole
+            period_start = get_period_start(start, granularity)
+            period_end = get_period_end(end, granularity)
+            workload = StationWorkloadDaily.objects.filter(date__gte=period_start, date__lte=period_end)
+            rollups = StationWorkloadRollup.objects.filter(
+                granularity=granularity, period_start__gte=period_start, period_start__lte=period_end
+            )
+            if station_ids is not None:
+                workload = workload.filter(station__in=station_ids)
+                rollups = rollups.filter(station__in=station_ids)
+
+            truncation = TRUNCATIONS[granularity]('date') if granularity in TRUNCATIONS else F('date')
+            rows = [
+                StationWorkloadRollup(
+                    station_id=row['station_id'],
+                    granularity=granularity,
+                    period_start=row['period'],
+                    minutes_total=row['minutes'],
+                )
+                for row in workload.annotate(period=truncation)
+                .values('station_id', 'period')
+                .annotate(minutes=Coalesce(Sum('minutes_total'), Value(0)))
+                .order_by()
+            ]
+            StationWorkloadRollup.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['station', 'granularity', 'period_start'],
+                update_fields=['minutes_total'],
+            )
+
+            # Periods whose daily workload was removed entirely
+            keys = {(row.station_id, row.period_start) for row in rows}
+            stale = [
+                rollup_id
+                for rollup_id, station_id, day in rollups.values_list('id', 'station_id', 'period_start')
+                if (station_id, day) not in keys
+            ]
+            if stale:
+                StationWorkloadRollup.objects.filter(id__in=stale).delete()
+            stored += len(rows)
+        # Bulk upserts do not send the save signals
+        invalidate_workload()
+    return stored
+
+
+def get_rollups(start: date, end: date, granularity: str) -> list:
+    """Get the workload of all stations per period within a date range with a single query.
+
+    Args:
+        start (date): The first date of the range.
+        end (date): The last date of the range.
+        granularity (str): The granularity of the periods, one of GRANULARITIES.
+
+    Returns:
+        list: The station ID and name, the first day of the period and the minutes of each period overlapping
+            the range, ordered by station and period.
+    """
+    return list(
+        StationWorkloadRollup.objects.filter(
+            granularity=granularity,
+            period_start__gte=get_period_start(start, granularity),
+            period_start__lte=end,
+        )
+        .order_by('station_id', 'period_start')
+        .values('station_id', 'station__name', 'period_start', 'minutes_total')
+    )
@@ -6,8 +6,11 @@ from .src import (
     handle_analysis,
     handle_calculations,
     handle_data_imports,
+    handle_exports,
+    handle_import_jobs,
     handle_patients,
     handle_questions,
+    handle_simulation,
     handle_stations,
 )
 
@@ -72,10 +75,31 @@ urlpatterns = [
         handle_data_imports.handle_caregiver_shift_import,
         name="handle_caregiver_shift_import",
     ),
+    path(
+        "import/jobs/",
+        handle_import_jobs.handle_import_jobs,
+        name="handle_import_jobs",
+    ),
+    path(
+        "import/jobs/<int:job_id>/",
+        handle_import_jobs.handle_import_job_status,
+        name="handle_import_job_status",
+    ),
     # Analysis Endpoints
     path(
         "analysis/caregivers/<str:start>/<str:end>/",
         handle_analysis.handle_should_vs_is_analysis,
         name="handle_should_vs_is_analysis",
     ),
+    path(
+        "analysis/simulation/",
+        handle_simulation.handle_workload_simulation,
+        name="handle_workload_simulation",
+    ),
+    # Export Endpoints
+    path(
+        "export/<str:dataset>/",
+        handle_exports.handle_export,
+        name="handle_export",
+    ),
 ]
@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import sys
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -51,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.src.query_profiling.QueryProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -59,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'backend.src.view_profiling.ViewProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'medical_staff_assessment.urls'
@@ -109,6 +111,25 @@ if 'test' in sys.argv:
         'NAME': 'testdatabase'
     }
 
+# Caches, 'file' shares them between all processes of the host (server, workers and scheduler), 'locmem' keeps
+# them per process
+
+CACHE_BACKEND = config('CACHE_BACKEND', default='file')
+CACHE_LOCATION = BASE_DIR / config('CACHE_LOCATION', default='cache')
+CACHES = {
+    alias: {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_LOCATION / alias,
+    } if CACHE_BACKEND == 'file' and 'test' not in sys.argv else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': alias,
+    }
+    for alias in ('default', 'analysis')  # Cached analysis responses are kept apart from the version keys
+}
+ANALYSIS_CACHE_TIMEOUT = config('ANALYSIS_CACHE_TIMEOUT', default=3600, cast=int)  # Seconds a response is kept
+# Largest streamed response in bytes that is still cached, larger ones are only streamed
+ANALYSIS_CACHE_MAX_SIZE = config('ANALYSIS_CACHE_MAX_SIZE', default=1048576, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -143,6 +164,64 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Logging
+# https://docs.djangoproject.com/en/5.1/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'backend': {
+            'handlers': ['console'],
+            'level': config('BACKEND_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
+
+# Uploaded files, e.g. queued excel imports
+
+MEDIA_ROOT = BASE_DIR / config('MEDIA_ROOT', default='media')
+
+# Data imports
+
+IMPORT_CHUNK_SIZE = config('IMPORT_CHUNK_SIZE', default=5000, cast=int)  # Rows read from an excel file at once
+IMPORT_SPOOL_MAX_SIZE = config('IMPORT_SPOOL_MAX_SIZE', default=8 * 2 ** 20, cast=int)  # Bytes kept in memory
+IMPORT_LEASE_TIMEOUT = config('IMPORT_LEASE_TIMEOUT', default=600, cast=int)  # Seconds without heartbeat
+IMPORT_MAX_ATTEMPTS = config('IMPORT_MAX_ATTEMPTS', default=3, cast=int)  # Claims before a job fails
+
+# Recomputation of the station workload after classifications, 'immediate', 'memory' or 'database'
+
+WORKLOAD_RECOMPUTE_MODE = config('WORKLOAD_RECOMPUTE_MODE', default='database')
+WORKLOAD_RECOMPUTE_DELAY = config('WORKLOAD_RECOMPUTE_DELAY', default=2.0, cast=float)  # Debounce window in seconds
+
+# Scheduler of the periodic jobs
+
+SCHEDULER_LOCK_TIMEOUT = config('SCHEDULER_LOCK_TIMEOUT', default=3600, cast=int)  # Seconds until a lock expires
+SCHEDULER_RETRY_DELAY = config('SCHEDULER_RETRY_DELAY', default=900, cast=int)  # Seconds until a failed run is retried
+
+# Profiling of the database queries per request, logs requests above the budgets with their repeated queries
+
+QUERY_PROFILING = config('QUERY_PROFILING', default=False, cast=bool)
+QUERY_BUDGET = config('QUERY_BUDGET', default=50, cast=int)  # Queries per request
+LATENCY_BUDGET = config('LATENCY_BUDGET', default=500, cast=int)  # Milliseconds per request
+REPEATED_QUERY_THRESHOLD = config('REPEATED_QUERY_THRESHOLD', default=5, cast=int)  # Executions of one query
+
+# Profiling of the views with cProfile, for the listed URL names, for a sampled share of all other requests and for
+# requests with the X-Profile header from staff users or the listed addresses
+
+PROFILING = config('PROFILING', default=False, cast=bool)
+PROFILING_URL_NAMES = config('PROFILING_URL_NAMES', default='', cast=Csv())
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)  # Share of profiled requests
+PROFILING_HEADER_IPS = config('PROFILING_HEADER_IPS', default='', cast=Csv())  # Addresses allowed to use the header
+PROFILING_DIR = BASE_DIR / config('PROFILING_DIR', default='profiles')
+PROFILING_TOP = config('PROFILING_TOP', default=30, cast=int)  # Functions listed in a report
+PROFILING_KEEP = config('PROFILING_KEEP', default=100, cast=int)  # Profiles kept per URL name
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
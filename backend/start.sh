@@ -19,8 +19,7 @@ else
 fi
 
 # Create the database
-echo "Making migrations."
-python /app/manage.py makemigrations backend
+echo "Applying migrations."
 python /app/manage.py migrate
 
 # Create superuser if it does not exist
@@ -34,11 +33,17 @@ else
   echo "Superuser already exists. Skipping creation."
 fi
 
-# Run cronjobs
-echo "Running cronjobs."
-printenv | grep -v "no_proxy" >> /etc/environment
-service cron start
-tail -f /var/log/cron.log >> /proc/1/fd/1 2>&1 &
+# Run the scheduler of the periodic jobs
+echo "Starting the job scheduler."
+python /app/manage.py run_scheduler &
+
+# Run background workers for queued imports
+echo "Starting import workers."
+python /app/manage.py process_import_jobs &
+
+# Run the background worker recomputing the station workload marked dirty
+echo "Starting the workload recompute worker."
+python /app/manage.py process_workload_recomputes &
 
 # Fill database with questions from the PPBV
 echo "Filling database with questions from the PPBV."